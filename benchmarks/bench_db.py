@@ -0,0 +1,104 @@
+"""
+Firebase access through DbClient vs direct calls, offline: the in-process
+FakeDb waits LATENCY per call to stand in for the network. Times saving a
+timetable batch, deleting a legacy session (one read per student) and
+many sessions loading the same exam at once, then repeats a save/load
+round trip with injected failures.
+
+    python benchmarks/bench_db.py
+"""
+import os
+import sys
+import threading
+import time
+from datetime import date, time as dtime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+import synthetic  # noqa: E402
+import seating_store  # noqa: E402
+from db_client import DbClient  # noqa: E402
+from fake_firebase import FakeDb  # noqa: E402
+from seating_engine import build_seating  # noqa: E402
+
+LATENCY = 0.02  # seconds per round trip
+STUDENTS = 4000
+READERS = 40
+
+
+def batch_frame():
+    rooms = synthetic.classrooms(100, 8, 20)
+    regs = np.array([f"ADT23SOCB{i:05d}" for i in range(STUDENTS)], dtype=object)
+    frames = [build_seating(f"23CSE10{i:02d} paper", regs[i::8], rooms, date(2026, 1, 5 + i), dtime(9)) for i in range(8)]
+    return pd.concat(frames, ignore_index=True)
+
+
+def legacy_session(fake, seating_df):
+    """A format-1 session saved before the reverse index: records in list-format student nodes."""
+    key = seating_store.session_key(seating_df["Subject"].iloc[0], seating_df["Date"].iloc[0])
+    records = seating_df.to_dict(orient="records")
+    fake.reference("/").update({f"admin_seating/{key}": records,
+                                **{f"seating/{rec['Registration Number']}": [rec] for rec in records}})
+    return key
+
+
+def elapsed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def scenarios(make_db):
+    batch = batch_frame()
+    one = batch[batch["Subject"] == batch["Subject"].iloc[0]]
+    results = {}
+
+    fake = FakeDb(latency=LATENCY)
+    results["save 8 sessions"] = (elapsed(lambda: seating_store.save_sessions(make_db(fake), batch, chunk_size=500)),
+                                  fake.requests)
+
+    fake = FakeDb(latency=LATENCY)
+    key = legacy_session(fake, one)
+    fake.requests = 0
+    results[f"delete legacy ({len(one)} students)"] = (elapsed(lambda: seating_store.delete_session(make_db(fake), key)),
+                                                       fake.requests)
+
+    fake = FakeDb(latency=LATENCY)
+    db = make_db(fake)
+    key = seating_store.save_sessions(db, one)[0]
+    fake.requests = 0
+
+    def readers():
+        threads = [threading.Thread(target=seating_store.load_session, args=(db, key, True)) for _ in range(READERS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    results[f"{READERS} concurrent loads"] = (elapsed(readers), fake.requests)
+    return results
+
+
+def main():
+    direct = scenarios(lambda fake: fake)
+    client = scenarios(lambda fake: DbClient(fake))
+    print(f"{'scenario':<30} {'direct s':>9} {'requests':>9} {'client s':>9} {'requests':>9}")
+    for name in direct:
+        (t0, r0), (t1, r1) = direct[name], client[name]
+        print(f"{name:<30} {t0:>9.2f} {r0:>9} {t1:>9.2f} {r1:>9}")
+
+    # Save, reload and delete through a database that drops 20% of calls
+    batch = batch_frame()
+    fake = FakeDb(latency=LATENCY / 4, failure_rate=0.2, seed=1)
+    db = DbClient(fake, backoff=0.01)
+    keys = seating_store.save_sessions(db, batch, chunk_size=500)
+    loaded = sum(len(seating_store.load_session(db, key, fresh=True)) for key in keys)
+    deleted = sum(seating_store.delete_session(db, key) for key in keys)
+    print(f"with 20% failures: {len(batch)} seats saved, {loaded} reloaded, {deleted} deleted, "
+          f"{fake.failures} failed calls retried, database empty: {not fake.data}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Whole-term export, offline: SESSIONS stored sessions in the in-process
+FakeDb, which waits LATENCY per call. Compares reading every session and
+writing one CSV from the combined frame (what a manual dump does) with
+the streamed partitioned export, in time and peak Python memory, then
+times an incremental export after a few sessions are re-generated.
+Memory is traced throughout, which slows every row alike.
+
+    python benchmarks/bench_export.py
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, time as dtime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+import synthetic  # noqa: E402
+import seating_store  # noqa: E402
+from db_client import DbClient  # noqa: E402
+from fake_firebase import FakeDb  # noqa: E402
+from seating_engine import build_seating  # noqa: E402
+from seating_export import export_summary, export_to_folder, write_export_zip  # noqa: E402
+
+LATENCY = 0.02  # seconds per round trip
+SESSIONS = 60
+STUDENTS = 1500  # per session
+CHANGED = 3
+
+
+def term(fake):
+    rooms = synthetic.classrooms(120, 8, 20)
+    regs = np.array([f"ADT23SOCB{i:05d}" for i in range(STUDENTS)], dtype=object)
+    db = DbClient(fake)
+    for i in range(SESSIONS):
+        seating = build_seating(f"23CSE1{i:03d} paper", regs, rooms, date(2026, 1, 5) + timedelta(days=i // 4), dtime(9))
+        db.reference("/").update({f"admin_seating/{seating_store.session_key(seating['Subject'].iloc[0], seating['Date'].iloc[0])}":
+                                  seating_store.encode_session(seating)})
+    return db, rooms, regs
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    took = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return took, peak / 1e6, result
+
+
+def dump_all(db):
+    keys = [key for key, _, _ in seating_store.list_sessions(db)]
+    values = db.get_many([f"admin_seating/{key}" for key in keys])
+    frame = pd.concat([seating_store.decode_session(value) for value in values], ignore_index=True)
+    return len(frame.to_csv(index=False))
+
+
+def main():
+    fake = FakeDb(latency=LATENCY)
+    db, rooms, regs = term(fake)
+    print(f"{SESSIONS} sessions x {STUDENTS} students, {LATENCY * 1000:.0f} ms per round trip")
+    print(f"{'':<24} {'s':>7} {'peak MB':>8} {'requests':>9}")
+
+    def row(name, fn):
+        before = fake.requests
+        took, peak, result = measure(fn)
+        print(f"{name:<24} {took:>7.2f} {peak:>8.1f} {fake.requests - before:>9}")
+        return result
+
+    row("read all + one CSV", lambda: dump_all(db))
+    row("streamed CSV zip", lambda: write_export_zip(io.BytesIO(), db, "csv"))
+    with tempfile.TemporaryDirectory() as folder:
+        row("streamed Parquet tree", lambda: export_to_folder(db, folder))
+        for i in range(CHANGED):
+            seating = build_seating(f"23CSE1{i:03d} paper", regs[::-1], rooms, date(2026, 1, 5), dtime(9))
+            seating_store.save_session(db, seating, seating["Subject"].iloc[0], "2026-01-05")
+        manifest = row(f"incremental ({CHANGED} changed)", lambda: export_to_folder(db, folder))
+        print(export_summary(manifest))
+
+
+if __name__ == "__main__":
+    main()
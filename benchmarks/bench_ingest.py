@@ -0,0 +1,67 @@
+"""
+Student sheet ingestion: full pd.read_excel versus the streaming,
+column-projected ingest_students (cold and Parquet-cached), plus time to
+the first subject list (header only). Peak memory is from tracemalloc.
+
+    python benchmarks/bench_ingest.py --rows 20000 --subjects 100
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+from synthetic import student_workbook  # noqa: E402
+from seating_engine import detect_subject_columns  # noqa: E402
+from student_ingest import ingest_students, read_header  # noqa: E402
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def peak_mib(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--subjects", type=int, default=50)
+    args = parser.parse_args()
+
+    data = student_workbook(args.rows, args.subjects, extra=8)
+    print(f"{args.rows} rows x {args.subjects} subjects, {len(data) / 2**20:.1f} MiB xlsx")
+    read_header(data)  # warm up the openpyxl import
+
+    def stages(cache):
+        return [
+            ("first subject list (header)", lambda: detect_subject_columns(read_header(data))),
+            ("pd.read_excel (full sheet)", lambda: pd.read_excel(io.BytesIO(data))),
+            ("ingest_students (cold)", lambda: ingest_students(data, cache)),
+            ("ingest_students (cached)", lambda: ingest_students(data, cache)),
+        ]
+
+    # Timing and tracemalloc runs are separate, each with a fresh cache
+    timings = [(name, *timed(fn)) for name, fn in stages(tempfile.mkdtemp())]
+    peaks = [peak_mib(fn) for _, fn in stages(tempfile.mkdtemp())]
+
+    print(f"{'stage':<30} {'seconds':>8} {'peak MiB':>9} {'frame MiB':>10}")
+    for (name, result, elapsed), peak in zip(timings, peaks):
+        size = result.memory_usage(deep=True).sum() / 2**20 if isinstance(result, pd.DataFrame) else 0
+        print(f"{name:<30} {elapsed:>8.3f} {peak:>9.1f} {size:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Seating on the local SQLite store vs straight to Firebase, offline: the
+in-process FakeDb waits LATENCY per call to stand in for the network.
+Times saving a timetable batch, student seat lookups and loading a
+session, then saves a batch with the network down and times the sync
+that catches up once it is back.
+
+    python benchmarks/bench_local.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+import seating_store  # noqa: E402
+from bench_db import batch_frame, elapsed  # noqa: E402
+from db_client import DbClient  # noqa: E402
+from fake_firebase import FakeDb  # noqa: E402
+from local_store import LocalDb  # noqa: E402
+
+LATENCY = 0.02  # seconds per round trip
+LOOKUPS = 500
+
+
+def scenarios(db, batch):
+    regs = batch["Registration Number"].drop_duplicates().tolist()[:LOOKUPS]
+    results = {"save 8 sessions": elapsed(lambda: seating_store.save_sessions(db, batch, chunk_size=500))}
+    key = seating_store.list_sessions(db)[0][0]
+    results[f"{LOOKUPS} seat lookups"] = elapsed(lambda: [db.reference(f"seating/{reg}").get() for reg in regs])
+    results["load session"] = elapsed(lambda: seating_store.load_session(db, key, fresh=True))
+    return results
+
+
+def main():
+    batch = batch_frame()
+    with tempfile.TemporaryDirectory() as folder:
+        remote = DbClient(FakeDb(latency=LATENCY))
+        direct = scenarios(remote, batch)
+        local_db = LocalDb(DbClient(FakeDb(latency=LATENCY)), os.path.join(folder, "local.db"))
+        local = scenarios(local_db, batch)
+        print(f"{'scenario':<20} {'firebase s':>11} {'local s':>9}")
+        for name in direct:
+            print(f"{name:<20} {direct[name]:>11.4f} {local[name]:>9.4f}")
+        start = time.perf_counter()
+        while local_db.sync():
+            pass
+        print(f"background sync of those writes: {time.perf_counter() - start:.2f} s")
+
+        # Generate with the network down, then catch up
+        fake = FakeDb(latency=LATENCY, failure_rate=1.0)
+        offline = LocalDb(DbClient(fake, retries=0), os.path.join(folder, "offline.db"))
+        saved = elapsed(lambda: seating_store.save_sessions(offline, batch, chunk_size=500))
+        try:
+            offline.sync()
+        except ConnectionError:
+            pass
+        queued = offline.sync_stats()["pending"]
+        fake.failure_rate = 0.0
+        start = time.perf_counter()
+        while offline.sync():
+            pass
+        print(f"offline: {len(batch)} seats saved in {saved:.2f} s, {queued} writes queued, "
+              f"synced in {time.perf_counter() - start:.2f} s once back; outbox empty: {not offline.sync_stats()['pending']}")
+        local_db.close()
+        offline.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Exam-morning login storm, offline: STUDENTS logins (plus wrong passwords,
+unknown IDs and one password guesser) arrive at once from CONCURRENCY
+threads against the in-process FakeDb, which waits LATENCY per call.
+Compares the old per-login database read with CredentialIndex, and
+reports wall time, per-login latency and database round trips.
+
+    python benchmarks/bench_login.py
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from credential_index import CredentialIndex, TooManyAttempts  # noqa: E402
+from db_client import DbClient  # noqa: E402
+from fake_firebase import FakeDb  # noqa: E402
+
+LATENCY = 0.02  # seconds per round trip
+STUDENTS = 10_000
+CONCURRENCY = 256
+GUESSES = 200  # attempts on one ID by a password guesser
+
+
+def fake_db():
+    rng = np.random.default_rng(0)
+    students = {f"ADT23SOCB{i:05d}": {"A": f"Student {i}", "B": str(rng.integers(10**5, 10**6))}
+                for i in range(STUDENTS)}
+    seating = {reg: {"s1": {"Subject": "23CSE1001", "Classroom": "101"}} for reg in students}
+    return FakeDb({**students, "seating": seating, "admin_seating": {"x": {"format": 2}}}, latency=LATENCY), students
+
+
+def attempts(students):
+    """Every student once, 5% of them first with a wrong password, 100 unknown IDs and a guesser."""
+    rng = np.random.default_rng(1)
+    regs = list(students)
+    tries = [(reg.lower() if i % 7 == 0 else reg, students[reg]["B"]) for i, reg in enumerate(regs)]
+    tries += [(reg, "000000") for reg in rng.choice(regs, len(regs) // 20, replace=False)]
+    tries += [(f"ADT99XXXX{i:05d}", "123456") for i in range(100)]
+    tries += [(regs[0], f"{i:06d}") for i in range(GUESSES)]
+    order = rng.permutation(len(tries))
+    return [tries[i] for i in order]
+
+
+def legacy_login(db):
+    def login(uid, pwd):
+        try:
+            real = db.reference(f"{uid}/B").get()
+        except Exception:
+            real = None
+        return uid if real and pwd == str(real) else None
+    return login
+
+
+def index_login(index):
+    def login(uid, pwd):
+        try:
+            return index.verify(uid, pwd)
+        except TooManyAttempts:
+            return "locked"
+    return login
+
+
+def storm(login, tries):
+    latencies = np.empty(len(tries))
+
+    def one(i):
+        start = time.perf_counter()
+        result = login(*tries[i])
+        latencies[i] = time.perf_counter() - start
+        return result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(CONCURRENCY) as pool:
+        results = list(pool.map(one, range(len(tries))))
+    return time.perf_counter() - start, latencies, results
+
+
+def report(name, fake, elapsed, latencies, results):
+    ok = sum(r not in (None, "locked") for r in results)
+    locked = sum(r == "locked" for r in results)
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"{name:<18} {elapsed:>7.2f} s {p50:>9.3f} {p99:>9.3f} {ok:>7} {locked:>7} {fake.requests:>9}")
+
+
+def main():
+    print(f"{len(attempts(fake_db()[1]))} login attempts, {CONCURRENCY} at a time, {LATENCY * 1000:.0f} ms per round trip")
+    print(f"{'':<18} {'wall':>9} {'p50 ms':>9} {'p99 ms':>9} {'ok':>7} {'locked':>7} {'requests':>9}")
+
+    fake, students = fake_db()
+    tries = attempts(students)
+    report("database per login", fake, *storm(legacy_login(DbClient(fake)), tries))
+
+    fake, students = fake_db()
+    index = CredentialIndex(DbClient(fake))
+    start = time.perf_counter()
+    count = index.load()
+    load_time, load_requests = time.perf_counter() - start, fake.requests
+    report("credential index", fake, *storm(index_login(index), tries))
+    print(f"index: {count} students loaded in {load_time:.2f} s with {load_requests} requests; {index.stats()}")
+
+
+if __name__ == "__main__":
+    main()
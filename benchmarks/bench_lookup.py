@@ -0,0 +1,51 @@
+"""
+Staff registration lookup: index build time and per-lookup latency
+(exact, prefix, batch of 100) for sheets from 1k to 500k rows.
+
+    python benchmarks/bench_lookup.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from registration_index import RegistrationIndex  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000, 500_000]
+LOOKUPS = 2_000
+
+
+def per_call(fn, args):
+    start = time.perf_counter()
+    for a in args:
+        fn(a)
+    return (time.perf_counter() - start) / len(args) * 1e6
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>8} {'build s':>8} {'rebuild 1% s':>13} {'exact us':>9} {'prefix us':>10} {'batch100 us':>12}")
+    for n in SIZES:
+        regs = [f"ADT{i:08d}" for i in rng.permutation(n)]
+        start = time.perf_counter()
+        index = RegistrationIndex(regs)
+        build = time.perf_counter() - start
+
+        replaced = list(regs)
+        for i in rng.choice(n, max(n // 100, 1), replace=False):
+            replaced[i] = f"NEW{i:08d}"
+        start = time.perf_counter()
+        index.rebuild(replaced)
+        rebuild = time.perf_counter() - start
+
+        probes = [replaced[i].lower() for i in rng.integers(0, n, LOOKUPS)]
+        exact = per_call(index.get, probes)
+        prefix = per_call(index.prefix, [p[:8] for p in probes])
+        batch = per_call(index.batch, [probes[i:i + 100] for i in range(0, LOOKUPS, 100)])
+        print(f"{n:>8} {build:>8.3f} {rebuild:>13.3f} {exact:>9.2f} {prefix:>10.2f} {batch:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark harness: allocation, whole-timetable allocation, Excel
+ingestion, persistence against the in-process FakeDb, seat rendering and
+invigilator chart export, on synthetic data. Reports time, throughput and peak memory, and exits
+non-zero when a stage is slower than the stored baseline by more than the
+tolerance.
+
+    python benchmarks/run.py                       # compare with baseline.json
+    python benchmarks/run.py --sizes 1000,500000   # custom cohort sizes
+    python benchmarks/run.py --update-baseline     # record this machine's numbers
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, time as dtime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+
+import synthetic  # noqa: E402
+from fake_firebase import FakeDb  # noqa: E402
+from seating_engine import build_seating, subject_registrations  # noqa: E402
+from seating_store import save_session  # noqa: E402
+from student_ingest import ingest_students  # noqa: E402
+
+BASELINE = os.path.join(HERE, "baseline.json")
+EXAM_DATE, EXAM_TIME = date(2026, 1, 5), dtime(9, 0)
+
+
+# --- Stages ---
+# Each stage builds its inputs and returns (run, items): `run` is timed, `items` feeds throughput.
+
+def allocation(size, rooms):
+    df = synthetic.student_frame(size, subjects=4, take_rate=1.0)
+    configs = synthetic.classrooms(rooms, min_side=8, max_side=24)
+    subject = synthetic.subject_names(1)[0]
+
+    def run():
+        regs = subject_registrations(df[subject], df["Registration Number"])
+        return build_seating(subject.lower(), regs, configs, EXAM_DATE, EXAM_TIME)
+    return run, size
+
+
+def timetable(size, rooms):
+    import pandas as pd
+    from timetable_batch import allocate_timetable
+
+    df = synthetic.student_frame(size, subjects=24, take_rate=0.15)
+    configs = synthetic.classrooms(rooms, min_side=8, max_side=24)
+    codes = [name.split()[0] for name in synthetic.subject_names(24)]
+    # Two papers per slot, two slots a day over six days
+    sheet = pd.DataFrame({
+        "code": codes,
+        "date": [date(2026, 1, 5 + i // 4) for i in range(len(codes))],
+        "time": [dtime(9 + 5 * (i // 2 % 2), 0) for i in range(len(codes))],
+    })
+    return (lambda: allocate_timetable(df, sheet, configs)), int(df.iloc[:, 5:].notna().sum().sum())
+
+
+def ingestion(size, rooms):
+    data = synthetic.student_workbook(size, subjects=20)
+    return (lambda: ingest_students(data, cache_dir=None)), size
+
+
+def persistence(size, rooms):
+    df = synthetic.student_frame(size, subjects=1, take_rate=1.0)
+    configs = synthetic.classrooms(rooms, min_side=8, max_side=24)
+    subject = synthetic.subject_names(1)[0].lower()
+    seating = build_seating(subject, subject_registrations(df[df.columns[-1]], df["Registration Number"]),
+                            configs, EXAM_DATE, EXAM_TIME)
+
+    def run():
+        fake = FakeDb()
+        save_session(fake, seating, subject, EXAM_DATE)
+        return fake.requests
+    return run, len(seating)
+
+
+def rendering(size, rooms):
+    from seat_visualizer import room_image, seat_png
+
+    def run():
+        room_image.cache_clear()
+        seat_png.cache_clear()
+        for i in range(size):
+            seat_png(40, 40, i % 40, (i // 40) % 40)
+    return run, size
+
+
+def charts(size, rooms):
+    import io
+    from seating_charts import room_charts, write_chart_zip
+
+    df = synthetic.student_frame(size, subjects=1, take_rate=1.0)
+    configs = synthetic.classrooms(rooms, min_side=8, max_side=24)
+    subject = synthetic.subject_names(1)[0].lower()
+    seating = build_seating(subject, subject_registrations(df[df.columns[-1]], df["Registration Number"]),
+                            configs, EXAM_DATE, EXAM_TIME)
+    count = seating.groupby("Classroom").ngroups
+    return (lambda: write_chart_zip(io.BytesIO(), room_charts(seating, configs))), count
+
+
+STAGES = {
+    "allocation": (allocation, None),
+    "timetable": (timetable, None),         # a week of slots on the process pool
+    "ingestion": (ingestion, 20_000),       # xlsx parsing is slow; cap the sheet size
+    "persistence": (persistence, None),
+    "rendering": (rendering, 200),          # seat views of one 40x40 hall
+    "charts": (charts, 50_000),             # items are rooms; ~220 of them at the cap
+}
+
+
+# --- Harness ---
+
+def measure(run):
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2**20, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown vs baseline (0.5 = +50%%)")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results, regressions = {}, []
+    print(f"{'benchmark':<24} {'seconds':>9} {'items/s':>12} {'peak MiB':>9} {'baseline':>9}")
+    for stage in args.stages.split(","):
+        build, cap = STAGES[stage]
+        for size in sorted({min(s, cap) if cap else s for s in sizes}):
+            run, items = build(size, args.rooms)
+            elapsed, peak, _ = measure(run)
+            name = f"{stage}@{size}"
+            results[name] = {"seconds": round(elapsed, 5), "peak_mib": round(peak, 2)}
+            ref = baseline.get(name, {}).get("seconds")
+            flag = ""
+            if ref is not None and elapsed > ref * (1 + args.tolerance):
+                regressions.append(name)
+                flag = "  REGRESSION"
+            ref_txt = f"{ref:.4f}" if ref is not None else "-"
+            print(f"{name:<24} {elapsed:>9.4f} {items / elapsed:>12,.0f} {peak:>9.1f} {ref_txt:>9}{flag}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Synthetic inputs for the benchmarks: student sheets whose subject columns
+match detect_subject_columns, and classroom configs with seat-designer
+layout masks.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+
+def subject_names(subjects):
+    return [f"23CSE{1000 + i} Subject {i}" for i in range(subjects)]
+
+
+def student_frame(rows, subjects=20, take_rate=0.3, extra=4, seed=0):
+    """A staff upload as pd.read_excel would return it (original header case)."""
+    rng = np.random.default_rng(seed)
+    names = subject_names(subjects)
+    data = {"Registration Number": [f"ADT{i:08d}" for i in rng.permutation(rows)]}
+    for i in range(extra):
+        data[f"Info {i}"] = "x"
+    taking = rng.random((subjects, rows)) < take_rate
+    for name, mask in zip(names, taking):
+        data[name] = np.where(mask, name, None)
+    return pd.DataFrame(data)
+
+
+def student_workbook(rows, subjects=20, take_rate=0.3, extra=4, seed=0):
+    """The same sheet as .xlsx bytes, written in streaming mode."""
+    from openpyxl import Workbook
+
+    df = student_frame(rows, subjects, take_rate, extra, seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(list(df.columns))
+    for row in df.itertuples(index=False):
+        ws.append(list(row))
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def classrooms(rooms, min_side=4, max_side=12, disabled_rate=0.1, seed=0):
+    """Classroom configs in classrooms.json format, most with a layout mask."""
+    rng = np.random.default_rng(seed)
+    configs = {}
+    for i in range(rooms):
+        rows, cols = (int(v) for v in rng.integers(min_side, max_side + 1, 2))
+        cfg = {"rows": rows, "cols": cols}
+        if rng.random() < 0.8:
+            cfg["layout"] = (rng.random((rows, cols)) >= disabled_rate).astype(int).tolist()
+        configs[f"R{i:04d}"] = cfg
+    return configs
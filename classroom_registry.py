@@ -0,0 +1,124 @@
+import json
+import os
+import tempfile
+import threading
+
+from seating_engine import compile_room
+
+try:
+    import fcntl
+except ImportError:  # Windows: the in-process lock still serialises Streamlit sessions
+    fcntl = None
+
+DATA_FILE = "classrooms.json"
+ROOM_PREFIX = "Room - "
+
+_lock = threading.RLock()
+_cache = {}  # path -> (stamp, configs, plans)
+
+
+# --- Reads ---
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _entry(path):
+    stamp = _stamp(path)
+    cached = _cache.get(path)
+    if cached and cached[0] == stamp:
+        return cached
+    with _lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == stamp:
+            return cached
+        configs = {}
+        if stamp is not None:
+            with open(path, "r") as f:
+                configs = json.load(f)
+        cached = _cache[path] = (stamp, configs, {name: compile_room(cfg) for name, cfg in configs.items()})
+        return cached
+
+
+def load_classrooms(path=DATA_FILE):
+    """
+    Parsed classroom configs, shared by every session until the file's
+    mtime changes. Treat the result as read-only; write through
+    save_classrooms / update_classroom / delete_classroom.
+    """
+    return _entry(path)[1]
+
+
+def room_plans(path=DATA_FILE):
+    """Compiled RoomPlan (capacity, seat mask, serpentine order) per classroom."""
+    return _entry(path)[2]
+
+
+def room_name(label):
+    """Classroom key for a seating label like 'Room - 3' (keeps quirky keys such as ' 2')."""
+    return label[len(ROOM_PREFIX):] if label.startswith(ROOM_PREFIX) else label
+
+
+# --- Writes ---
+
+def save_classrooms(classrooms, path=DATA_FILE):
+    """Atomically replace the config file (temp file + rename) under the registry lock."""
+    with _lock, _file_lock(path):
+        _write(classrooms, path)
+
+
+def update_classroom(name, cfg, path=DATA_FILE):
+    _modify(path, lambda rooms: rooms.__setitem__(name, cfg))
+
+
+def delete_classroom(name, path=DATA_FILE):
+    _modify(path, lambda rooms: rooms.pop(name, None))
+
+
+def _modify(path, change):
+    # Re-read under the lock so concurrent edits from other sessions are kept
+    with _lock, _file_lock(path):
+        classrooms = dict(_entry(path)[1])
+        change(classrooms)
+        _write(classrooms, path)
+
+
+def _write(classrooms, path):
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".classrooms-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(classrooms, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    classrooms = dict(classrooms)
+    _cache[path] = (_stamp(path), classrooms, {name: compile_room(cfg) for name, cfg in classrooms.items()})
+
+
+class _file_lock:
+    """Advisory lock on '<path>.lock' against other processes, where supported."""
+
+    def __init__(self, path):
+        self.path = path + ".lock"
+        self.f = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self.f = open(self.path, "a")
+            fcntl.flock(self.f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.f is not None:
+            fcntl.flock(self.f, fcntl.LOCK_UN)
+            self.f.close()
@@ -0,0 +1,240 @@
+import hashlib
+import hmac
+import math
+import os
+import threading
+import time
+from collections import deque
+
+from db_client import call_many, key_order
+from instrumentation import span
+
+LOGIN_PAGE = 1000  # student nodes per ranged read
+REFRESH_INTERVAL = 60  # seconds between incremental refreshes
+RECHECK_AFTER = 300  # seconds before a wrong password is re-checked against the database
+MAX_FAILURES = 5  # failed logins per ID within FAILURE_WINDOW before it is locked
+FAILURE_WINDOW = 300  # seconds
+APP_NODES = {"seating", "admin_seating", "seating_index"}  # root nodes that are not students
+_BAD_KEY_CHARS = set(".$#[]/")
+
+
+class TooManyAttempts(Exception):
+    """Raised by CredentialIndex.verify while an ID is locked out."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too many failed logins; retry in {math.ceil(retry_after)} s.")
+        self.retry_after = retry_after
+
+
+def normalize(uid):
+    return str(uid).strip().upper()
+
+
+def student_key(key):
+    """Whether a root key can be a student node: a legal Firebase key that is not app data."""
+    return bool(key) and key not in APP_NODES and not _BAD_KEY_CHARS & set(key) and len(key) <= 768
+
+
+def _password(node):
+    """The password of a student node ({"A": ..., "B": password}), or None."""
+    if isinstance(node, dict):
+        node = node.get("B")
+    elif isinstance(node, list):
+        node = None
+    return None if node is None or node == "" else str(node)
+
+
+class CredentialIndex:
+    """
+    In-memory index of student passwords for the login form, so logins
+    are checked locally instead of with a database read each. Student
+    nodes (`<reg>/B` at the root) are bulk-loaded in key-range pages and
+    kept as keyed, salted BLAKE2 digests under the normalized
+    registration number; plaintext is never stored. refresh() picks up
+    new and removed students from one shallow read of the root.
+
+    IDs missing from the index, and wrong passwords for entries older
+    than `recheck_after`, fall back to one database read, so changed
+    passwords are seen without a reload. An ID with `max_failures`
+    failed logins inside `window` seconds is locked until the oldest one
+    expires, which also caps the database reads a guesser can cause.
+    """
+
+    def __init__(self, db, page_size=LOGIN_PAGE, recheck_after=RECHECK_AFTER, max_failures=MAX_FAILURES,
+                 window=FAILURE_WINDOW, clock=time.monotonic):
+        self.db = db
+        self.page_size = page_size
+        self.recheck_after = recheck_after
+        self.max_failures = max_failures
+        self.window = window
+        self.clock = clock
+        self._secret = os.urandom(32)
+        self._entries = {}  # reg -> (root key, salt, digest, checked_at)
+        self._others = set()  # root keys read that hold no password
+        self._failures = {}  # reg -> deque of failure times
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.loaded = False
+        self.hits = self.fallbacks = self.rejected = self.locked = 0
+
+    # --- Loading ---
+
+    def load(self):
+        """Replace the index with every student node in the database."""
+        root = self._root_keys()
+        self._others = set()
+        entries = self._read_entries({key for key in root if student_key(key)}, root)
+        with self._lock:
+            self._entries = entries
+            self.loaded = True
+        return len(entries)
+
+    def refresh(self):
+        """Add students that appeared since the last load and drop those that were removed."""
+        root = self._root_keys()
+        with self._lock:
+            known = {entry[0] for entry in self._entries.values()} | self._others
+        entries = self._read_entries({key for key in root if student_key(key) and key not in known}, root)
+        present = set(root)
+        with self._lock:
+            self._entries = {reg: entry for reg, entry in self._entries.items() if entry[0] in present}
+            self._entries.update(entries)
+        return len(entries)
+
+    def _root_keys(self):
+        """Every key at the root, in Firebase's key order, from one shallow read."""
+        return sorted(self.db.reference("/").get(shallow=True) or {}, key=key_order)
+
+    def _read_entries(self, wanted, root):
+        """
+        Index entries for the `wanted` root keys, read as key ranges of at
+        most page_size nodes that never span another root key, so app data
+        such as `seating/` is not pulled in with the students.
+        """
+        ranges, run = [], []
+        for key in root:
+            if key in wanted:
+                run.append(key)
+            if run and (key not in wanted or len(run) == self.page_size):
+                ranges.append((run[0], run[-1]))
+                run = []
+        if run:
+            ranges.append((run[0], run[-1]))
+
+        entries = {}
+        now = self.clock()
+        with span("logins.load", f"{len(wanted)} students"):
+            for page in call_many(self.db, _read_range, ranges):
+                for key, node in (page or {}).items():
+                    password = _password(node)
+                    if password is not None and student_key(key):
+                        entries[normalize(key)] = (key, *self._hash(password), now)
+                    else:
+                        self._others.add(key)
+        return entries
+
+    def _hash(self, password, salt=None):
+        salt = salt or os.urandom(16)
+        digest = hashlib.blake2b(password.encode(), key=self._secret, salt=salt, digest_size=32).digest()
+        return salt, digest
+
+    # --- Background refresh ---
+
+    def start(self, interval=REFRESH_INTERVAL):
+        """Load in the background, then refresh every `interval` seconds until stop()."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="credential-index", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval):
+        step = self.load
+        while not self._stop.is_set():
+            try:
+                step()
+                step = self.refresh
+            except Exception:
+                pass  # database down: logins fall back to direct reads; try again next interval
+            self._stop.wait(interval)
+
+    # --- Logins ---
+
+    def verify(self, uid, password):
+        """
+        The normalized registration number if `password` is right for
+        `uid`, else None. Raises TooManyAttempts while the ID is locked.
+        """
+        reg = normalize(uid)
+        if not student_key(reg):
+            return None
+        self._check_lock(reg)
+        password = str(password)
+
+        with self._lock:
+            entry = self._entries.get(reg)
+        if entry is not None:
+            key, salt, digest, checked_at = entry
+            if hmac.compare_digest(self._hash(password, salt)[1], digest):
+                with self._lock:
+                    self.hits += 1
+                    self._failures.pop(reg, None)
+                return reg
+            if self.clock() - checked_at < self.recheck_after:
+                return self._fail(reg)
+            keys = [key]
+        else:
+            keys = list(dict.fromkeys(k for k in (str(uid).strip(), reg) if student_key(k)))
+
+        # Not indexed, or possibly a changed password: ask the database
+        with self._lock:
+            self.fallbacks += 1
+        for key in keys:
+            stored = _password(self.db.reference(f"{key}/B").get())
+            if stored is None:
+                continue
+            with self._lock:
+                self._entries[reg] = (key, *self._hash(stored), self.clock())
+            if hmac.compare_digest(stored.encode(), password.encode()):
+                with self._lock:
+                    self._failures.pop(reg, None)
+                return reg
+            break
+        return self._fail(reg)
+
+    def _check_lock(self, reg):
+        now = self.clock()
+        with self._lock:
+            failures = self._failures.get(reg)
+            while failures and now - failures[0] >= self.window:
+                failures.popleft()
+            if failures is not None and len(failures) >= self.max_failures:
+                self.locked += 1
+                raise TooManyAttempts(self.window - (now - failures[0]))
+
+    def _fail(self, reg):
+        now = self.clock()
+        with self._lock:
+            self.rejected += 1
+            self._failures.setdefault(reg, deque()).append(now)
+            if len(self._failures) > 10 * max(len(self._entries), 1000):
+                # Forget IDs whose failures have all expired, so guessing random IDs cannot grow this forever
+                self._failures = {r: f for r, f in self._failures.items() if f and now - f[-1] < self.window}
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {"students": len(self._entries), "loaded": self.loaded, "hits": self.hits,
+                    "fallbacks": self.fallbacks, "rejected": self.rejected, "locked": self.locked}
+
+
+def _read_range(db, bounds):
+    first, last = bounds
+    return db.reference("/").order_by_key().start_at(first).end_at(last).get()
@@ -0,0 +1,236 @@
+import copy
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+DB_WORKERS = 16
+RETRIES = 3
+BACKOFF = 0.2  # seconds before the first retry; doubles per attempt, with full jitter
+TRANSIENT_CODES = {"UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL", "RESOURCE_EXHAUSTED", "ABORTED", "UNKNOWN"}
+
+_local = threading.local()
+
+
+def transient(exc):
+    """Whether a failed call is worth retrying: network errors and Firebase's retryable codes."""
+    if isinstance(exc, OSError):  # includes requests' ConnectionError and Timeout
+        return True
+    return getattr(exc, "code", None) in TRANSIENT_CODES
+
+
+def _segments(path):
+    return tuple(part for part in str(path).split("/") if part)
+
+
+def key_order(key):
+    """Firebase's key order: 32-bit integer keys numerically, then strings."""
+    key = str(key)
+    if key.lstrip("-").isdigit() and key == str(int(key)) and -2**31 <= int(key) < 2**31:
+        return (0, int(key), "")
+    return (1, 0, key)
+
+
+def to_tree(value):
+    """Store lists the way Firebase does: as objects keyed by index."""
+    if isinstance(value, list):
+        value = {str(i): v for i, v in enumerate(value)}
+    if isinstance(value, dict):
+        tree = {str(k): to_tree(v) for k, v in value.items()}
+        return {k: v for k, v in tree.items() if v is not None and v != {}} or None
+    return value
+
+
+def from_tree(value):
+    """Return index-keyed objects as lists, mirroring Firebase's array heuristic."""
+    if not isinstance(value, dict):
+        return value
+    value = {k: from_tree(v) for k, v in value.items()}
+    if value and all(k.isdigit() for k in value):
+        top = max(int(k) for k in value)
+        if len(value) * 2 > top + 1:
+            return [value.get(str(i)) for i in range(top + 1)]
+    return value
+
+
+def _overlaps(a, b):
+    n = min(len(a), len(b))
+    return a[:n] == b[:n]
+
+
+def _read(db, path, shallow=False):
+    ref = db.reference(path)
+    return ref.get(shallow=True) if shallow else ref.get()
+
+
+class DbClient:
+    """
+    Data-access layer over `firebase_admin.db` (or FakeDb, InstrumentedDb)
+    with the same reference(path).get/set/update/delete interface, so
+    existing call sites work unchanged. Identical reads already in flight
+    are merged into one request, transient failures are retried with
+    exponential backoff, and get_many/update_many run independent calls
+    on a bounded thread pool over the SDK's pooled HTTP session.
+    """
+
+    def __init__(self, db, max_workers=DB_WORKERS, retries=RETRIES, backoff=BACKOFF, sleep=time.sleep):
+        self._db = db
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self._sleep = sleep
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="db", initializer=_mark_worker)
+        self._inflight = {}  # (path segments, shallow) -> Future of the read being made
+        self._lock = threading.Lock()
+        self.requests = self.coalesced = self.retried = 0
+        _widen_connection_pool(db, max_workers)
+
+    def reference(self, path="/"):
+        return ClientReference(self, path)
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    def stats(self):
+        with self._lock:
+            return {"workers": self.max_workers, "in_flight": len(self._inflight), "requests": self.requests,
+                    "coalesced": self.coalesced, "retried": self.retried}
+
+    # --- Calls ---
+
+    def call(self, fn, *args):
+        """fn(*args), retried with exponential backoff while it fails transiently."""
+        for attempt in range(self.retries + 1):
+            with self._lock:
+                self.requests += 1
+            try:
+                return fn(*args)
+            except Exception as e:
+                if attempt == self.retries or not transient(e):
+                    raise
+                with self._lock:
+                    self.retried += 1
+            self._sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    def get(self, path, shallow=False):
+        """Read `path`; callers asking for a path already being read share that request."""
+        key = (_segments(path), bool(shallow))
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return copy.deepcopy(future.result())  # the leader's caller may mutate its copy
+
+        try:
+            value = self.call(_read, self._db, path, shallow)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+
+    def write(self, path, method, *args):
+        """set/update/delete at `path`; reads in flight over the written paths are not joined afterwards."""
+        base = _segments(path)
+        written = [base + _segments(child) for child in args[0]] if method == "update" else [base]
+        with self._lock:
+            for key in [key for key in self._inflight if any(_overlaps(key[0], w) for w in written)]:
+                del self._inflight[key]
+        return self.call(lambda: getattr(self._db.reference(path), method)(*args))
+
+    # --- Batches ---
+
+    def _map(self, fn, items):
+        items = list(items)
+        if len(items) < 2 or getattr(_local, "worker", False):  # no pool-in-pool waits
+            return [fn(item) for item in items]
+        futures = [self._pool.submit(fn, item) for item in items]
+        wait(futures)
+        return [future.result() for future in futures]
+
+    def get_many(self, paths, shallow=False):
+        """Values at `paths`, in order, read concurrently."""
+        return self._map(lambda path: self.get(path, shallow), paths)
+
+    def update_many(self, path, updates):
+        """Apply several multi-location update dicts at `path` concurrently."""
+        self._map(lambda chunk: self.write(path, "update", chunk), updates)
+
+
+class ClientReference:
+    def __init__(self, client, path):
+        self._client = client
+        self._path = path
+
+    def child(self, path):
+        return ClientReference(self._client, f"{str(self._path).rstrip('/')}/{path}")
+
+    def get(self, shallow=False):
+        return self._client.get(self._path, shallow)
+
+    def set(self, value):
+        return self._client.write(self._path, "set", value)
+
+    def update(self, value):
+        return self._client.write(self._path, "update", value)
+
+    def delete(self):
+        return self._client.write(self._path, "delete")
+
+    def __getattr__(self, name):
+        # listen(), key, path, ... straight from the wrapped reference
+        return getattr(self._client._db.reference(self._path), name)
+
+
+def _mark_worker():
+    _local.worker = True
+
+
+def _widen_connection_pool(db, size):
+    """
+    firebase_admin shares one requests.Session per database, whose adapter
+    keeps 10 connections; let it keep one per worker, with the SDK's own
+    retry settings, so concurrent calls reuse connections.
+    """
+    try:
+        session = db.reference("/")._client.session
+        adapter = session.get_adapter("https://")
+    except Exception:
+        return  # FakeDb, or an SDK without a shared session
+    from requests.adapters import HTTPAdapter
+    session.mount("https://", HTTPAdapter(pool_connections=size, pool_maxsize=size, max_retries=adapter.max_retries))
+
+
+# --- Helpers for plain databases too ---
+
+def get_many(db, paths, shallow=False):
+    """Values at `paths`: concurrent through a DbClient, one by one otherwise."""
+    if isinstance(db, DbClient):
+        return db.get_many(paths, shallow)
+    return [_read(db, path, shallow) for path in paths]
+
+
+def update_many(db, path, updates):
+    """Apply several update dicts at `path`: concurrent through a DbClient, one by one otherwise."""
+    if isinstance(db, DbClient):
+        db.update_many(path, updates)
+    else:
+        root = db.reference(path)
+        for chunk in updates:
+            root.update(chunk)
+
+
+def call_many(db, fn, items):
+    """fn(raw_db, item) per item, in order: concurrent and retried through a DbClient, one by one otherwise."""
+    if isinstance(db, DbClient):
+        return db._map(lambda item: db.call(fn, db._db, item), items)
+    return [fn(db, item) for item in items]
@@ -0,0 +1,211 @@
+import copy
+import random
+import threading
+import time
+
+from db_client import from_tree as _from_tree, key_order, to_tree as _to_tree
+
+
+class FakeDb:
+    """
+    In-process stand-in for `firebase_admin.db`, backed by a nested dict.
+    Only the calls this app makes are supported: reference(path) with
+    get/set/update/delete/listen, and order_by_key() range queries.
+    `requests` counts round trips a real database would have served.
+    Listeners are called synchronously on the writing thread, which is
+    enough to stand in for the realtime stream in tests.
+
+    To stand in for the network, every call can wait `latency` seconds
+    (a number or a zero-argument callable) before touching the tree,
+    outside the lock so concurrent calls overlap, and fail with
+    FakeUnavailable at `failure_rate`.
+    """
+
+    def __init__(self, data=None, latency=0.0, failure_rate=0.0, seed=0):
+        self.data = _to_tree(data) if data is not None else {}
+        self.requests = 0
+        self.failures = 0
+        self.lock = threading.RLock()
+        self.listeners = []
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+
+    def reference(self, path="/"):
+        return FakeReference(self, _split(path))
+
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency() if callable(self.latency) else self.latency)
+        if self.failure_rate:
+            with self.lock:
+                failed = self._random.random() < self.failure_rate
+                if failed:
+                    self.requests += 1
+                    self.failures += 1
+            if failed:
+                raise FakeUnavailable("Simulated network failure.")
+
+    # --- Tree access ---
+
+    def _get(self, parts):
+        node = self.data
+        for part in parts:
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    def _notify(self, parts, value):
+        for listener in list(self.listeners):
+            prefix = listener.parts
+            if parts[:len(prefix)] == prefix:
+                rel = "/" + "/".join(parts[len(prefix):])
+                listener.callback(FakeEvent("put", rel, copy.deepcopy(value)))
+            elif prefix[:len(parts)] == parts:
+                listener.callback(FakeEvent("put", "/", copy.deepcopy(self._get(prefix))))
+
+    def _set(self, parts, value):
+        self._write(parts, value)
+        self._notify(parts, value)
+
+    def _write(self, parts, value):
+        value = _to_tree(value)
+        if not parts:
+            self.data = value if isinstance(value, dict) else {}
+            return
+        trail, node = [], self.data
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                if value is None:
+                    return
+                child = node[part] = {}
+            trail.append((node, part))
+            node = child
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = value
+        # Firebase drops parents left without children
+        for parent, part in reversed(trail):
+            if parent[part]:
+                break
+            del parent[part]
+
+
+class FakeReference:
+    def __init__(self, fake, parts):
+        self._fake = fake
+        self._parts = parts
+
+    @property
+    def key(self):
+        return self._parts[-1] if self._parts else None
+
+    @property
+    def path(self):
+        return "/" + "/".join(self._parts)
+
+    def child(self, path):
+        return FakeReference(self._fake, self._parts + _split(path))
+
+    def get(self, shallow=False):
+        self._fake._round_trip()
+        with self._fake.lock:
+            self._fake.requests += 1
+            value = self._fake._get(self._parts)
+            if shallow and isinstance(value, dict):
+                return {k: (True if isinstance(v, dict) else v) for k, v in value.items()}
+            return _from_tree(copy.deepcopy(value))
+
+    def set(self, value):
+        self._fake._round_trip()
+        with self._fake.lock:
+            self._fake.requests += 1
+            self._fake._set(self._parts, value)
+
+    def update(self, value):
+        if not value or not isinstance(value, dict):
+            raise ValueError("Value argument must be a non-empty dictionary.")
+        self._fake._round_trip()
+        with self._fake.lock:
+            self._fake.requests += 1
+            for path, child in value.items():
+                self._fake._set(self._parts + _split(path), child)
+
+    def delete(self):
+        self.set(None)
+
+    def order_by_key(self):
+        return FakeQuery(self._fake, self._parts)
+
+    def listen(self, callback):
+        """Register `callback(event)`; like Firebase, the current value arrives first."""
+        listener = FakeListener(self._fake, self._parts, callback)
+        with self._fake.lock:
+            self._fake.listeners.append(listener)
+            callback(FakeEvent("put", "/", _from_tree(copy.deepcopy(self._fake._get(self._parts)))))
+        return listener
+
+
+class FakeQuery:
+    """order_by_key() with start_at/end_at/limit_to_first, in Firebase's key order."""
+
+    def __init__(self, fake, parts):
+        self._fake = fake
+        self._parts = parts
+        self._start = self._end = self._limit = None
+
+    def start_at(self, key):
+        self._start = key_order(key)
+        return self
+
+    def end_at(self, key):
+        self._end = key_order(key)
+        return self
+
+    def limit_to_first(self, limit):
+        self._limit = limit
+        return self
+
+    def get(self):
+        self._fake._round_trip()
+        with self._fake.lock:
+            self._fake.requests += 1
+            node = self._fake._get(self._parts)
+            if not isinstance(node, dict):
+                return {}
+            keys = [k for k in sorted(node, key=key_order)
+                    if (self._start is None or key_order(k) >= self._start)
+                    and (self._end is None or key_order(k) <= self._end)]
+            return {k: _from_tree(copy.deepcopy(node[k])) for k in keys[:self._limit]}
+
+
+class FakeUnavailable(ConnectionError):
+    """A dropped connection, as requests would raise it."""
+
+
+class FakeEvent:
+    def __init__(self, event_type, path, data):
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+
+class FakeListener:
+    def __init__(self, fake, parts, callback):
+        self.fake = fake
+        self.parts = parts
+        self.callback = callback
+
+    def close(self):
+        with self.fake.lock:
+            if self in self.fake.listeners:
+                self.fake.listeners.remove(self)
+
+
+# --- Helpers ---
+
+def _split(path):
+    return [part for part in str(path).split("/") if part]
@@ -0,0 +1,145 @@
+import io
+import zipfile
+import zlib
+from itertools import groupby
+from operator import itemgetter
+
+import numpy as np
+
+from classroom_registry import room_name
+from instrumentation import timed
+from pdf_writer import A4, PdfWriter, text_line
+from process_pool import map_batches, worker_count
+from seat_visualizer import room_image, room_stream, seat_highlight
+
+PAGE_W, PAGE_H = A4
+MARGIN = 50
+DIAGRAM_H = 430
+DETAIL_FIELDS = ["Subject", "Date", "Time", "Classroom", "Row", "Column"]
+TICKET_BATCH = 250  # tickets per process-pool task
+
+
+# --- Room diagrams ---
+# The student portal's picture of the room (seat_visualizer.room_image) is
+# embedded as an image once per room, its deflated rows reused as they are,
+# and the student's desk is a small recoloured patch drawn over it.
+
+def room_geometry(cfg):
+    """(rows, cols, layout key) of a classroom config or compiled RoomPlan."""
+    mask = getattr(cfg, "mask", None)
+    if mask is not None:
+        layout = None if mask.all() else mask
+        rows, cols = mask.shape
+    else:
+        rows, cols, layout = int(cfg.get("rows", 1)), int(cfg.get("cols", 1)), cfg.get("layout")
+    key = tuple(map(tuple, np.asarray(layout, dtype=int).tolist())) if layout is not None and len(layout) else None
+    return rows, cols, key
+
+
+# --- Tickets ---
+
+@timed("tickets.pdf")
+def ticket_pdf(reg, records, classrooms):
+    """
+    One student's hall ticket: a page per exam with its details and the
+    room diagram, the student's desk highlighted. `classrooms` maps room
+    names to configs (classrooms.json entries or RoomPlans).
+    """
+    records = sorted(records, key=lambda rec: (str(rec.get("Date", "")), str(rec.get("Time", ""))))
+    pages, rooms, desks = [], {}, []  # room geometry -> XObject name; (name, desk pixels)
+    for number, rec in enumerate(records, 1):
+        ops = [
+            text_line(MARGIN, PAGE_H - 70, "HALL TICKET", 20, bold=True),
+            text_line(MARGIN, PAGE_H - 95, f"Registration Number: {reg}", 12, bold=True),
+            text_line(PAGE_W - MARGIN - 80, PAGE_H - 70, f"Exam {number} of {len(records)}", 10),
+        ]
+        y = PAGE_H - 130
+        for field in DETAIL_FIELDS:
+            ops.append(text_line(MARGIN, y, f"{field}:", 11, bold=True))
+            ops.append(text_line(MARGIN + 80, y, rec.get(field, ""), 11))
+            y -= 18
+
+        used = []
+        cfg = classrooms.get(room_name(str(rec.get("Classroom", ""))))
+        if cfg is not None:
+            geometry = room_geometry(cfg)
+            width, height = room_image(*geometry)[0].shape[1::-1]
+            name = rooms.setdefault(geometry, f"R{len(rooms)}")
+            used.append(name)
+
+            scale = min((PAGE_W - 2 * MARGIN) / width, DIAGRAM_H / height)
+            ix, iy = MARGIN, y - 20 - height * scale
+            ops.append(f"q {width * scale:.2f} 0 0 {height * scale:.2f} {ix:.2f} {iy:.2f} cm /{name} Do Q")
+            desk = seat_highlight(*geometry[:2], int(rec.get("Row", 0)) - 1, int(rec.get("Column", 0)) - 1,
+                                  geometry[2])
+            if desk is not None:
+                (x0, y0, x1, y1), pixels = desk
+                used.append(f"S{len(desks)}")
+                desks.append((used[-1], pixels))
+                ops.append(f"q {(x1 - x0) * scale:.2f} 0 0 {(y1 - y0) * scale:.2f} "
+                           f"{ix + x0 * scale:.2f} {iy + (height - y1) * scale:.2f} cm /{used[-1]} Do Q")
+            ops.append(text_line(MARGIN, iy - 18,
+                                 "Your desk is shown in green. The board is at the top, the door on the left.", 9))
+        else:
+            ops.append(text_line(MARGIN, y - 20, "Room layout unavailable.", 10))
+        pages.append(("\n".join(ops), used))
+
+    if not pages:
+        pages.append(("\n".join([text_line(MARGIN, PAGE_H - 70, "HALL TICKET", 20, bold=True),
+                                 text_line(MARGIN, PAGE_H - 95, f"Registration Number: {reg}", 12, bold=True),
+                                 text_line(MARGIN, PAGE_H - 130, "No exams allocated yet.", 11)]), []))
+
+    out = io.BytesIO()
+    pdf = PdfWriter(out, A4)
+    for geometry, name in rooms.items():
+        pdf.add_image(name, *room_stream(*geometry), png_rows=True)
+    for name, pixels in desks:
+        pdf.add_image(name, pixels.shape[1], pixels.shape[0], zlib.compress(pixels.tobytes(), 6))
+    for content, used in pages:
+        pdf.add_page(content, used)
+    pdf.close()
+    return out.getvalue()
+
+
+def student_tickets(seating_df):
+    """(reg, records) per student of a seating frame, in registration order."""
+    ordered = seating_df.sort_values("Registration Number", kind="stable")
+    for reg, records in groupby(ordered.to_dict(orient="records"), key=itemgetter("Registration Number")):
+        yield reg, list(records)
+
+
+@timed("tickets.zip")
+def write_ticket_zip(fileobj, tickets, classrooms, max_workers=None):
+    """
+    Stream tickets into a zip as they are built, one `<reg>.pdf` each.
+    `tickets` yields (reg, records). With more than one core, batches of
+    tickets are built on a process pool, each worker drawing every room
+    once; only a few batches are in flight, so memory stays bounded.
+    PDFs are stored, not deflated: their room diagrams already are.
+    Returns the number of tickets written.
+    """
+    count = 0
+    with zipfile.ZipFile(fileobj, "w", zipfile.ZIP_STORED) as archive:
+        if worker_count(max_workers) == 1:
+            for reg, records in tickets:
+                archive.writestr(f"{reg}.pdf", ticket_pdf(reg, records, classrooms))
+                count += 1
+            return count
+
+        for batch in map_batches(_ticket_batch, tickets, TICKET_BATCH, max_workers,
+                                 initializer=_init_worker, initargs=(classrooms,)):
+            for reg, pdf in batch:
+                archive.writestr(f"{reg}.pdf", pdf)
+                count += 1
+    return count
+
+
+_worker = {}
+
+
+def _init_worker(classrooms):
+    _worker["classrooms"] = classrooms
+
+
+def _ticket_batch(batch):
+    return [(reg, ticket_pdf(reg, records, _worker["classrooms"])) for reg, records in batch]
@@ -0,0 +1,230 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+BUFFER_SIZE = 10_000
+
+_state = {
+    "enabled": os.environ.get("SEATING_PERF", "0") != "0",
+    "sizes": os.environ.get("SEATING_PERF_SIZES", "0") != "0",  # JSON-size db payloads (costs a json.dumps each)
+    "jsonl": os.environ.get("SEATING_PERF_JSONL"),  # append every event here when set
+}
+_events = deque(maxlen=BUFFER_SIZE)  # (timestamp, name, seconds, bytes, detail)
+_export_lock = threading.Lock()
+_jsonl = {"path": None, "file": None}  # the open JSONL handle, reopened when the path changes
+
+
+def enabled():
+    return _state["enabled"]
+
+
+def sizes_enabled():
+    return _state["sizes"]
+
+
+def enable(flag=True, jsonl=None, sizes=None):
+    """Turn recording on or off; `sizes` also records db payload sizes, `jsonl` sets ('' clears) the event file."""
+    _state["enabled"] = bool(flag)
+    if sizes is not None:
+        _state["sizes"] = bool(sizes)
+    if jsonl is not None:
+        _state["jsonl"] = jsonl or None
+
+
+# --- Spans ---
+
+class _Span:
+    __slots__ = ("name", "detail", "bytes", "start")
+
+    def __init__(self, name, detail):
+        self.name = name
+        self.detail = detail
+        self.bytes = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start, self.bytes, self.detail)
+
+
+class _NoSpan:
+    __slots__ = ()
+    bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name, detail=None):
+    """Time a block; set `.bytes` on the span to record payload size. Free when disabled."""
+    return _Span(name, detail) if _state["enabled"] else _NO_SPAN
+
+
+def timed(name):
+    """Decorator form of span()."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not _state["enabled"]:
+                return fn(*args, **kwargs)
+            with _Span(name, None):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def record(name, seconds, nbytes=0, detail=None):
+    event = (time.time(), name, seconds, nbytes, detail)
+    _events.append(event)
+    if _state["jsonl"]:
+        with _export_lock:
+            _jsonl_file().write(json.dumps(_event_dict(event)) + "\n")
+
+
+def _jsonl_file():
+    # Called under _export_lock; line-buffered so every event reaches the file as it is written
+    if _jsonl["path"] != _state["jsonl"]:
+        if _jsonl["file"] is not None:
+            _jsonl["file"].close()
+        _jsonl["file"] = open(_state["jsonl"], "a", buffering=1)
+        _jsonl["path"] = _state["jsonl"]
+    return _jsonl["file"]
+
+
+# --- Reports ---
+
+def _event_dict(event):
+    ts, name, seconds, nbytes, detail = event
+    return {"ts": ts, "name": name, "ms": round(seconds * 1000, 3), "bytes": nbytes, "detail": detail}
+
+
+def summary():
+    """Per-span count, p50/p95/max latency (ms), total time and bytes over the ring buffer."""
+    grouped = {}
+    for _, name, seconds, nbytes, _ in list(_events):
+        grouped.setdefault(name, ([], []))
+        grouped[name][0].append(seconds)
+        grouped[name][1].append(nbytes)
+
+    rows = []
+    for name, (seconds, nbytes) in sorted(grouped.items()):
+        ms = np.asarray(seconds) * 1000
+        rows.append({
+            "span": name,
+            "count": len(ms),
+            "p50_ms": round(float(np.percentile(ms, 50)), 3),
+            "p95_ms": round(float(np.percentile(ms, 95)), 3),
+            "max_ms": round(float(ms.max()), 3),
+            "total_s": round(float(ms.sum()) / 1000, 3),
+            "bytes": int(sum(nbytes)),
+        })
+    return rows
+
+
+def export_jsonl(path=None):
+    """Buffered events as JSON lines; written to `path` when given."""
+    text = "".join(json.dumps(_event_dict(e)) + "\n" for e in list(_events))
+    if path:
+        with open(path, "w") as f:
+            f.write(text)
+    return text
+
+
+def clear():
+    _events.clear()
+
+
+# --- Firebase ---
+
+def _payload_size(value):
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _record_call(name, path, start, payload):
+    """Record a db call timed from `start`; the payload is sized only after the clock stops."""
+    seconds = time.perf_counter() - start
+    record(name, seconds, _payload_size(payload) if _state["sizes"] else 0, path)
+
+
+class InstrumentedDb:
+    """
+    Wraps `firebase_admin.db` (or FakeDb) so every reference call is
+    timed, and with sizes enabled, sized outside the timing.
+    """
+
+    def __init__(self, db):
+        self._db = db
+
+    def reference(self, path="/", *args, **kwargs):
+        return InstrumentedReference(self._db.reference(path, *args, **kwargs), path)
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+
+class InstrumentedReference:
+    def __init__(self, ref, path):
+        self._ref = ref
+        self._path = path
+
+    def child(self, path):
+        return InstrumentedReference(self._ref.child(path), f"{self._path.rstrip('/')}/{path}")
+
+    def get(self, *args, **kwargs):
+        if not _state["enabled"]:
+            return self._ref.get(*args, **kwargs)
+        start, value = time.perf_counter(), None
+        try:
+            value = self._ref.get(*args, **kwargs)
+            return value
+        finally:
+            _record_call("db.get", self._path, start, value)
+
+    def set(self, value):
+        if not _state["enabled"]:
+            return self._ref.set(value)
+        start = time.perf_counter()
+        try:
+            return self._ref.set(value)
+        finally:
+            _record_call("db.set", self._path, start, value)
+
+    def update(self, value):
+        if not _state["enabled"]:
+            return self._ref.update(value)
+        start = time.perf_counter()
+        try:
+            return self._ref.update(value)
+        finally:
+            _record_call("db.update", self._path, start, value)
+
+    def delete(self):
+        if not _state["enabled"]:
+            return self._ref.delete()
+        start = time.perf_counter()
+        try:
+            return self._ref.delete()
+        finally:
+            _record_call("db.delete", self._path, start, None)
+
+    def __getattr__(self, name):
+        return getattr(self._ref, name)
@@ -0,0 +1,546 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from db_client import from_tree, get_many, to_tree, update_many
+from seating_store import CHUNK_SIZE, decode_session, forget_session, is_compact, parse_session_key, seat_children
+
+LOCAL_DB_FILE = "seating_local.db"
+SYNC_INTERVAL = 2  # seconds between outbox pushes
+PULL_INTERVAL = 300  # seconds between full checks for remote changes when no listener is running
+SYNC_BATCH = 20_000  # outbox rows per push
+
+# Root nodes served locally: table and the key columns under the root
+TABLES = {
+    "admin_seating": ("sessions", ("key",)),
+    "seating": ("seats", ("reg", "key")),
+    "seating_index": ("session_index", ("key", "reg")),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (key TEXT PRIMARY KEY, subject TEXT, date TEXT, value TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS sessions_subject_date ON sessions (subject, date);
+CREATE TABLE IF NOT EXISTS seats (reg TEXT, key TEXT, value TEXT NOT NULL, PRIMARY KEY (reg, key));
+CREATE INDEX IF NOT EXISTS seats_key ON seats (key);
+CREATE TABLE IF NOT EXISTS session_index (key TEXT, reg TEXT, value TEXT NOT NULL, PRIMARY KEY (key, reg));
+CREATE TABLE IF NOT EXISTS outbox (seq INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT NOT NULL, value TEXT NOT NULL,
+                                   session TEXT);
+CREATE INDEX IF NOT EXISTS outbox_session ON outbox (session);
+CREATE TABLE IF NOT EXISTS synced (key TEXT PRIMARY KEY, digest TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS conflicts (key TEXT PRIMARY KEY, remote TEXT, detected REAL);
+"""
+
+Event = namedtuple("Event", "event_type path data")
+
+
+def _split(path):
+    return [part for part in str(path).split("/") if part]
+
+
+def _shallow(value):
+    if isinstance(value, dict):
+        return {k: (True if isinstance(v, dict) else v) for k, v in value.items()}
+    return value
+
+
+def _digest(value):
+    """Fingerprint of a session node as a shallow read returns it; None for a missing node."""
+    value = _shallow(to_tree(value))
+    if value is None:
+        return None
+    return hashlib.sha1(json.dumps(value, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def _session_of(parts):
+    """The session a write belongs to, or None for writes spanning sessions."""
+    if parts[0] in ("admin_seating", "seating_index") and len(parts) > 1:
+        return parts[1]
+    if parts[0] == "seating" and len(parts) > 2:
+        return parts[2]
+    return None
+
+
+def _rows(value, levels):
+    """(key tuple, leaf) pairs of a tree `levels` deep."""
+    if levels == 0:
+        yield (), value
+    elif isinstance(value, dict):
+        for k, child in value.items():
+            for rest, leaf in _rows(child, levels - 1):
+                yield (k, *rest), leaf
+
+
+def _set_in(tree, parts, value):
+    tree = dict(tree) if isinstance(tree, dict) else {}
+    tree[parts[0]] = value if len(parts) == 1 else _set_in(tree.get(parts[0]), parts[1:], value)
+    return to_tree(tree)
+
+
+class LocalDb:
+    """
+    Seating storage on a local SQLite file in front of Firebase, with
+    the `firebase_admin.db` reference(path) interface of FakeDb and
+    DbClient, so seating_store and SeatCache run on it unchanged.
+    `admin_seating/`, `seating/` and `seating_index/` are served from
+    tables keyed by session (indexed on subject and date) and by
+    registration number; every other path goes to `remote`.
+
+    Each local write is committed together with outbox rows, so it
+    survives restarts and network loss. sync() pushes the outbox as
+    chunked multi-location updates. A session whose remote admin node
+    changed since it was last synced (another server re-generated it) is
+    held in `conflicts` until resolve() keeps one side. pull() copies
+    sessions changed remotely; start() runs both in the background,
+    pulling as a listener on `admin_seating` reports changes.
+    """
+
+    def __init__(self, remote, path=LOCAL_DB_FILE, chunk_size=CHUNK_SIZE):
+        self.remote = remote
+        self.chunk_size = chunk_size
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.create_function("session_subject", 1, lambda key: parse_session_key(key)[0], deterministic=True)
+        self._conn.create_function("session_date", 1, lambda key: parse_session_key(key)[1], deterministic=True)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.RLock()  # the connection
+        self._sync_lock = threading.Lock()  # one sync or pull at a time
+        self._listeners = []
+        self._dirty = None  # sessions a remote listener saw change; None: check them all
+        self._remote_listener = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.pushed = self.pulled = 0
+        self.last_sync = self.last_error = None
+
+    def reference(self, path="/"):
+        return LocalReference(self, _split(path))
+
+    def __getattr__(self, name):
+        return getattr(self.remote, name)
+
+    def close(self):
+        self.stop()
+        self._conn.close()
+
+    # --- Reads ---
+
+    def _get(self, parts, shallow=False):
+        table, cols = TABLES[parts[0]]
+        keys, depth = parts[1:], len(cols)
+        with self._lock:
+            if len(keys) < depth:
+                where = "".join(f" AND {col} = ?" for col in cols[:len(keys)])
+                rest = cols[len(keys):]
+                if shallow:
+                    # Children that are objects read as True, without parsing them
+                    leaf = "CASE WHEN substr(value, 1, 1) = '{' THEN 'true' ELSE value END" if len(rest) == 1 else "'true'"
+                    found = self._conn.execute(f"SELECT DISTINCT {rest[0]}, {leaf} FROM {table} WHERE 1{where}", keys)
+                    return {k: json.loads(text) for k, text in found} or None
+                tree = {}
+                for *names, text in self._conn.execute(f"SELECT {', '.join(rest)}, value FROM {table} WHERE 1{where}",
+                                                       keys):
+                    node = tree
+                    for name in names[:-1]:
+                        node = node.setdefault(name, {})
+                    node[names[-1]] = json.loads(text)
+                tree = tree or None
+            else:
+                where = " AND ".join(f"{col} = ?" for col in cols)
+                found = self._conn.execute(f"SELECT value FROM {table} WHERE {where}", keys[:depth]).fetchone()
+                tree = json.loads(found[0]) if found else None
+                for part in keys[depth:]:
+                    tree = tree.get(part) if isinstance(tree, dict) else None
+        return _shallow(tree) if shallow else from_tree(tree)
+
+    # --- Writes ---
+
+    def write(self, writes, record=True):
+        """
+        Apply [(path parts, value)] in one transaction. Each gets an outbox
+        row unless `record` is False (values that came from the remote).
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for parts, value in writes:
+                    self._apply(parts, value)
+                if record:
+                    self._conn.executemany(
+                        "INSERT INTO outbox (path, value, session) VALUES (?, ?, ?)",
+                        [("/".join(parts), json.dumps(to_tree(value)), _session_of(parts)) for parts, value in writes])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        for parts, value in writes:
+            self._notify(parts, value)
+
+    def _apply(self, parts, value):
+        table, cols = TABLES[parts[0]]
+        keys, depth = parts[1:], len(cols)
+        value = to_tree(value)
+        if len(keys) < depth:
+            # A whole subtree of rows is replaced
+            where = "".join(f" AND {col} = ?" for col in cols[:len(keys)])
+            self._conn.execute(f"DELETE FROM {table} WHERE 1{where}", keys)
+            self._conn.executemany(self._insert(table), [(*keys, *rest, json.dumps(leaf, separators=(",", ":")))
+                                                          for rest, leaf in _rows(value, depth - len(keys))])
+            return
+
+        row, inner = keys[:depth], keys[depth:]
+        where = " AND ".join(f"{col} = ?" for col in cols)
+        if inner:
+            found = self._conn.execute(f"SELECT value FROM {table} WHERE {where}", row).fetchone()
+            value = _set_in(json.loads(found[0]) if found else None, inner, value)
+        if value is None:
+            self._conn.execute(f"DELETE FROM {table} WHERE {where}", row)
+        else:
+            self._conn.execute(self._insert(table), (*row, json.dumps(value, separators=(",", ":"))))
+
+    def _insert(self, table):
+        if table == "sessions":
+            # subject and date are derived from the key, for the (subject, date) index
+            return ("INSERT OR REPLACE INTO sessions (key, subject, date, value) "
+                    "VALUES (?1, session_subject(?1), session_date(?1), ?2)")
+        cols = TABLES["seating" if table == "seats" else "seating_index"][1]
+        return f"INSERT OR REPLACE INTO {table} ({', '.join(cols)}, value) VALUES (?, ?, ?)"
+
+    # --- Listeners ---
+
+    def listen(self, parts, callback):
+        """Firebase-style `callback(event)` for local writes under the path; the first event carries no data."""
+        listener = LocalListener(self, parts, callback)
+        with self._lock:
+            self._listeners.append(listener)
+        callback(Event("put", "/", None))
+        return listener
+
+    def _notify(self, parts, value):
+        for listener in list(self._listeners):
+            prefix = listener.parts
+            if parts[:len(prefix)] == prefix:
+                listener.callback(Event("put", "/" + "/".join(parts[len(prefix):]), value))
+            elif prefix[:len(parts)] == parts:
+                listener.callback(Event("put", "/", None))
+
+    # --- Sync to Firebase ---
+
+    def sync(self, limit=SYNC_BATCH):
+        """
+        Push up to `limit` outbox rows, oldest first. Sessions changed
+        remotely since their last sync are held as conflicts instead, and
+        so is anything spanning sessions queued after them. Returns the
+        number of rows sent.
+        """
+        with self._sync_lock:
+            with self._lock:
+                rows = self._conn.execute("SELECT seq, path, value, session FROM outbox ORDER BY seq LIMIT ?",
+                                          (limit,)).fetchall()
+                held = {key for key, in self._conn.execute("SELECT key FROM conflicts")}
+                synced = dict(self._conn.execute("SELECT key, digest FROM synced"))
+            if not rows:
+                return 0
+
+            # One shallow read per session; a remote node already equal to ours is a retried push, not a conflict
+            sessions = list(dict.fromkeys(row[3] for row in rows if row[3] is not None and row[3] not in held))
+            remote = get_many(self.remote, [f"admin_seating/{key}" for key in sessions], shallow=True)
+            for key, value in zip(sessions, remote):
+                digest = _digest(value)
+                if digest != synced.get(key) and digest != _digest(self._get(["admin_seating", key])):
+                    held.add(key)
+                    with self._lock:
+                        self._conn.execute("INSERT OR REPLACE INTO conflicts VALUES (?, ?, ?)",
+                                           (key, json.dumps(value), time.time()))
+
+            push, waiting = [], False
+            for row in rows:
+                waiting = waiting or row[3] in held
+                if row[3] not in held and not (waiting and row[3] is None):
+                    push.append(row)
+            self._push(push)
+            self.last_sync = time.time()
+            return len(push)
+
+    def _push(self, rows):
+        """
+        Send rows as phases of non-overlapping paths, each phase as
+        concurrent chunked updates, dropping rows as their phase lands.
+        A row overwritten by a later one is not sent.
+        """
+        live, later, superseded = [], set(), []
+        for seq, path, value, _ in reversed(rows):
+            parts = tuple(path.split("/"))
+            if any(parts[:i] in later for i in range(1, len(parts) + 1)):
+                superseded.append(seq)
+                continue
+            later.add(parts)
+            live.append((seq, parts, value))
+
+        phases, current, paths, prefixes = [], [], set(), set()
+        for seq, parts, value in reversed(live):
+            if parts in prefixes or any(parts[:i] in paths for i in range(1, len(parts))):
+                phases.append(current)
+                current, paths, prefixes = [], set(), set()
+            current.append((seq, parts, value))
+            paths.add(parts)
+            prefixes.update(parts[:i] for i in range(1, len(parts) + 1))
+        phases.append(current)
+
+        for phase in phases:
+            items = [("/".join(parts), json.loads(value)) for _, parts, value in phase]
+            update_many(self.remote, "/", [dict(items[i:i + self.chunk_size])
+                                           for i in range(0, len(items), self.chunk_size)])
+            with self._lock, self._conn:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.executemany("DELETE FROM outbox WHERE seq = ?",
+                                       [(seq,) for seq in superseded] + [(seq,) for seq, _, _ in phase])
+                superseded = []
+                for _, parts, value in phase:
+                    if parts == ("admin_seating",):
+                        self._conn.execute("DELETE FROM synced")
+                    elif parts[0] == "admin_seating" and len(parts) == 2:
+                        self._set_synced(parts[1], _digest(json.loads(value)))
+            self.pushed += len(phase)
+
+    def _set_synced(self, key, digest):
+        if digest is None:
+            self._conn.execute("DELETE FROM synced WHERE key = ?", (key,))
+        else:
+            self._conn.execute("INSERT OR REPLACE INTO synced VALUES (?, ?)", (key, digest))
+
+    def conflicts(self):
+        """(session key, remote admin node, detected at) for sessions held back from sync."""
+        with self._lock:
+            found = self._conn.execute("SELECT key, remote, detected FROM conflicts ORDER BY key").fetchall()
+        return [(key, json.loads(remote), detected) for key, remote, detected in found]
+
+    def resolve(self, key, keep="local"):
+        """
+        Settle a conflict: "local" pushes this server's session over the
+        remote one on the next sync, "remote" drops the local writes and
+        copies the remote session.
+        """
+        with self._sync_lock:
+            remote = self.remote.reference(f"admin_seating/{key}").get()
+            theirs = self._remote_regs(key, remote) if keep == "local" else ()
+            with self._lock:
+                self._conn.execute("DELETE FROM conflicts WHERE key = ?", (key,))
+                if keep == "local":
+                    self._set_synced(key, _digest(remote))
+                    # Students only the other writer seated lose their child on the same push
+                    ours = {reg for reg, in self._conn.execute("SELECT reg FROM seats WHERE key = ?", (key,))}
+                    self.write([(["seating", reg, key], None) for reg in theirs if reg not in ours])
+                    return
+                self._conn.execute("DELETE FROM outbox WHERE session = ?", (key,))
+            self._copy_session(key, remote)
+
+    def _remote_regs(self, key, value):
+        """The students a remote admin node seats."""
+        if is_compact(value):
+            return list(decode_session(value)["Registration Number"])
+        if value is not None:
+            return list(self.remote.reference(f"seating_index/{key}").get(shallow=True) or {})
+        return []
+
+    # --- Sync from Firebase ---
+
+    def pull(self, keys=None):
+        """
+        Copy sessions whose remote admin node differs from the one last
+        synced: `keys`, or every session. Sessions with local writes still
+        queued are left to sync(). Returns how many were copied.
+        """
+        with self._sync_lock:
+            with self._lock:
+                synced = dict(self._conn.execute("SELECT key, digest FROM synced"))
+                pending = {key for key, in self._conn.execute("SELECT DISTINCT session FROM outbox")}
+                if keys is None:
+                    keys = set(synced) | {key for key, in self._conn.execute("SELECT key FROM sessions")}
+                    keys |= set(self.remote.reference("admin_seating").get(shallow=True) or {})
+            if None in pending:
+                return 0  # a delete spanning sessions is queued; copying now would undo it locally
+            keys = [key for key in keys if key not in pending]
+            copied = 0
+            for key, value in zip(keys, get_many(self.remote, [f"admin_seating/{key}" for key in keys], shallow=True)):
+                if _digest(value) != synced.get(key):
+                    if value is not None and not is_compact(value):
+                        value = self.remote.reference(f"admin_seating/{key}").get()
+                    copied += self._copy_session(key, value)
+            self.pulled += copied
+            return copied
+
+    def _copy_session(self, key, value):
+        """Replace a local session with the remote `value` and its students' children."""
+        writes = [(["seating_index", key], None), (["admin_seating", key], value)]
+        if is_compact(value):
+            frame = decode_session(value)
+            children = dict(zip(frame["Registration Number"], seat_children(frame)))
+        elif value is not None:
+            # Format 1 keeps its students in the reverse index and their records in their own nodes
+            index = self.remote.reference(f"seating_index/{key}").get(shallow=True) or {}
+            writes[0] = (["seating_index", key], index)
+            children = dict(zip(index, get_many(self.remote, [f"seating/{reg}/{key}" for reg in index])))
+        else:
+            children = {}
+
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM outbox WHERE session = ?", (key,)).fetchone():
+                return 0  # written locally meanwhile; sync() decides
+            stale = [reg for reg, in self._conn.execute("SELECT reg FROM seats WHERE key = ?", (key,))
+                     if reg not in children]
+            writes += [(["seating", reg, key], None) for reg in stale]
+            writes += [(["seating", reg, key], child) for reg, child in children.items()]
+            self.write(writes, record=False)
+            self._set_synced(key, _digest(value))
+        forget_session(key)
+        return 1
+
+    def _on_remote_change(self, event):
+        path = _split(event.path)
+        with self._lock:
+            if not path and event.event_type == "patch" and isinstance(event.data, dict):
+                keys = {_split(child)[0] for child in event.data}
+            elif not path:
+                self._dirty = None  # the whole node: check everything
+                return
+            else:
+                keys = {path[0]}
+            if self._dirty is not None:
+                self._dirty |= keys
+
+    # --- Background sync ---
+
+    def start(self, interval=SYNC_INTERVAL, pull_interval=PULL_INTERVAL):
+        """
+        Every `interval` seconds push the outbox and copy sessions the
+        remote listener saw change; without a listener, check every
+        session each `pull_interval`. Runs until stop().
+        """
+        if self._thread is not None:
+            return
+        try:
+            self._remote_listener = self.remote.reference("admin_seating").listen(self._on_remote_change)
+        except Exception:
+            self._remote_listener = None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval, pull_interval), name="local-sync",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._remote_listener is not None:
+            self._remote_listener.close()
+            self._remote_listener = None
+
+    def _run(self, interval, pull_interval):
+        next_full = 0
+        while not self._stop.is_set():
+            dirty = set()
+            try:
+                while self.sync() == SYNC_BATCH:
+                    pass
+                with self._lock:
+                    dirty, self._dirty = self._dirty, set()
+                if dirty is None or (self._remote_listener is None and time.monotonic() >= next_full):
+                    self.pull()
+                    next_full = time.monotonic() + pull_interval
+                elif dirty:
+                    self.pull(dirty)
+                self.last_error = None
+            except Exception as e:
+                # Offline: the outbox keeps every write until a later round gets through
+                self.last_error = e
+                with self._lock:
+                    if dirty is None:
+                        self._dirty = None
+                    elif self._dirty is not None:
+                        self._dirty |= dirty
+            self._stop.wait(interval)
+
+    def sync_stats(self):
+        with self._lock:
+            pending = self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+            conflicts = self._conn.execute("SELECT COUNT(*) FROM conflicts").fetchone()[0]
+        return {"pending": pending, "conflicts": conflicts, "pushed": self.pushed, "pulled": self.pulled,
+                "last_sync": self.last_sync, "listening": self._remote_listener is not None,
+                "error": str(self.last_error) if self.last_error else None}
+
+
+class LocalReference:
+    def __init__(self, store, parts):
+        self._store = store
+        self._parts = parts
+
+    @property
+    def key(self):
+        return self._parts[-1] if self._parts else None
+
+    @property
+    def path(self):
+        return "/" + "/".join(self._parts)
+
+    def _local(self):
+        return bool(self._parts) and self._parts[0] in TABLES
+
+    def _remote(self):
+        return self._store.remote.reference(self.path)
+
+    def child(self, path):
+        return LocalReference(self._store, self._parts + _split(path))
+
+    def get(self, shallow=False):
+        if self._local():
+            return self._store._get(self._parts, shallow)
+        return self._remote().get(shallow=True) if shallow else self._remote().get()
+
+    def set(self, value):
+        if self._local():
+            self._store.write([(self._parts, value)])
+        else:
+            self._remote().set(value)
+
+    def update(self, value):
+        if not value or not isinstance(value, dict):
+            raise ValueError("Value argument must be a non-empty dictionary.")
+        local, others = [], {}
+        for path, child in value.items():
+            parts = self._parts + _split(path)
+            if parts and parts[0] in TABLES:
+                local.append((parts, child))
+            else:
+                others[path] = child
+        if local:
+            self._store.write(local)
+        if others:
+            self._remote().update(others)
+
+    def delete(self):
+        self.set(None)
+
+    def listen(self, callback):
+        if self._local():
+            return self._store.listen(self._parts, callback)
+        return self._remote().listen(callback)
+
+    def __getattr__(self, name):
+        # order_by_key() and other queries go to the remote database
+        return getattr(self._remote(), name)
+
+
+class LocalListener:
+    def __init__(self, store, parts, callback):
+        self.store = store
+        self.parts = parts
+        self.callback = callback
+
+    def close(self):
+        with self.store._lock:
+            if self in self.store._listeners:
+                self.store._listeners.remove(self)
@@ -0,0 +1,104 @@
+import zlib
+
+A4 = (595, 842)  # points
+A4_LANDSCAPE = (842, 595)
+
+# Helvetica advance widths (1/1000 em) for the characters registration
+# numbers and room labels are made of; anything else counts as a digit.
+_WIDTHS = dict(zip("ABCDEFGHIJKLMNOPQRSTUVWXYZ", [667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833,
+                                                    722, 778, 667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611]))
+_WIDTHS.update({" ": 278, "-": 333, "_": 556, ".": 278, "/": 278, ":": 278, "(": 333, ")": 333})
+
+
+def text_width(text, size, bold=False):
+    """Approximate width in points of `text` set in Helvetica."""
+    width = sum(_WIDTHS.get(ch, 556) for ch in str(text))
+    return width * size / 1000 * (1.05 if bold else 1)
+
+
+def pdf_string(value):
+    text = str(value).encode("latin-1", "replace").decode("latin-1")
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def text_line(x, y, text, size=11, bold=False):
+    """Content-stream ops for one line of Helvetica (/F1) or Helvetica-Bold (/F2)."""
+    return f"BT /{'F2' if bold else 'F1'} {size} Tf {x:.2f} {y:.2f} Td {pdf_string(text)} Tj ET"
+
+
+class PdfWriter:
+    """
+    Minimal streaming PDF writer: two standard fonts, Form and RGB Image
+    XObjects, and pages. Objects go to `fileobj` as they are added, so a long booklet
+    never sits in memory; close() writes the page tree and xref table.
+    """
+
+    def __init__(self, fileobj, page_size=A4):
+        self.fileobj = fileobj
+        self.page_size = page_size
+        self.offsets = {}
+        self.forms = {}  # XObject name -> object number
+        self.kids = []
+        self.next_number = 5  # 1 catalog, 2 page tree, 3-4 fonts
+        self.position = 0
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data):
+        self.fileobj.write(data)
+        self.position += len(data)
+
+    def _object(self, body, number=None):
+        if number is None:
+            number, self.next_number = self.next_number, self.next_number + 1
+        self.offsets[number] = self.position
+        self._write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        return number
+
+    def _stream(self, head, data):
+        return f"<< {head} /Length {len(data)} >>\nstream\n".encode("latin-1") + data + b"\nendstream"
+
+    def _resources(self, uses):
+        xobjects = " ".join(f"/{name} {self.forms[name]} 0 R" for name in uses)
+        return f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> /XObject << {xobjects} >> >>"
+
+    def add_form(self, name, bbox, content, uses=(), deflated=False):
+        """Register a reusable drawing; `uses` names forms it draws itself."""
+        data = content if deflated else zlib.compress(content.encode("latin-1"), 6)
+        head = (f"/Type /XObject /Subtype /Form /BBox [{' '.join(f'{v:.2f}' for v in bbox)}] "
+                f"{self._resources(uses)} /Filter /FlateDecode")
+        self.forms[name] = self._object(self._stream(head, data))
+        return name
+
+    def add_image(self, name, width, height, data, png_rows=False):
+        """
+        Register deflated 8-bit RGB pixels; with `png_rows` each row starts
+        with a PNG filter byte, as in a PNG's IDAT stream.
+        """
+        parms = f" /DecodeParms << /Predictor 15 /Colors 3 /Columns {width} >>" if png_rows else ""
+        head = (f"/Type /XObject /Subtype /Image /Width {width} /Height {height} /ColorSpace /DeviceRGB "
+                f"/BitsPerComponent 8 /Filter /FlateDecode{parms}")
+        self.forms[name] = self._object(self._stream(head, data))
+        return name
+
+    def add_page(self, content, uses=(), page_size=None):
+        width, height = page_size or self.page_size
+        data = zlib.compress(content.encode("latin-1"), 6)
+        contents = self._object(self._stream("/Filter /FlateDecode", data))
+        page = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width} {height}] {self._resources(uses)} "
+                f"/Contents {contents} 0 R >>")
+        self.kids.append(self._object(page.encode("latin-1")))
+
+    def close(self):
+        self._object(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>", 3)
+        self._object(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>", 4)
+        kids = " ".join(f"{number} 0 R" for number in self.kids)
+        self._object(f"<< /Type /Pages /Kids [{kids}] /Count {len(self.kids)} >>".encode("latin-1"), 2)
+        self._object(b"<< /Type /Catalog /Pages 2 0 R >>", 1)
+
+        xref = self.position
+        count = max(self.offsets) + 1
+        rows = [b"xref\n0 %d\n0000000000 65535 f \n" % count]
+        rows.extend(b"%010d 00000 n \n" % self.offsets[number] if number in self.offsets
+                    else b"0000000000 65535 f \n" for number in range(1, count))
+        rows.append(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (count, xref))
+        self._write(b"".join(rows))
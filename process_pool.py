@@ -0,0 +1,33 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+
+def pool_context():
+    """forkserver/spawn: never fork the threaded Streamlit server."""
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def worker_count(max_workers=None):
+    return max_workers or os.cpu_count() or 1
+
+
+def map_batches(fn, items, batch_size, max_workers=None, initializer=None, initargs=()):
+    """
+    Yield fn(batch) for consecutive batches of `items`, in order, computed
+    on a process pool. Only 2 x workers batches are in flight, so a
+    consumer that streams results out keeps memory bounded.
+    """
+    workers = worker_count(max_workers)
+    items = iter(items)
+    batches = iter(lambda: list(islice(items, batch_size)), [])
+    with ProcessPoolExecutor(workers, mp_context=pool_context(), initializer=initializer, initargs=initargs) as pool:
+        pending = deque(pool.submit(fn, batch) for batch in islice(batches, 2 * workers))
+        while pending:
+            result = pending.popleft().result()
+            for batch in islice(batches, 1):
+                pending.append(pool.submit(fn, batch))
+            yield result
@@ -0,0 +1,114 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+
+def normalize(registrations):
+    return pd.Series(registrations, dtype=object).astype(str).str.strip().str.upper().to_numpy(dtype=object)
+
+
+def split_ids(text):
+    """Registration numbers pasted as lines, commas, tabs or spaces."""
+    return [part for part in re.split(r"[\s,;]+", text.strip().upper()) if part]
+
+
+class RegistrationIndex:
+    """
+    Lookup index over the staff sheet: normalized registration number ->
+    row position (first occurrence), a sorted key array for prefix search,
+    and the seats generated for each student in this session, one per
+    exam (subject and date).
+    """
+
+    def __init__(self, registrations=()):
+        self.keys = np.empty(0, dtype=object)
+        self.positions = {}
+        self.sorted_keys = np.empty(0, dtype=object)
+        self.seats = {}  # reg -> {(subject, date): seat record}
+        self._session_regs = {}  # (subject, date) -> regs seated in it
+        self.rebuild(registrations)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def rebuild(self, registrations):
+        """
+        Re-index a replaced sheet, touching only rows whose registration
+        number changed. Returns the number of rows re-indexed.
+        """
+        new = normalize(registrations)
+        old = self.keys
+        common = min(len(old), len(new))
+        changed = np.flatnonzero(old[:common] != new[:common])
+        gone = np.concatenate([changed, np.arange(common, len(old))]).astype(int)
+        came = np.concatenate([changed, np.arange(common, len(new))]).astype(int)
+        if not len(gone) and not len(came):
+            return 0
+
+        touched = set(old[gone]) | set(new[came])
+        before = {key for key in touched if key in self.positions}
+        self.keys = new
+
+        # Keys whose first occurrence may have moved are re-resolved in one scan
+        stale = {old[i] for i in gone if self.positions.get(old[i]) == i}
+        stale |= {new[i] for i in came if self.positions.get(new[i], len(new)) > i}
+        for key in stale:
+            self.positions.pop(key, None)
+        if stale:
+            keys = pd.Series(new, dtype=object)
+            first = keys[keys.isin(list(stale))].drop_duplicates()
+            self.positions.update(zip(first.to_numpy(), first.index.tolist()))
+
+        removed = sorted(key for key in before if key not in self.positions)
+        inserted = sorted(key for key in touched - before if key in self.positions)
+        keys = self.sorted_keys
+        if removed:
+            keys = np.delete(keys, np.searchsorted(keys, removed))
+        if inserted:
+            inserted = np.array(inserted, dtype=object)
+            keys = np.insert(keys, np.searchsorted(keys, inserted), inserted)
+        self.sorted_keys = keys
+        return len(changed) + abs(len(new) - len(old))
+
+    def add_seats(self, seating_df):
+        """
+        Attach generated seats (one record per student per session). A
+        session generated again replaces its earlier seats, including
+        those of students no longer in it.
+        """
+        for (subject, date), group in seating_df.groupby(["Subject", "Date"], sort=False):
+            session = (subject, str(date))
+            for reg in self._session_regs.pop(session, ()):
+                self.seats.get(reg, {}).pop(session, None)
+            records = group.to_dict(orient="records")
+            for rec in records:
+                self.seats.setdefault(rec["Registration Number"], {})[session] = rec
+            self._session_regs[session] = {rec["Registration Number"] for rec in records}
+
+    def seats_of(self, reg):
+        """Seat records of a registration number, one per session."""
+        return list(self.seats.get(str(reg).strip().upper(), {}).values())
+
+    def clear_seats(self):
+        self.seats.clear()
+        self._session_regs.clear()
+
+    # --- Lookups ---
+
+    def get(self, reg):
+        """Row position of an exact registration number, or None."""
+        return self.positions.get(str(reg).strip().upper())
+
+    def prefix(self, text, limit=50):
+        """Registration numbers starting with `text`, in sorted order."""
+        text = str(text).strip().upper()
+        if not text:
+            return []
+        lo = np.searchsorted(self.sorted_keys, text, side="left")
+        hi = np.searchsorted(self.sorted_keys, text + "\uffff", side="left")
+        return self.sorted_keys[lo:min(hi, lo + limit)].tolist()
+
+    def batch(self, regs):
+        """(registration number, row position or None) for many IDs at once."""
+        return [(reg, self.get(reg)) for reg in regs]
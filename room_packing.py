@@ -0,0 +1,124 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from seating_engine import RoomPlan, compile_room, spaced_plan
+
+EXACT_BUDGET = 50_000_000  # bit-cells of subset-sum table the exact search may use (~6 MB)
+
+# rooms: the chosen subset of the classrooms, in config order, as RoomPlans
+RoomPack = namedtuple("RoomPack", "rooms students capacity empty invigilators exact")
+
+
+def spaced_rooms(classrooms, spacing=0):
+    """Every classroom as a RoomPlan keeping at least `spacing` percent of its seats empty."""
+    plans = {}
+    for name, cfg in classrooms.items():
+        plan = cfg if isinstance(cfg, RoomPlan) else compile_room(cfg)
+        plans[name] = spaced_plan(plan, spacing) if spacing else plan
+    return plans
+
+
+def invigilators(seated, per_invigilator=None):
+    """One invigilator per open room, or one per `per_invigilator` students in it."""
+    seated = [n for n in seated if n]
+    if not per_invigilator:
+        return len(seated)
+    return sum(math.ceil(n / per_invigilator) for n in seated)
+
+
+# --- Packing ---
+
+def pack_rooms(classrooms, students, spacing=0, per_invigilator=None, exact_budget=EXACT_BUDGET):
+    """
+    The fewest rooms that seat `students`, and among those the set with
+    the fewest empty seats, from rooms' spaced capacities. The heuristic
+    (largest rooms first, then each swapped for the smallest unused room
+    that still fits everyone) is exact whenever it leaves no seat empty;
+    otherwise a subset-sum search over the optimal room count runs if
+    its table fits `exact_budget`. Rooms keep their config order, so the
+    serpentine fill leaves any spare seats in the last one.
+    """
+    plans = spaced_rooms(classrooms, spacing)
+    names = [name for name, plan in plans.items() if plan.capacity > 0]
+    sizes = np.array([plans[name].capacity for name in names], dtype=np.int64)
+    if students <= 0:
+        chosen, exact = [], True
+    elif sizes.sum() <= students:
+        chosen, exact = list(range(len(names))), True  # everything opens; the rest stay unseated
+    else:
+        chosen = _greedy(sizes, students)
+        exact = sizes[chosen].sum() == students
+        if not exact:
+            better = _exact(sizes, students, len(chosen), int(sizes[chosen].sum()), exact_budget)
+            if better is not None:
+                chosen, exact = better or chosen, True
+
+    chosen = sorted(chosen)
+    rooms = {names[i]: plans[names[i]] for i in chosen}
+    capacity = int(sizes[chosen].sum())
+    fill = np.minimum(sizes[chosen], np.maximum(students - np.concatenate(([0], np.cumsum(sizes[chosen])[:-1])), 0))
+    return RoomPack(rooms, int(students), capacity, max(capacity - int(students), 0),
+                    invigilators(fill.tolist(), per_invigilator), bool(exact))
+
+
+def _greedy(sizes, students):
+    """Fewest rooms, largest first; then shrink each pick while everyone still fits."""
+    order = np.argsort(-sizes, kind="stable")
+    count = int(np.searchsorted(np.cumsum(sizes[order]), students)) + 1
+    chosen, spare = list(order[:count]), list(order[count:][::-1])  # spare: smallest first
+    total = int(sizes[chosen].sum())
+    for pos in range(len(chosen)):
+        slack = total - students
+        # Smallest unused room that can stand in for this one
+        for j, candidate in enumerate(spare):
+            if sizes[candidate] >= sizes[chosen[pos]] - slack and sizes[candidate] < sizes[chosen[pos]]:
+                total += int(sizes[candidate] - sizes[chosen[pos]])
+                spare[j], chosen[pos] = chosen[pos], candidate
+                spare.sort(key=lambda i: (sizes[i], -i))
+                break
+    return [int(i) for i in chosen]
+
+
+def _exact(sizes, students, count, best, budget):
+    """
+    Exactly `count` rooms with the smallest total >= `students` (and below
+    `best`), by subset-sum over bitsets: reach[k] has bit s set when some
+    k of the rooms seen so far hold exactly s seats. [] when nothing beats
+    `best`, None if the table would be over budget.
+    """
+    width = best  # totals of interest are < best
+    if len(sizes) * count * width > budget:
+        return None
+    limit = (1 << width) - 1
+    reach = [1] + [0] * count
+    history = []
+    for size in sizes.tolist():
+        history.append(reach[:])
+        for k in range(count, 0, -1):
+            reach[k] |= (reach[k - 1] << size) & limit
+    hits = reach[count] >> students
+    if not hits:
+        return []
+    total = students + ((hits & -hits).bit_length() - 1)
+
+    # Walk back: room i is in the set if the total was not reachable without it
+    chosen, k = [], count
+    for i in range(len(sizes) - 1, -1, -1):
+        if not (history[i][k] >> total) & 1:
+            chosen.append(i)
+            total -= int(sizes[i])
+            k -= 1
+    return chosen[::-1]
+
+
+# --- Reports ---
+
+def pack_summary(pack):
+    """One line for logs and the dashboard."""
+    mode = "optimal" if pack.exact else "heuristic"
+    left = f"{pack.students - pack.capacity} without a seat" if pack.students > pack.capacity else f"{pack.empty} empty"
+    return (f"{len(pack.rooms)} room(s), {pack.invigilators} invigilator(s), {pack.students} students in "
+            f"{pack.capacity} seats ({left}, {mode})")
+
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+
+from seating_store import seat_records
+
+SEAT_CACHE_TTL = 30  # seconds; also the worst-case staleness if the listener drops
+SEAT_CACHE_SIZE = 50_000
+
+
+class SeatCache:
+    """
+    Process-wide read-through cache of `seating/<reg>` for the student
+    portal. Entries expire after `ttl` seconds and the least recently
+    used ones are evicted past `maxsize`. A realtime listener on
+    `seating/` drops a student's entry as soon as it changes, so a
+    deleted seat is never served longer than one TTL even when the
+    listener is down.
+    """
+
+    def __init__(self, db, ttl=SEAT_CACHE_TTL, maxsize=SEAT_CACHE_SIZE, clock=time.monotonic):
+        self.db = db
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self._data = OrderedDict()  # reg -> (loaded_at, records)
+        self._lock = threading.Lock()
+        self._version = 0  # bumped on every invalidation
+        self._listener = None
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, reg):
+        now = self.clock()
+        with self._lock:
+            entry = self._data.get(reg)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._data.move_to_end(reg)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            version = self._version
+
+        records = seat_records(self.db.reference(f"seating/{reg}").get(), reg)
+
+        with self._lock:
+            # An invalidation during the read may mean `records` is already stale
+            if version == self._version:
+                self._data[reg] = (now, records)
+                self._data.move_to_end(reg)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+        return records
+
+    def invalidate(self, reg=None):
+        with self._lock:
+            self._version += 1
+            self.invalidations += 1
+            if reg is None:
+                self._data.clear()
+            else:
+                self._data.pop(reg, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "listening": self._listener is not None,
+            }
+
+    # --- Change listener ---
+
+    def start_listener(self):
+        """Subscribe to `seating/`; without a listener the TTL alone bounds staleness."""
+        if self._listener is not None:
+            return True
+        try:
+            self._listener = self.db.reference("seating").listen(self._on_change)
+        except Exception:
+            self._listener = None
+        return self._listener is not None
+
+    def stop_listener(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def _on_change(self, event):
+        path = event.path.strip("/")
+        if path:
+            self.invalidate(path.split("/", 1)[0])
+        elif event.event_type == "patch" and isinstance(event.data, dict):
+            for child in event.data:
+                self.invalidate(child.strip("/").split("/", 1)[0])
+        else:
+            self.invalidate()
@@ -1,75 +1,193 @@
-import matplotlib.pyplot as plt
-import streamlit as st
+import struct
+import zlib
+from functools import lru_cache
 
-def visualize_seating(classroom_rows, classroom_cols, student_row, student_col):
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PatchCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle, Rectangle
+
+from instrumentation import timed
+from seating_engine import layout_mask
+
+SEAT_COLOR = "#00CFFF"
+SEAT_RGB = (0x00, 0xCF, 0xFF)
+DISABLED_COLOR = "#2E2E2E"
+HIGHLIGHT_RGB = (50, 205, 50)  # limegreen
+DPI = 200
+GAP_X = 0.3
+DESK_WIDTH = 1
+BAND_ROWS = 32
+
+
+def _layout_key(layout):
+    return tuple(tuple(int(v) for v in row) for row in layout) if layout else None
+
+
+@lru_cache(maxsize=64)
+@timed("render.room_image")
+def room_image(classroom_rows, classroom_cols, layout_key=None):
     """
-    Draw classroom seating layout with student's seat highlighted,
-    using the same design (desks, board, door) as in the admin panel.
+    Render the base room (board, door, every desk) once per (rows, cols, layout).
+    Desks are drawn as two PatchCollections instead of two patches per seat.
+    Returns the RGB pixels, each seat's pixel box (x0, y0, x1, y1) and
+    the image's deflated row bands.
     """
-
-    fig, ax = plt.subplots(figsize=(classroom_cols * 0.25, classroom_rows * 0.25), dpi=200)
+    fig = Figure(figsize=(classroom_cols * 0.25, classroom_rows * 0.25), dpi=DPI)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
     ax.set_facecolor("black")
     ax.set_aspect("equal")
     ax.axis("off")
 
-    gap_x = 0.3
-    desk_width = 1
-
-    # --- Draw teacher's board (same as admin panel) ---
-    desk_total_width = classroom_cols * (desk_width + gap_x)
-    ax.add_patch(plt.Rectangle(
-        (-0.5, classroom_rows + 0.3),
-        desk_total_width + 0.5,
-        1.2,
-        facecolor="white",
-        edgecolor="black",
-        lw=1
-    ))
-
-    # --- Draw desks (semi-circle + rectangle) ---
-    for r in range(classroom_rows):
-        for c in range(classroom_cols):
-            x = c * (desk_width + gap_x)
-            y = classroom_rows - r - 1
-
-            if r == student_row and c == student_col:
-                seat_color = "limegreen"
-                edge_width = 1
-            else:
-                seat_color = "#00CFFF"
-                edge_width = 0.6
-
-            # Desk rectangle (base)
-            ax.add_patch(plt.Rectangle(
-                (x + 0.1, y),
-                0.8, 0.4,
-                facecolor=seat_color,
-                edgecolor="black",
-                lw=edge_width
-            ))
-
-            # Desk semi-circle (top)
-            ax.add_patch(plt.Circle(
-                (x + 0.5, y + 0.5),
-                0.4,
-                facecolor=seat_color,
-                edgecolor="black",
-                lw=edge_width
-            ))
-
-    # --- Draw door ---
-    ax.add_patch(plt.Rectangle(
-        (-0.9, classroom_rows - 0.9),  
-        0.6, 0.9,
-        facecolor="brown",
-        edgecolor="black",
-        lw=0.8
-    ))
-
-
-    # --- Limits and layout ---
+    # --- Teacher's board ---
+    desk_total_width = classroom_cols * (DESK_WIDTH + GAP_X)
+    ax.add_patch(Rectangle((-0.5, classroom_rows + 0.3), desk_total_width + 0.5, 1.2,
+                           facecolor="white", edgecolor="black", lw=1))
+
+    # --- Desks (semi-circle + rectangle) ---
+    r, c = np.meshgrid(np.arange(classroom_rows), np.arange(classroom_cols), indexing="ij")
+    x = (c * (DESK_WIDTH + GAP_X)).ravel()
+    y = (classroom_rows - r - 1).ravel()
+    enabled = layout_mask(classroom_rows, classroom_cols, layout_key).ravel()
+    colors = np.where(enabled, SEAT_COLOR, DISABLED_COLOR)
+
+    ax.add_collection(PatchCollection([Rectangle((xi + 0.1, yi), 0.8, 0.4) for xi, yi in zip(x, y)],
+                                      facecolors=colors, edgecolors="black", linewidths=0.6))
+    ax.add_collection(PatchCollection([Circle((xi + 0.5, yi + 0.5), 0.4) for xi, yi in zip(x, y)],
+                                      facecolors=colors, edgecolors="black", linewidths=0.6))
+
+    # --- Door ---
+    ax.add_patch(Rectangle((-0.9, classroom_rows - 0.9), 0.6, 0.9,
+                           facecolor="brown", edgecolor="black", lw=0.8))
+
     ax.set_xlim(-1.2, classroom_cols + 2.7)
     ax.set_ylim(-0.8, classroom_rows + 1.6)
-    plt.tight_layout(pad=0)
+    fig.tight_layout(pad=0)
+    canvas.draw()
+
+    pixels = np.asarray(canvas.buffer_rgba())
+    height = pixels.shape[0]
+    box = ax.get_window_extent()
+    x0, x1 = int(box.x0), int(np.ceil(box.x1))
+    top, bottom = height - int(np.ceil(box.y1)), height - int(box.y0)
+    image = np.ascontiguousarray(pixels[top:bottom, x0:x1, :3])
+    image.setflags(write=False)
+
+    # Seat corners in display pixels, shifted into the cropped image (origin top-left)
+    lo = ax.transData.transform(np.column_stack([x + 0.1, y]))
+    hi = ax.transData.transform(np.column_stack([x + 0.9, y + 0.9]))
+    boxes = np.column_stack([
+        np.floor(lo[:, 0]) - x0, height - np.ceil(hi[:, 1]) - top,
+        np.ceil(hi[:, 0]) - x0, height - np.floor(lo[:, 1]) - top,
+    ]).astype(int).reshape(classroom_rows, classroom_cols, 4)
+    return image, boxes, _encode_bands(image)
+
+
+# --- Banded PNG encoding ---
+# The image is deflated in independent bands of rows, so recolouring one
+# seat only re-compresses the bands it touches and splices them back in.
+
+def _encode_bands(image, start=0):
+    bands = []
+    for top in range(start, image.shape[0], BAND_ROWS):
+        rows = image[top:top + BAND_ROWS]
+        raw = np.concatenate([np.zeros((len(rows), 1), np.uint8), rows.reshape(len(rows), -1)], axis=1).tobytes()
+        comp = zlib.compressobj(1, zlib.DEFLATED, -15)
+        bands.append((comp.compress(raw) + comp.flush(zlib.Z_FULL_FLUSH), zlib.adler32(raw), len(raw)))
+    return bands
+
+
+def _adler32_combine(adler1, adler2, len2):
+    base = 65521
+    rem = len2 % base
+    sum1 = adler1 & 0xFFFF
+    sum2 = (rem * sum1) % base
+    sum1 = (sum1 + (adler2 & 0xFFFF) + base - 1) % base
+    sum2 = (sum2 + (adler1 >> 16) + (adler2 >> 16) + base - rem) % base
+    return sum1 | (sum2 << 16)
+
+
+def _chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def _zlib_stream(bands):
+    adler = 1
+    for _, band_adler, length in bands:
+        adler = _adler32_combine(adler, band_adler, length)
+    return b"".join([b"\x78\x01", *(comp for comp, _, _ in bands), b"\x03\x00", struct.pack(">I", adler)])
+
+
+def _assemble_png(width, height, bands):
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)  # 8-bit RGB
+    return (b"\x89PNG\r\n\x1a\n" + _chunk(b"IHDR", header) + _chunk(b"IDAT", _zlib_stream(bands))
+            + _chunk(b"IEND", b""))
+
+
+def _highlight(region):
+    """Recolour the seat-coloured pixels of `region` in place."""
+    close = np.abs(region.astype(int) - SEAT_RGB).sum(axis=-1) < 60
+    region[close] = HIGHLIGHT_RGB
+    return region
+
+
+@lru_cache(maxsize=512)
+@timed("render.seat_png")
+def seat_png(classroom_rows, classroom_cols, student_row=None, student_col=None, layout_key=None):
+    """PNG bytes of a room, with one seat recoloured on top of the cached base image."""
+    image, boxes, bands = room_image(classroom_rows, classroom_cols, layout_key)
+    height, width = image.shape[:2]
+    if student_row is None or not (0 <= student_row < classroom_rows and 0 <= student_col < classroom_cols):
+        return _assemble_png(width, height, bands)
+
+    x0, y0, x1, y1 = np.clip(boxes[student_row, student_col], 0, None)
+    first, last = y0 // BAND_ROWS, min(-(-y1 // BAND_ROWS), len(bands))
+    strip = image[first * BAND_ROWS:last * BAND_ROWS].copy()
+    _highlight(strip[y0 - first * BAND_ROWS:y1 - first * BAND_ROWS, x0:x1])
+    return _assemble_png(width, height, bands[:first] + _encode_bands(strip) + bands[last:])
+
+
+# --- Embedding in PDFs ---
+
+@lru_cache(maxsize=64)
+def room_stream(classroom_rows, classroom_cols, layout_key=None):
+    """
+    (width, height, zlib data) of the base room image: the PNG's IDAT
+    stream, rows prefixed with filter byte 0, which a PDF image XObject
+    reads with a PNG predictor.
+    """
+    image, _, bands = room_image(classroom_rows, classroom_cols, layout_key)
+    return image.shape[1], image.shape[0], _zlib_stream(bands)
+
+
+def seat_highlight(classroom_rows, classroom_cols, student_row, student_col, layout_key=None):
+    """
+    (pixel box, RGB pixels) of one seat recoloured as in seat_png, to draw
+    over the room image; None for a seat outside the room.
+    """
+    if not (0 <= student_row < classroom_rows and 0 <= student_col < classroom_cols):
+        return None
+    image, boxes, _ = room_image(classroom_rows, classroom_cols, layout_key)
+    x0, y0, x1, y1 = np.clip(boxes[student_row, student_col], 0, None)
+    return (x0, y0, x1, y1), _highlight(image[y0:y1, x0:x1].copy())
+
+
+def visualize_seating(classroom_rows, classroom_cols, student_row, student_col, layout=None):
+    """
+    Draw classroom seating layout with student's seat highlighted,
+    using the same design (desks, board, door) as in the admin panel.
+    """
+    import streamlit as st  # rendering itself also serves hall tickets outside Streamlit
+
+    png = seat_png(int(classroom_rows), int(classroom_cols), student_row, student_col, _layout_key(layout))
+    st.image(png, use_container_width=True)
+
+
+def visualize_layout(classroom_rows, classroom_cols, layout=None):
+    """Seat designer preview: enabled desks in blue, disabled ones dark."""
+    import streamlit as st
 
-    st.pyplot(fig, clear_figure=True, use_container_width=True)
+    st.image(seat_png(int(classroom_rows), int(classroom_cols), layout_key=_layout_key(layout)),
+             use_container_width=True)
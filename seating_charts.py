@@ -0,0 +1,327 @@
+import io
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+import zlib
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from classroom_registry import ROOM_PREFIX, room_name
+from hall_tickets import room_geometry
+from instrumentation import timed
+from pdf_writer import A4_LANDSCAPE, PdfWriter, text_line, text_width
+from process_pool import map_batches, worker_count
+from seating_engine import SUBJECT_PATTERN, layout_mask
+
+PAGE_W, PAGE_H = A4_LANDSCAPE
+PAGE_BOX = (0, 0, PAGE_W, PAGE_H)
+MARGIN = 30
+HEADER_H = 52
+BOARD_H = 16
+LABEL_W, LABEL_H = 22, 12  # row numbers on the left, column numbers on top
+FOOTER_H = 30
+MAX_CELL_W, MAX_CELL_H = 96, 36
+PNG_SCALE = 2  # pixels per point: 1684 x 1190 charts
+CHART_BATCH = 8  # rooms per process-pool task
+
+# One room of one sitting. `seats` holds (row, col, reg, subject code) with 0-based row/col.
+Chart = namedtuple("Chart", "stem room date time subjects capacity geometry seats")
+
+
+# --- Charts from a seating ---
+
+def _file_part(text):
+    return re.sub(r'[\\/:*?"<>|]+', "_", str(text)).strip() or "_"
+
+
+def room_charts(seating_df, classrooms):
+    """
+    One Chart per room per sitting (date, time) of a seating frame, in
+    date/time order and then the order rooms were filled. Rooms no longer
+    in `classrooms` fall back to a full grid just big enough for the seats.
+    """
+    if seating_df.empty:
+        return
+    ordered = seating_df.sort_values(["Date", "Time"], kind="stable")
+    codes = {subject: (match.group(0).upper() if (match := SUBJECT_PATTERN.search(str(subject))) else str(subject))
+             for subject in ordered["Subject"].unique()}
+    for (exam_date, exam_time, label), group in ordered.groupby(["Date", "Time", "Classroom"], sort=False):
+        rows = group["Row"].to_numpy(dtype=int) - 1
+        cols = group["Column"].to_numpy(dtype=int) - 1
+        cfg = classrooms.get(room_name(str(label)))
+        n_rows, n_cols, layout_key = room_geometry(cfg) if cfg is not None else (1, 1, None)
+        # Grow the grid over seats outside a room that has shrunk since
+        geometry = (max(n_rows, int(rows.max()) + 1), max(n_cols, int(cols.max()) + 1), layout_key)
+        seats = list(zip(rows.tolist(), cols.tolist(), group["Registration Number"].astype(str).tolist(),
+                         group["Subject"].map(codes).tolist()))
+        yield Chart(
+            stem=f"{_file_part(exam_date)}_{_file_part(str(exam_time).replace(':', ''))}/{_file_part(label)}",
+            room=str(label) if str(label).startswith(ROOM_PREFIX) else f"{ROOM_PREFIX}{label}",
+            date=str(exam_date),
+            time=str(exam_time),
+            subjects=sorted(set(codes[s] for s in group["Subject"].unique())),
+            capacity=int(layout_mask(*geometry).sum()),
+            geometry=geometry,
+            seats=seats,
+        )
+
+
+# --- Geometry ---
+# Row 1 is nearest the board, at the top of the page, as on the seat views.
+
+def chart_layout(rows, cols):
+    """(left, top, cell width, cell height) of a room's grid on the page, in points."""
+    area_w = PAGE_W - 2 * MARGIN - LABEL_W
+    top = PAGE_H - MARGIN - HEADER_H - BOARD_H - 6 - LABEL_H
+    area_h = top - MARGIN - FOOTER_H
+    cell_w, cell_h = min(area_w / cols, MAX_CELL_W), min(area_h / rows, MAX_CELL_H)
+    left = MARGIN + LABEL_W + (area_w - cols * cell_w) / 2
+    return left, top, cell_w, cell_h
+
+
+def reg_font_size(chart):
+    """Largest size (up to 10 pt) at which every registration number fits its cell."""
+    _, _, cell_w, cell_h = chart_layout(*chart.geometry[:2])
+    widest = max((text_width(reg, 1) for _, _, reg, _ in chart.seats), default=1)
+    lines = 2 if len(chart.subjects) > 1 else 1
+    return max(3.0, min(10.0, (cell_w - 4) / widest, cell_h * 0.8 / (lines * 1.2)))
+
+
+# --- PDF ---
+
+@lru_cache(maxsize=64)
+def grid_form(rows, cols, layout_key=None):
+    """
+    Deflated page-sized form with everything a room's chart shares with
+    every other room of that shape: board, door, row/column numbers,
+    cell borders and shaded disabled seats.
+    """
+    left, top, cell_w, cell_h = chart_layout(rows, cols)
+    width, board_y = cols * cell_w, top + LABEL_H + 6
+    ops = [
+        f"0.85 g 0 G 0.8 w {left:.2f} {board_y:.2f} {width:.2f} {BOARD_H} re B",
+        "0 g " + text_line(left + width / 2 - text_width("BOARD", 8, True) / 2, board_y + 5, "BOARD", 8, bold=True),
+        f"0.647 0.165 0.165 rg {left - LABEL_W:.2f} {board_y:.2f} {LABEL_W - 4} {BOARD_H} re B",  # door
+        "0 g",
+    ]
+    for c in range(cols):
+        label = str(c + 1)
+        ops.append(text_line(left + (c + 0.5) * cell_w - text_width(label, 7) / 2, top + 3, label, 7))
+    for r in range(rows):
+        label = str(r + 1)
+        ops.append(text_line(left - 4 - text_width(label, 7), top - (r + 0.5) * cell_h - 2.5, label, 7))
+
+    enabled = layout_mask(rows, cols, layout_key)
+    disabled = [f"{left + c * cell_w:.2f} {top - (r + 1) * cell_h:.2f} {cell_w:.2f} {cell_h:.2f} re"
+                for r, c in zip(*np.nonzero(~enabled))]
+    if disabled:
+        ops.append("0.78 g " + " ".join(disabled) + " f")
+    ops.append("0.4 G 0.5 w")
+    ops.extend(f"{left:.2f} {top - (r + 1) * cell_h:.2f} {width:.2f} {cell_h:.2f} re S" for r in range(rows))
+    ops.extend(f"{left + c * cell_w:.2f} {top - rows * cell_h:.2f} {cell_w:.2f} {rows * cell_h:.2f} re S"
+               for c in range(cols))
+    return zlib.compress("\n".join(ops).encode("latin-1"), 9)
+
+
+def _subtitle(chart):
+    return f"{', '.join(chart.subjects)}  |  {chart.date}  |  {chart.time}  |  {len(chart.seats)} of {chart.capacity} seats"
+
+
+def chart_ops(chart):
+    """Per-room page content drawn over its grid_form: titles and the registration numbers."""
+    rows, cols, _ = chart.geometry
+    left, top, cell_w, cell_h = chart_layout(rows, cols)
+    size = reg_font_size(chart)
+    mixed = len(chart.subjects) > 1
+    ops = [
+        "0 g",
+        text_line(MARGIN, PAGE_H - MARGIN - 18, chart.room, 18, bold=True),
+        text_line(MARGIN, PAGE_H - MARGIN - 36, _subtitle(chart), 10),
+        text_line(MARGIN, MARGIN + 4, f"Invigilator: ______________________   Signature: ______________   "
+                                      f"Present: ____ of {len(chart.seats)}", 9),
+        text_line(PAGE_W - MARGIN - text_width("Board at the top, door on the left.", 8), MARGIN + 4,
+                  "Board at the top, door on the left.", 8),
+    ]
+    for row, col, reg, code in chart.seats:
+        cx, cy = left + (col + 0.5) * cell_w, top - (row + 0.5) * cell_h
+        if mixed:
+            small = size * 0.75
+            ops.append(text_line(cx - text_width(reg, size) / 2, cy + 0.15 * size, reg, round(size, 2)))
+            ops.append(text_line(cx - text_width(code, small) / 2, cy - 0.95 * small, code, round(small, 2)))
+        else:
+            ops.append(text_line(cx - text_width(reg, size) / 2, cy - 0.35 * size, reg, round(size, 2)))
+    return "\n".join(ops)
+
+
+def chart_pdf(chart, ops=None):
+    out = io.BytesIO()
+    pdf = PdfWriter(out, A4_LANDSCAPE)
+    pdf.add_form("G", PAGE_BOX, grid_form(*chart.geometry), deflated=True)
+    pdf.add_page("/G Do\n" + (ops or chart_ops(chart)), ["G"])
+    pdf.close()
+    return out.getvalue()
+
+
+# --- PNG ---
+# The same page as a 4-bit grayscale PNG. One base raster per room shape
+# is copied per room, and text is stamped from cached glyph bitmaps with
+# numpy rather than rendered through FreeType seat by seat.
+
+PNG_LEVELS = 16
+_PALETTE = [round(i * 255 / (PNG_LEVELS - 1)) for i in range(PNG_LEVELS) for _ in range(3)]
+_QUANTIZE = ((np.arange(256) * (PNG_LEVELS - 1) + 127) // 255).astype(np.uint8)  # gray -> palette index
+
+
+def _px(x, y):
+    return x * PNG_SCALE, (PAGE_H - y) * PNG_SCALE
+
+
+@lru_cache(maxsize=None)
+def _font(pixels, bold=False):
+    from matplotlib import get_data_path
+    from PIL import ImageFont
+    name = "DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf"
+    return ImageFont.truetype(os.path.join(get_data_path(), "fonts", "ttf", name), pixels)
+
+
+@lru_cache(maxsize=4096)
+def _glyph(ch, pixels, bold=False):
+    """Ink coverage of one character (font height x advance) and the font's ascent."""
+    from PIL import Image, ImageDraw
+    font = _font(pixels, bold)
+    ascent, descent = font.getmetrics()
+    cell = Image.new("L", (max(1, round(font.getlength(ch))), ascent + descent), 0)
+    ImageDraw.Draw(cell).text((0, ascent), ch, font=font, fill=255, anchor="ls")
+    return np.asarray(cell), ascent
+
+
+def _stamp(canvas, text, x, y, size, bold=False, align="left", middle=False):
+    """
+    Darken `text` into a grayscale array. (x, y) in points is the start,
+    centre or end of its baseline, or of its middle when `middle` is set.
+    """
+    # DejaVu runs ~10% wider than Helvetica; shrink so the PDF fit holds
+    glyphs = [_glyph(ch, max(6, round(size * PNG_SCALE * 0.9)), bold) for ch in str(text)]
+    if not glyphs:
+        return
+    ink, ascent = np.hstack([g for g, _ in glyphs]), glyphs[0][1]
+    height, width = ink.shape
+    px, py = _px(x, y)
+    left = round(px - {"left": 0, "center": width / 2, "right": width}[align])
+    top = round(py - height / 2) if middle else round(py - ascent)
+    y0, x0 = max(top, 0), max(left, 0)
+    y1, x1 = min(top + height, canvas.shape[0]), min(left + width, canvas.shape[1])
+    if y0 < y1 and x0 < x1:
+        region = canvas[y0:y1, x0:x1]
+        np.minimum(region, 255 - ink[y0 - top:y1 - top, x0 - left:x1 - left], out=region)
+
+
+def _rect(draw, x, y, w, h, **kwargs):
+    x0, y1 = _px(x, y)
+    x1, y0 = _px(x + w, y + h)
+    draw.rectangle([x0, y0, x1, y1], **kwargs)
+
+
+@lru_cache(maxsize=32)
+def base_image(rows, cols, layout_key=None):
+    """Grayscale raster of grid_form; treat as read-only."""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("L", (PAGE_W * PNG_SCALE, PAGE_H * PNG_SCALE), 255)
+    draw = ImageDraw.Draw(image)
+    left, top, cell_w, cell_h = chart_layout(rows, cols)
+    width, board_y = cols * cell_w, top + LABEL_H + 6
+    _rect(draw, left, board_y, width, BOARD_H, fill=217, outline=0, width=2)
+    _rect(draw, left - LABEL_W, board_y, LABEL_W - 4, BOARD_H, fill=80, outline=0, width=2)  # door
+    enabled = layout_mask(rows, cols, layout_key)
+    for r, c in zip(*np.nonzero(~enabled)):
+        _rect(draw, left + c * cell_w, top - (r + 1) * cell_h, cell_w, cell_h, fill=199)
+    for r in range(rows + 1):
+        draw.line([_px(left, top - r * cell_h), _px(left + width, top - r * cell_h)], fill=102, width=1)
+    for c in range(cols + 1):
+        draw.line([_px(left + c * cell_w, top), _px(left + c * cell_w, top - rows * cell_h)], fill=102, width=1)
+
+    canvas = np.array(image)
+    _stamp(canvas, "BOARD", left + width / 2, board_y + BOARD_H / 2, 8, bold=True, align="center", middle=True)
+    for c in range(cols):
+        _stamp(canvas, c + 1, left + (c + 0.5) * cell_w, top + 3, 7, align="center")
+    for r in range(rows):
+        _stamp(canvas, r + 1, left - 4, top - (r + 0.5) * cell_h, 7, align="right", middle=True)
+    return canvas
+
+
+def chart_png(chart):
+    from PIL import Image
+
+    rows, cols, _ = chart.geometry
+    canvas = base_image(*chart.geometry).copy()
+    left, top, cell_w, cell_h = chart_layout(rows, cols)
+    size = reg_font_size(chart)
+
+    _stamp(canvas, chart.room, MARGIN, PAGE_H - MARGIN - 18, 18, bold=True)
+    _stamp(canvas, _subtitle(chart), MARGIN, PAGE_H - MARGIN - 36, 10)
+    _stamp(canvas, f"Invigilator: ______________________   Signature: ______________   "
+                   f"Present: ____ of {len(chart.seats)}", MARGIN, MARGIN + 4, 9)
+    _stamp(canvas, "Board at the top, door on the left.", PAGE_W - MARGIN, MARGIN + 4, 8, align="right")
+    mixed = len(chart.subjects) > 1
+    for row, col, reg, code in chart.seats:
+        cx, cy = left + (col + 0.5) * cell_w, top - (row + 0.5) * cell_h
+        if mixed:
+            _stamp(canvas, reg, cx, cy + 0.15 * size, size, align="center")
+            _stamp(canvas, code, cx, cy - 0.95 * size * 0.75, size * 0.75, align="center")
+        else:
+            _stamp(canvas, reg, cx, cy, size, align="center", middle=True)
+
+    image = Image.frombytes("P", (canvas.shape[1], canvas.shape[0]), _QUANTIZE[canvas].tobytes())
+    image.putpalette(_PALETTE)
+    out = io.BytesIO()
+    image.save(out, format="PNG", bits=4, compress_level=1)
+    return out.getvalue()
+
+
+# --- Export ---
+
+def render_chart(chart):
+    """(stem, geometry, PDF bytes, PNG bytes, page content) for one room."""
+    ops = chart_ops(chart)
+    return chart.stem, chart.geometry, chart_pdf(chart, ops), chart_png(chart), ops
+
+
+@timed("charts.zip")
+def write_chart_zip(fileobj, charts, max_workers=None):
+    """
+    Stream invigilator charts into a zip: `<date>_<time>/<room>.pdf` and
+    `.png` per room, then `booklet.pdf` with every room in order. Rooms
+    are rendered in batches on a process pool (each worker draws a room
+    shape's base once); the booklet is spooled to a temporary file and
+    reuses one grid form per shape. Returns the number of rooms written.
+    """
+    count = 0
+    with tempfile.TemporaryFile() as spool, zipfile.ZipFile(fileobj, "w", zipfile.ZIP_STORED) as archive:
+        booklet, shapes = PdfWriter(spool, A4_LANDSCAPE), {}
+        if worker_count(max_workers) == 1:
+            rendered = map(render_chart, charts)
+        else:
+            rendered = (item for batch in map_batches(_chart_batch, charts, CHART_BATCH, max_workers) for item in batch)
+
+        for stem, geometry, pdf, png, ops in rendered:
+            archive.writestr(f"{stem}.pdf", pdf)
+            archive.writestr(f"{stem}.png", png)
+            if geometry not in shapes:
+                shapes[geometry] = booklet.add_form(f"G{len(shapes)}", PAGE_BOX, grid_form(*geometry), deflated=True)
+            booklet.add_page(f"/{shapes[geometry]} Do\n{ops}", [shapes[geometry]])
+            count += 1
+
+        booklet.close()
+        spool.seek(0)
+        with archive.open("booklet.pdf", "w") as out:
+            shutil.copyfileobj(spool, out)
+    return count
+
+
+def _chart_batch(batch):
+    return [render_chart(chart) for chart in batch]
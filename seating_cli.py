@@ -0,0 +1,155 @@
+"""
+Headless seat allocation: student sheets + rooms in, seating out. Runs
+offline; nothing here touches Streamlit or Firebase.
+
+    python seating_cli.py students.xlsx --subject 23CSE1001 --date 2026-01-05 -o seating.csv
+    python seating_cli.py students.xlsx --timetable Exams.xlsx --rooms-sheet ROOMS.xlsx -o all.parquet
+    python seating_cli.py students.xlsx --timetable Exams.xlsx --pack --spacing 50 -o all.csv
+    python seating_cli.py students.xlsx --timetable Exams.xlsx --pack --interleave -o all.csv
+    python seating_cli.py students.xlsx --list-subjects
+    python seating_cli.py students.xlsx --timetable Exams.xlsx -o all.csv --tickets tickets.zip --charts charts.zip
+"""
+import argparse
+import sys
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sheets", nargs="+", help="student sheets (.xlsx or .csv); several are concatenated")
+    rooms = parser.add_mutually_exclusive_group()
+    rooms.add_argument("--rooms", default="classrooms.json", help="classroom config (default: classrooms.json)")
+    rooms.add_argument("--rooms-sheet", help="ROOMS sheet (Room_ID, Capacity, Status) instead of --rooms")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--subject", help="subject column, or just its code (e.g. 23CSE1001)")
+    mode.add_argument("--timetable", help="exam timetable sheet; allocates every paper in it")
+    mode.add_argument("--list-subjects", action="store_true", help="print the subject columns and exit")
+    parser.add_argument("--date", help="exam date, YYYY-MM-DD (required with --subject)")
+    parser.add_argument("--time", default="09:00", help="exam time, HH:MM (default: 09:00)")
+    parser.add_argument("-o", "--output", default="-", help=".csv or .parquet path; '-' for stdout (default)")
+    parser.add_argument("--issues", help="with --timetable: write unseated students and unmatched papers here")
+    parser.add_argument("--pack", action="store_true", help="seat each exam in the fewest rooms that hold it")
+    parser.add_argument("--interleave", action="store_true",
+                        help="with --timetable: mix each slot's papers so no two neighbours sit the same one")
+    parser.add_argument("--spacing", type=float, default=0,
+                        help="percent of every room's seats to keep empty, spread evenly (default: 0)")
+    parser.add_argument("--tickets", help="also write one hall-ticket PDF per student into this zip")
+    parser.add_argument("--charts", help="also write per-room invigilator charts (PDF + PNG, plus a booklet) into this zip")
+    parser.add_argument("--workers", type=int,
+                        help="worker processes for --timetable, --tickets and --charts (default: one per core)")
+    args = parser.parse_args(argv)
+    if args.subject and not args.date:
+        parser.error("--subject needs --date")
+    if args.interleave and not args.timetable:
+        parser.error("--interleave needs --timetable")
+    if not 0 <= args.spacing < 100:
+        parser.error("--spacing must be at least 0 and below 100")
+    return args
+
+
+# --- Inputs ---
+
+def read_students(paths):
+    """Student sheets as one frame with normalized column names."""
+    import pandas as pd
+    from student_ingest import ingest_students
+
+    frames = []
+    for path in paths:
+        if path.lower().endswith(".csv"):
+            df = pd.read_csv(path, dtype=str)
+            frames.append(df.rename(columns=lambda c: str(c).lower().strip()))
+        else:
+            with open(path, "rb") as f:
+                frames.append(ingest_students(f.read()))
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def read_rooms(args):
+    if args.rooms_sheet:
+        import pandas as pd
+        from timetable_batch import rooms_from_sheet
+        return rooms_from_sheet(pd.read_excel(args.rooms_sheet))
+    from classroom_registry import room_plans
+    return room_plans(args.rooms)
+
+
+def resolve_subject(subject, columns):
+    """The subject column named by `subject`: an exact (case-insensitive) name or its code."""
+    from seating_engine import SUBJECT_PATTERN, detect_subject_columns
+
+    wanted = subject.lower().strip()
+    subjects = detect_subject_columns(columns)
+    if wanted in subjects:
+        return wanted
+    by_code = [col for col in subjects if SUBJECT_PATTERN.search(col).group(0).lower() == wanted]
+    if len(by_code) == 1:
+        return by_code[0]
+    raise ValueError(f"No single subject column matches {subject!r}.")
+
+
+def _report(done, total):
+    print(f"\rAllocated {done}/{total} exam slots", end="\n" if done == total else "", file=sys.stderr)
+
+
+# --- Main ---
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Heavy imports only once the arguments are known to be good
+    from datetime import date, time as dtime
+    from seating_engine import detect_subject_columns, distribute_students, export_seating, subject_roster
+    from room_packing import pack_rooms, pack_summary, spaced_rooms
+
+    students = read_students(args.sheets)
+    if args.list_subjects:
+        print("\n".join(detect_subject_columns(students.columns.tolist())))
+        return 0
+
+    classrooms = read_rooms(args)
+    if not classrooms:
+        print("No classrooms configured.", file=sys.stderr)
+        return 1
+    if args.spacing:
+        classrooms = spaced_rooms(classrooms, args.spacing)
+
+    if args.timetable:
+        from timetable_batch import allocate_timetable, load_timetable
+        seating, issues = allocate_timetable(students, load_timetable(args.timetable), classrooms,
+                                             max_workers=args.workers, progress=_report if sys.stderr.isatty() else None,
+                                             pack=args.pack, interleave=args.interleave)
+        if args.issues:
+            export_seating(issues, args.issues)
+        elif len(issues):
+            print(f"{len(issues)} issue(s); pass --issues to save them.", file=sys.stderr)
+    else:
+        try:
+            subject = resolve_subject(args.subject, students.columns.tolist())
+            exam_date, exam_time = date.fromisoformat(args.date), dtime.fromisoformat(args.time)
+            rooms = classrooms
+            if args.pack:
+                packed = pack_rooms(classrooms, len(subject_roster(students, subject)))
+                print(f"Using {pack_summary(packed)}", file=sys.stderr)
+                rooms = packed.rooms
+            seating = distribute_students(students, subject, rooms, exam_date, exam_time)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+
+    export_seating(seating, args.output)
+    if args.output != "-":
+        print(f"{len(seating)} seat(s) written to {args.output}", file=sys.stderr)
+    if args.tickets:
+        from hall_tickets import student_tickets, write_ticket_zip
+        with open(args.tickets, "wb") as f:
+            count = write_ticket_zip(f, student_tickets(seating), classrooms, args.workers)
+        print(f"{count} hall ticket(s) written to {args.tickets}", file=sys.stderr)
+    if args.charts:
+        from seating_charts import room_charts, write_chart_zip
+        with open(args.charts, "wb") as f:
+            count = write_chart_zip(f, room_charts(seating, classrooms), args.workers)
+        print(f"{count} room chart(s) written to {args.charts}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
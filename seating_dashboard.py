@@ -1,30 +1,81 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import json, time, os, re, firebase_admin
-from firebase_admin import credentials, db
+import time, os, tempfile
 from datetime import datetime, time as dtime
-from seat_visualizer import visualize_seating
+from seat_visualizer import visualize_seating, visualize_layout
+from seating_engine import detect_subject_columns, distribute_students, redistribute_students, reseat, subject_roster
+from seating_store import (save_session, save_sessions, update_session, list_sessions, load_session, session_key,
+                           prefetch_sessions, delete_session, delete_all, migrate_sessions)
+from timetable_batch import allocate_timetable, load_timetable, rooms_from_sheet
+import instrumentation as perf
+from instrumentation import InstrumentedDb
+from db_client import DbClient
+from local_store import LocalDb, LOCAL_DB_FILE
+from seat_cache import SeatCache
+from credential_index import CredentialIndex, TooManyAttempts
+from student_ingest import ingest_students, student_rows
+from registration_index import RegistrationIndex, split_ids
+from classroom_registry import load_classrooms, room_plans, room_name, update_classroom, delete_classroom
+from hall_tickets import student_tickets, ticket_pdf, write_ticket_zip
+from seating_charts import room_charts, write_chart_zip
+from room_packing import pack_rooms, pack_summary, spaced_rooms
+from seating_export import read_manifest, write_export_zip
 
 # --- Page Config ---
 st.set_page_config(page_title="Exam System Portal", layout="wide")
 
 # --- Firebase Initialization ---
-if not firebase_admin._apps:
-    cred = credentials.Certificate("firebase_key.json")
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': 'https://exam-hall-seating-arrang-38bc9-default-rtdb.firebaseio.com/'
-    })
+@st.cache_resource
+def connect_firebase():
+    # Done once per server process, on first use, rather than at import
+    import firebase_admin
+    from firebase_admin import credentials, db as firebase_db
+    if not firebase_admin._apps:
+        cred = credentials.Certificate("firebase_key.json")
+        firebase_admin.initialize_app(cred, {
+            'databaseURL': 'https://exam-hall-seating-arrang-38bc9-default-rtdb.firebaseio.com/'
+        })
+    # Concurrent, coalesced and retried calls; each request is still timed for the Performance tab
+    remote = DbClient(InstrumentedDb(firebase_db))
+    # Seating is read from and written to a local SQLite copy, synced to Firebase in the background
+    store = LocalDb(remote, LOCAL_DB_FILE)
+    store.start()
+    return store
+
+db = connect_firebase()
 
 # --- Constants ---
 DATA_FILE = "classrooms.json"
 ADMIN_USER, ADMIN_PASS = "admin", "password123"
 STAFF_USER, STAFF_PASS = "staff", "staff123"
-
-# --- Ensure Storage ---
-if not os.path.exists(DATA_FILE):
-    with open(DATA_FILE, "w") as f:
-        json.dump({}, f)
+SESSIONS_PER_PAGE = 10
+ROWS_PER_PAGE = 200
+
+# --- Shared Caches ---
+@st.cache_resource
+def student_seat_cache():
+    cache = SeatCache(db)
+    cache.start_listener()
+    return cache
+
+@st.cache_resource
+def credential_index():
+    # Loaded in the background at startup; logins fall back to the database until it is ready
+    index = CredentialIndex(db.remote)
+    index.start()
+    return index
+
+credential_index()
+
+# --- Downloads ---
+def spooled(write):
+    """download_button data built on click: write(file) spools to a temp file rather than memory."""
+    def build():
+        out = tempfile.TemporaryFile()
+        write(out)
+        out.seek(0)
+        return out
+    return build
 
 # --- Session Defaults ---
 if "role" not in st.session_state:
@@ -60,12 +111,15 @@ if st.session_state.role is None:
             st.rerun()
         elif role == "Student":
             try:
-                real = db.reference(f"{uid}/B").get()
+                student_id = credential_index().verify(uid, pwd)
+            except TooManyAttempts as e:
+                st.error(str(e))
+                st.stop()
             except Exception:
-                real = None
-            if real and pwd == str(real):
+                student_id = None
+            if student_id:
                 st.session_state.role = "student"
-                st.session_state.student_id = uid
+                st.session_state.student_id = student_id
                 st.rerun()
             else:
                 st.error("Invalid student credentials")
@@ -93,64 +147,13 @@ st.sidebar.markdown(f"## 🔓 {role_display}")
 if st.sidebar.button("Logout"):
     logout()
 
-# --- Utility ---
-
-def detect_subject_columns(columns):
-    pattern = re.compile(r"\b\d{2}[a-z]{3,5}\d{4}", re.IGNORECASE)
-    return [col for col in columns if pattern.search(col.strip())]
-
-def distribute_students(df, subject, classrooms, exam_date, exam_time):
-    subject_col = subject.lower().strip()
-    df = df.copy()
-    df.columns = df.columns.str.lower().str.strip()
-
-    if subject_col not in df.columns or "registration number" not in df.columns:
-        st.error("Required columns missing.")
-        return pd.DataFrame()
-
-    col_data = df[subject_col].fillna("").astype(str).str.strip().str.upper()
-    mask = (col_data != "") & (col_data != "NA")
-
-    sel = df.loc[mask, ["registration number"]].dropna()
-    sel["registration number"] = sel["registration number"].astype(str).str.strip().str.upper()
-    sel = sel.sort_values("registration number").reset_index(drop=True)
-
-    seating, idx, total = [], 0, len(sel)
-    for room_name, cfg in classrooms.items():
-        if idx >= total:
-            break
-        rows, cols = int(cfg.get("rows", 1)), int(cfg.get("cols", 1))
-        capacity = rows * cols
-        batch = sel.iloc[idx: idx + capacity]
-        students = batch["registration number"].tolist()
-        assigned = 0
-
-        for c in range(cols):
-            if assigned >= len(students): break
-            row_iter = range(rows) if c % 2 == 0 else range(rows - 1, -1, -1)
-            for r in row_iter:
-                if assigned >= len(students): break
-                seating.append({
-                    "Subject": subject.upper(),
-                    "Registration Number": students[assigned],
-                    "Classroom": f"Room - {str(room_name)}", 
-                    "Row": r + 1,
-                    "Column": c + 1,
-                    "Date": exam_date.strftime("%Y-%m-%d") if exam_date else "",
-                    "Time": exam_time.strftime("%H:%M") if exam_time else ""
-                })
-                assigned += 1
-        idx += assigned
-    return pd.DataFrame(seating)
-
 # --- ADMIN ---
 if st.session_state.role == "admin":
-    tabs = st.tabs(["Home", "Search & Lookup"])
+    tabs = st.tabs(["Home", "Search & Lookup", "Performance"])
 
     with tabs[0]:
         st.header("🏫 Classroom Management")
-        with open(DATA_FILE, 'r') as f:
-            classrooms = json.load(f)
+        classrooms = load_classrooms(DATA_FILE)
 
         updated = False  
 
@@ -162,19 +165,15 @@ if st.session_state.role == "admin":
             cols_input = cols[2].number_input(f"Cols: {name}", min_value=1, value=cfg['cols'], key=f"cols: {name}")
 
             if cols[3].button("Update", key=f"update_{name}"):
-                classrooms[name] = {'rows': int(rows_input), 'cols': int(cols_input)}
+                update_classroom(name, {'rows': int(rows_input), 'cols': int(cols_input)}, DATA_FILE)
                 updated = True
                 st.success(f"✅ Updated '{name}' to {rows_input} rows × {cols_input} columns")
 
             if cols[4].button("Delete", key=f"delete_{name}"):
-                del classrooms[name]
-                with open(DATA_FILE, 'w') as f:
-                    json.dump(classrooms, f)
+                delete_classroom(name, DATA_FILE)
                 st.rerun()
 
         if updated:
-            with open(DATA_FILE, 'w') as f:
-                json.dump(classrooms, f)
             st.success("Classroom updated")
             time.sleep(2)
             st.rerun()
@@ -190,76 +189,15 @@ if st.session_state.role == "admin":
         if "seat_layout" not in st.session_state or len(st.session_state.seat_layout) != new_r or len(st.session_state.seat_layout[0]) != new_c:
             st.session_state.seat_layout = [[1 for _ in range(new_c)] for _ in range(new_r)]
 
-        fig, ax = plt.subplots(figsize=(new_c * 0.25, new_r  * 0.25),dpi = 200)
-        ax.set_facecolor('black')  # Background
-
-        gap_x = 0.3
-        gap_y = 0.2
-        # Teacher's board with border
-        desk_total_width = new_c * (1 + gap_x)
-        ax.add_patch(plt.Rectangle(
-            (-0.5, new_r + 0.3),       
-            desk_total_width + 0.5,    
-            1.2,                       
-            facecolor='white',
-            edgecolor='black',
-            lw=1
-        ))
-
-        desk_width = 1 
-        total_width = new_c * (1 + gap_x)  
-        x_offset = (new_c * (1 + gap_x)) / -2 + 0.5 
-
-        # Draw desks with rounded tops (semi-circle + base rectangle)
-        for r in range(new_r):
-            for c in range(new_c):
-                desk_color = '#00CFFF' if st.session_state.seat_layout[r][c] == 1 else '#2E2E2E'
-                # 
-                x_pos = c * (1 + gap_x)
-                y_pos = new_r - r - 1  
-
-
-                # Desk base
-                ax.add_patch(plt.Rectangle(
-                (x_pos + 0.1, y_pos),   
-                0.8, 0.4,
-                facecolor=desk_color,
-                edgecolor='black',
-                lw=0.6
-                ))
-
-                semi = plt.Circle(
-                (x_pos + 0.5, y_pos + 0.5),  
-                0.4,
-                facecolor=desk_color,
-                edgecolor='black',
-                lw=0.4
-                )
-                ax.add_patch(semi)
-        ax.add_patch(plt.Rectangle(
-            (-0.9, new_r + -0.9),  
-            0.6, 0.9,
-            facecolor='brown',
-            edgecolor='black',
-            lw=0.8
-        ))  
-
-        ax.set_xlim(-1.2, new_c + 2.7) 
-        ax.set_ylim(-0.8, new_r + 1.6)
-        ax.set_aspect('equal')
-        ax.axis('off')
-        plt.tight_layout(pad=0)
-        st.pyplot(fig, clear_figure=True, use_container_width=True)
+        visualize_layout(new_r, new_c, st.session_state.seat_layout)
 
         if st.button("Save Classroom"):
             if new_name and new_name not in classrooms:
-                classrooms[new_name] = {
+                update_classroom(new_name, {
                     "rows": int(new_r),
                     "cols": int(new_c),
                     "layout": st.session_state.seat_layout
-                }
-                with open(DATA_FILE, "w") as f:
-                    json.dump(classrooms, f)
+                }, DATA_FILE)
                 st.session_state.new_name = " "
                 st.session_state.new_r = 3
                 st.session_state.new_c = 3
@@ -273,50 +211,106 @@ if st.session_state.role == "admin":
 
     with tabs[1]:
         st.header("🗂 All Generated Seating Data")
-        admin_seating_ref = db.reference("admin_seating")
-        seating_data = admin_seating_ref.get()
-
-        if seating_data:
-            for key, records in seating_data.items():
-                if not records:
-                    continue
-
-                # Convert to dataframe
-                df_group = pd.DataFrame(records)
-                subject = df_group["Subject"].iloc[0]
-                date = df_group["Date"].iloc[0]
-
-                st.markdown(f"### 📘 {subject} — 📅 {date}")
-                st.dataframe(df_group, use_container_width=True)
-
-                # Delete button for this subject+date group
-                if st.button(f"🗑 Delete Seating ({subject} on {date})", key=f"delete_{key}"):
-                    del seating_data[key]
-                    admin_seating_ref.set(seating_data)
-
-                    # Remove from student seating too
-                    for _, entry in df_group.iterrows():
-                        student_ref = db.reference(f"seating/{entry['Registration Number']}")
-                        student_data = student_ref.get()
-                        if isinstance(student_data, list):
-                            updated_data = [
-                                d for d in student_data
-                                if not (d["Subject"] == subject and d["Date"] == date)
-                            ]
-                            if updated_data:
-                                student_ref.set(updated_data)
-                            else:
-                                student_ref.delete()
-
-                    st.success(f"🗑 Deleted seating for {subject} on {date}")
-                    st.rerun()
 
-                st.markdown("---")
+        # --- Filters ---
+        fcols = st.columns([3, 3, 1])
+        subject_filter = fcols[0].text_input("Subject contains", key="admin_subject_filter")
+        date_range = fcols[1].date_input("Date range", value=(), key="admin_date_range")
+        start = date_range[0].strftime("%Y-%m-%d") if len(date_range) > 0 else None
+        end = date_range[-1].strftime("%Y-%m-%d") if len(date_range) > 1 else start
+
+        sessions = list_sessions(db, subject_filter, start, end)
+        cache_stats = student_seat_cache().stats()
+        st.caption(f"Student seat cache: {cache_stats['size']} cached · {cache_stats['hits']} hits · {cache_stats['misses']} misses · listener {'on' if cache_stats['listening'] else 'off'}")
+        db_stats = db.stats()
+        st.caption(f"Database: {db_stats['requests']} requests · {db_stats['coalesced']} reads merged · {db_stats['retried']} retried")
+        sync_stats = db.sync_stats()
+        st.caption(f"Sync to Firebase: {sync_stats['pending']} writes queued · {sync_stats['pushed']} pushed · "
+                   f"{sync_stats['pulled']} sessions pulled · listener {'on' if sync_stats['listening'] else 'off'}"
+                   + (f" · offline: {sync_stats['error']}" if sync_stats['error'] else ""))
+        for key, remote_node, _ in db.conflicts():
+            ccols = st.columns([4, 1, 1])
+            ccols[0].warning(f"{key} was changed on another server since it was last synced.")
+            if ccols[1].button("Keep ours", key=f"keep_local_{key}"):
+                db.resolve(key, "local")
+                st.rerun()
+            if ccols[2].button("Take theirs", key=f"keep_remote_{key}"):
+                db.resolve(key, "remote")
+                st.rerun()
+        login_stats = credential_index().stats()
+        st.caption(f"Logins: {login_stats['students']} students indexed{'' if login_stats['loaded'] else ' (loading)'} · "
+                   f"{login_stats['hits']} local · {login_stats['fallbacks']} database checks · "
+                   f"{login_stats['rejected']} rejected · {login_stats['locked']} locked out")
+
+        if sessions:
+            pages = (len(sessions) - 1) // SESSIONS_PER_PAGE + 1
+            page = fcols[2].number_input("Page", min_value=1, max_value=pages, value=1, key="admin_page")
+            st.caption(f"{len(sessions)} sessions · page {page} of {pages}")
+
+            visible = sessions[(page - 1) * SESSIONS_PER_PAGE: page * SESSIONS_PER_PAGE]
+            # Opened groups are read together instead of one after another
+            prefetch_sessions(db, [key for key, _, _ in visible if st.session_state.get(f"load_{key}")])
+            for key, subject, date in visible:
+                with st.expander(f"📘 {subject} — 📅 {date}"):
+                    # Delete button for this subject+date group
+                    if st.button(f"🗑 Delete Seating ({subject} on {date})", key=f"delete_{key}"):
+                        delete_session(db, key)
+                        st.success(f"🗑 Deleted seating for {subject} on {date}")
+                        st.rerun()
+
+                    # After room edits: move only the students whose seat no longer exists
+                    if st.button("♻ Re-seat after room changes", key=f"reseat_{key}"):
+                        previous = load_session(db, key, fresh=True)
+                        exam_time = previous["Time"].iloc[0] if len(previous) else ""
+                        reseated = reseat(subject, None, room_plans(DATA_FILE), datetime.strptime(date, "%Y-%m-%d"),
+                                          datetime.strptime(exam_time, "%H:%M") if exam_time else None, previous)
+                        _, changed = update_session(db, reseated, subject, date, previous)
+                        dropped = len(previous) - len(reseated)
+                        st.success(f"♻ {changed} students moved" + (f", {dropped} without a seat" if dropped else ""))
+
+                    # Records are only fetched once the group is opened
+                    if not st.toggle("Load seating", key=f"load_{key}"):
+                        continue
+
+                    df_group = load_session(db, key)
+                    row_pages = max((len(df_group) - 1) // ROWS_PER_PAGE + 1, 1)
+                    row_page = st.number_input("Rows page", min_value=1, max_value=row_pages, value=1, key=f"rows_page_{key}")
+                    st.dataframe(df_group.iloc[(row_page - 1) * ROWS_PER_PAGE: row_page * ROWS_PER_PAGE], use_container_width=True)
+                    st.caption(f"{len(df_group)} students")
+                    st.download_button("🪑 Invigilator charts (zip)",
+                                       spooled(lambda f, df=df_group: write_chart_zip(f, room_charts(df, load_classrooms(DATA_FILE)))),
+                                       f"Charts_{subject}_{date}.zip", "application/zip", key=f"charts_{key}", on_click="ignore")
+
+            st.markdown("---")
+
+            # --- Bulk export ---
+            st.subheader("📦 Export for reporting")
+            ecols = st.columns([1, 2])
+            export_format = ecols[0].radio("Format", ["Parquet", "CSV"], horizontal=True, key="export_format").lower()
+            since = ecols[1].file_uploader("Previous _manifest.json, to export only what changed since",
+                                           type="json", key="export_since")
+            previous = None
+            if since:
+                try:
+                    previous = read_manifest(since)
+                except ValueError as e:
+                    st.warning(f"{e} Exporting every session instead.")
+            st.caption("Every session in the date range above, one file per date and subject, with a _manifest.json "
+                       "to upload next time." + (f" Only changes since the export of "
+                                                  f"{datetime.fromtimestamp(previous['exported_at'] / 1000):%Y-%m-%d %H:%M}."
+                                                  if previous else ""))
+            st.download_button("📦 Export sessions (zip)",
+                               spooled(lambda f: write_export_zip(f, db, export_format, start, end, previous)),
+                               f"Seating_Export_{export_format}.zip", "application/zip", key="export_zip", on_click="ignore")
+
+            # --- Storage format ---
+            if st.button("🗜 Convert older sessions to the compact format", key="migrate_btn"):
+                migrated = migrate_sessions(db)
+                st.success(f"Converted {migrated} sessions." if migrated else "All sessions are already compact.")
 
             # --- Delete All ---
             if st.button("🚨 Delete ALL Seating Data", key="delete_all_btn"):
-                admin_seating_ref.delete()
-                db.reference("seating").delete()
+                delete_all(db)
                 st.error("⚠️ All seating data has been deleted!")
                 st.rerun()
 
@@ -343,6 +337,28 @@ if st.session_state.role == "admin":
         else:
             st.info("ℹ️ No seating arrangements found yet.")
 
+    with tabs[2]:
+        st.header("⏱ Performance")
+        pcols = st.columns([2, 2, 1, 1, 1])
+        perf_on = pcols[0].toggle("Record timings", value=perf.enabled(), key="perf_enabled")
+        sizes_on = pcols[1].toggle("Payload sizes", value=perf.sizes_enabled(), key="perf_sizes",
+                                   help="Also JSON-size every database payload; costs a serialization per call.")
+        if perf_on != perf.enabled() or sizes_on != perf.sizes_enabled():
+            perf.enable(perf_on, sizes=sizes_on)
+        if pcols[2].button("Refresh"):
+            st.rerun()
+        if pcols[3].button("Clear"):
+            perf.clear()
+            st.rerun()
+        pcols[4].download_button("Export JSONL", perf.export_jsonl(), "perf_events.jsonl", "application/json")
+
+        perf_rows = perf.summary()
+        if perf_rows:
+            st.dataframe(pd.DataFrame(perf_rows), use_container_width=True)
+            st.caption(f"Last {perf.BUFFER_SIZE:,} events · db.* rows are Firebase calls, bytes are JSON payload sizes when recorded.")
+        else:
+            st.info("No timings recorded yet.")
+
 
 
 
@@ -354,14 +370,30 @@ elif st.session_state.role == "staff":
         st.header("🧑‍🏫 Upload & Generate Seating")
         uploaded = st.file_uploader("Upload Student Excel", type=["xlsx"])
         if uploaded:
-            st.session_state.df = pd.read_excel(uploaded)
+            upload_id = getattr(uploaded, "file_id", None) or (uploaded.name, uploaded.size)
+            if st.session_state.get("upload_id") != upload_id:
+                st.session_state.df = ingest_students(uploaded.getvalue())
+                st.session_state.upload_id = upload_id
+                st.session_state.upload_data = uploaded.getvalue()  # full rows for lookups, read on demand
+                # Lookup index, re-indexed once per upload and only where the sheet changed
+                if "reg_index" not in st.session_state:
+                    st.session_state.reg_index = RegistrationIndex()
+                df_new = st.session_state.df
+                st.session_state.reg_index.rebuild(df_new["registration number"] if "registration number" in df_new.columns else [])
+                st.session_state.reg_index.clear_seats()
             st.success("Student data uploaded.")
             st.write("🔍 Columns:", st.session_state.df.columns.tolist())
 
         if st.session_state.df is not None:
-            df_norm = st.session_state.df.copy()
-            df_norm.columns = df_norm.columns.str.lower().str.strip()
-            st.session_state.df = df_norm
+            # Columns are already normalized at ingestion
+            df_norm = st.session_state.df
+
+            # Room use, for single exams and whole timetables alike
+            cols = st.columns(2)
+            pack = cols[0].checkbox("Use the fewest rooms", value=False,
+                                    help="Open only as many rooms as the exam needs, wasting the fewest seats.")
+            spacing = cols[1].slider("Keep seats empty (%)", 0, 75, 0, step=5,
+                                     help="Leave this share of every room's seats free, spread evenly; 50% is a checkerboard.")
 
             subjects = detect_subject_columns(df_norm.columns.tolist())
             subject_map = {orig: norm for orig, norm in zip(st.session_state.df.columns, df_norm.columns) if norm in subjects}
@@ -370,25 +402,41 @@ elif st.session_state.role == "staff":
                 selected_label = st.selectbox("Select Subject", list(subject_map.keys()))
                 st.session_state.selected_subject = subject_map[selected_label]
 
-                classrooms = json.load(open(DATA_FILE))
+                classrooms = spaced_rooms(room_plans(DATA_FILE), spacing)
                 exam_date = st.date_input("Exam Date", value=datetime.today(), min_value=datetime.today())
                 st.session_state.exam_time = st.time_input("Exam Time", value=st.session_state.exam_time)
 
+                keep_seats = st.checkbox("Keep existing seats", value=True,
+                                         help="When this exam is already seated, only late or displaced students get new seats.")
+
                 if st.button("Generate Seating"):
-                    seating_df = distribute_students(
-                        df_norm, st.session_state.selected_subject, classrooms, exam_date, st.session_state.exam_time
-                    )
+                    subject = st.session_state.selected_subject
+                    previous = load_session(db, session_key(subject, exam_date), fresh=True) if keep_seats else None
+                    try:
+                        if previous is not None and not previous.empty:
+                            seating_df = redistribute_students(
+                                df_norm, subject, classrooms, exam_date, st.session_state.exam_time, previous
+                            )
+                        else:
+                            if pack:
+                                packed = pack_rooms(classrooms, len(subject_roster(df_norm, subject)))
+                                st.info(f"Using {pack_summary(packed)}.")
+                                classrooms = packed.rooms
+                            seating_df = distribute_students(
+                                df_norm, subject, classrooms, exam_date, st.session_state.exam_time
+                            )
+                    except ValueError:
+                        st.error("Required columns missing.")
+                        seating_df = pd.DataFrame()
                     if not seating_df.empty:
                         st.session_state["seating_df"] = seating_df
-                        admin_key = f"{st.session_state.selected_subject.upper()}_{exam_date.strftime('%Y-%m-%d')}"
-                        db.reference(f"admin_seating/{admin_key}").set(seating_df.to_dict(orient="records"))
-
-                        for _, row in seating_df.iterrows():
-                            ref = db.reference(f"seating/{row['Registration Number']}")
-                            existing = ref.get() or []
-                            if isinstance(existing, dict): existing = [existing]
-                            existing.append(row.to_dict())
-                            ref.set(existing)
+                        st.session_state.seating_rooms = classrooms
+                        st.session_state.reg_index.add_seats(seating_df)
+                        if previous is not None and not previous.empty:
+                            _, changed = update_session(db, seating_df, subject, exam_date, previous)
+                            st.info(f"Kept existing seats; {changed} students added, moved or removed.")
+                        else:
+                            save_session(db, seating_df, subject, exam_date)
 
                         st.dataframe(seating_df)
                         csv = seating_df.to_csv(index=False).encode("utf-8")
@@ -396,15 +444,87 @@ elif st.session_state.role == "staff":
             else:
                 st.warning("No valid subject columns found.")
 
+            # --- Batch: whole timetable ---
+            st.markdown("---")
+            st.subheader("🗓 Generate Whole Timetable")
+            timetable_file = st.file_uploader("Exam Timetable Excel", type=["xlsx"], key="timetable_upload")
+            room_source = st.radio("Rooms from", ["classrooms.json", "Rooms Excel"], horizontal=True)
+            rooms_file = None
+            if room_source == "Rooms Excel":
+                rooms_file = st.file_uploader("Rooms Excel", type=["xlsx"], key="rooms_upload")
+
+            interleave = st.checkbox("Mix papers within rooms", value=False,
+                                     help="Seat the papers of each slot so that no two neighbours sit the same one.")
+
+            if st.button("Generate All Sessions"):
+                timetable_src = timetable_file or os.path.join("Data_Tables", "Exams.xlsx")
+                if room_source == "Rooms Excel":
+                    classrooms = rooms_from_sheet(pd.read_excel(rooms_file or os.path.join("Data_Tables", "ROOMS.xlsx")))
+                else:
+                    classrooms = room_plans(DATA_FILE)
+
+                bar = st.progress(0.0, text="Allocating exam slots…")
+                batch_df, issues = allocate_timetable(
+                    df_norm, load_timetable(timetable_src), classrooms,
+                    progress=lambda done, total: bar.progress(done / total, text=f"Allocated {done} of {total} exam slots"),
+                    pack=pack, spacing=spacing, interleave=interleave,
+                )
+                bar.empty()
+                if not batch_df.empty:
+                    st.session_state["seating_df"] = batch_df
+                    st.session_state.seating_rooms = classrooms
+                    keys = save_sessions(db, batch_df)
+                    st.session_state.reg_index.add_seats(batch_df)
+                    st.success(f"Generated {len(keys)} sessions for {batch_df['Registration Number'].nunique()} students.")
+                    per_slot = batch_df.groupby(["Date", "Time"])["Classroom"].nunique()
+                    st.caption(f"Rooms open per slot: {per_slot.min()}–{per_slot.max()} of {len(classrooms)}.")
+                    st.dataframe(batch_df)
+                    csv = batch_df.to_csv(index=False).encode("utf-8")
+                    st.download_button("Download CSV", csv, "Seating_Timetable.csv", "text/csv", key="batch_csv")
+                if not issues.empty:
+                    st.warning(f"{len(issues)} clashes or unseated students.")
+                    st.dataframe(issues)
+
+            # --- Hall tickets and invigilator charts for the last generated seating ---
+            last = st.session_state.get("seating_df")
+            if last is not None and not last.empty:
+                rooms = st.session_state.seating_rooms
+                st.markdown("---")
+                st.subheader("🎫 Hall Tickets & Invigilator Charts")
+                st.download_button(f"Hall tickets for {last['Registration Number'].nunique()} students (zip)",
+                                   spooled(lambda f: write_ticket_zip(f, student_tickets(last), rooms)),
+                                   "Hall_Tickets.zip", "application/zip", key="ticket_zip_download", on_click="ignore")
+                st.download_button(f"Invigilator charts for {last.groupby(['Date', 'Time', 'Classroom']).ngroups} rooms (zip)",
+                                   spooled(lambda f: write_chart_zip(f, room_charts(last, rooms))),
+                                   "Invigilator_Charts.zip", "application/zip", key="chart_zip_download", on_click="ignore")
+
     with tabs[1]:
         st.header("Search & Lookup")
-        sid = st.text_input("Registration Number to lookup")
-        if st.button("Lookup"):
-            if "registration number" in st.session_state.df.columns:
-                row = st.session_state.df[
-                    st.session_state.df["registration number"].astype(str).str.upper() == sid.strip().upper()
-                ]
-                st.write(row.to_dict(orient="records")[0] if not row.empty else "Not found.")
+        index = st.session_state.get("reg_index")
+        if st.session_state.df is None or not index:
+            st.info("Upload a student sheet with a 'registration number' column first.")
+        else:
+            mode = st.radio("Match", ["Exact", "Prefix"], horizontal=True)
+            sid = st.text_area("Registration Number(s) to lookup", help="Paste one or many, separated by lines or commas.")
+            if st.button("Lookup"):
+                if mode == "Prefix":
+                    matches = index.prefix(sid)
+                    st.write(matches if matches else "Not found.")
+                else:
+                    found = index.batch(split_ids(sid))
+                    if len(found) == 1:
+                        reg, pos = found[0]
+                        rows = student_rows(st.session_state.upload_data, [pos]) if pos is not None else None
+                        st.write(rows.iloc[0].to_dict() if rows is not None and len(rows) else "Not found.")
+                        seats = index.seats_of(reg)
+                        if seats:
+                            st.dataframe(pd.DataFrame(seats))
+                    elif found:
+                        hits = [pos for _, pos in found if pos is not None]
+                        st.dataframe(student_rows(st.session_state.upload_data, hits))
+                        missing = [reg for reg, pos in found if pos is None]
+                        if missing:
+                            st.warning(f"Not found: {', '.join(missing)}")
 
 # --- STUDENT ---
 elif st.session_state.role == "student":
@@ -414,13 +534,9 @@ elif st.session_state.role == "student":
     # --- Home Tab ---
     with tabs[0]:
         st.header("🎓 Your Exam Details")
-        seatings = db.reference(f"seating/{uid}").get()
+        seatings = student_seat_cache().get(uid)
 
         if seatings:
-            # Ensure it's a list
-            if isinstance(seatings, dict):
-                seatings = [seatings]
-
             df = pd.DataFrame(seatings)
             desired_order = ["Subject", "Date", "Time", "Classroom", "Row","Column", "Registration Number"]
             df = df[[col for col in desired_order if col in df.columns]]
@@ -432,22 +548,29 @@ elif st.session_state.role == "student":
             classroom_name = student_seat["Classroom"]
 
             # Fetch classroom dimensions from classrooms.json
-            with open(DATA_FILE, "r") as f:
-                classrooms = json.load(f)
-
-            classroom_rows = classrooms.get(classroom_name, {}).get("rows", 4)
-            classroom_cols = classrooms.get(classroom_name, {}).get("cols", 5)
+            room_cfg = load_classrooms(DATA_FILE).get(room_name(classroom_name), {})
+            classroom_rows = room_cfg.get("rows", 4)
+            classroom_cols = room_cfg.get("cols", 5)
+            classroom_layout = room_cfg.get("layout")
             student_row = int(student_seat["Row"]) - 1  # 0-indexed
             student_col = int(student_seat["Column"]) - 1
 
             st.subheader(f"📍 Your Seat in {classroom_name}")
-            visualize_seating(classroom_rows, classroom_cols, student_row, student_col)
+            visualize_seating(classroom_rows, classroom_cols, student_row, student_col, classroom_layout)
         else:
             st.info("No seating info yet.")
 
     # --- Search Tab ---
     with tabs[1]:
         st.header("📄 Hall Ticket:- ")
+        seatings = student_seat_cache().get(uid)
+        if seatings:
+            # Built on click, not on every rerun of the page
+            st.download_button("Download Hall Ticket (PDF)", lambda: ticket_pdf(uid, seatings, load_classrooms(DATA_FILE)),
+                               f"Hall_Ticket_{uid}.pdf", "application/pdf", key="ticket_download", on_click="ignore")
+            st.caption(f"{len(seatings)} exam(s), one page each, with your desk marked on the room plan.")
+        else:
+            st.info("No seating info yet.")
 
 st.markdown("""
     <style>
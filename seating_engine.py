@@ -0,0 +1,364 @@
+import re
+import sys
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed
+
+SEATING_COLUMNS = ["Subject", "Registration Number", "Classroom", "Row", "Column", "Date", "Time"]
+SUBJECT_PATTERN = re.compile(r"\b\d{2}[a-z]{3,5}\d{4}", re.IGNORECASE)
+
+
+def detect_subject_columns(columns):
+    return [col for col in columns if SUBJECT_PATTERN.search(col.strip())]
+
+
+# --- Room Geometry ---
+
+def layout_mask(rows, cols, layout=None):
+    """
+    Boolean (rows x cols) mask of usable seats from a seat-designer layout.
+    Seats the layout does not cover (e.g. after a resize) count as usable.
+    """
+    mask = np.ones((rows, cols), dtype=bool)
+    if layout:
+        saved = np.asarray(layout, dtype=bool)
+        if saved.ndim == 2:
+            r, c = min(rows, saved.shape[0]), min(cols, saved.shape[1])
+            mask[:r, :c] = saved[:r, :c]
+    return mask
+
+
+def seat_order(rows, cols, layout=None, spacing=0):
+    """
+    Serpentine seat order for one room: down the even columns, up the odd ones.
+    Returns (row_idx, col_idx) arrays with disabled seats filtered out and,
+    with `spacing`, that percentage of the rest left empty.
+    """
+    r = np.arange(rows)
+    row_idx = np.where((np.arange(cols) % 2 == 0)[:, None], r, r[::-1]).ravel()
+    col_idx = np.repeat(np.arange(cols), rows)
+    if layout:
+        keep = layout_mask(rows, cols, layout)[row_idx, col_idx]
+        row_idx, col_idx = row_idx[keep], col_idx[keep]
+    return spread_seats(row_idx, col_idx, spacing)
+
+
+def spread_seats(row_idx, col_idx, spacing):
+    """
+    Keep (100 - spacing)% of a seat order, spread evenly along it; at 50
+    the serpentine makes this a checkerboard. Rounds down, so at least
+    `spacing`% of the seats stay empty.
+    """
+    if not spacing or spacing <= 0:
+        return row_idx, col_idx
+    keep = int(len(row_idx) * (100 - min(spacing, 100)) // 100)
+    pick = np.arange(keep) * len(row_idx) // max(keep, 1)
+    return row_idx[pick], col_idx[pick]
+
+
+# Precomputed geometry of one room; see classroom_registry. `mask` is the
+# physical layout, the seat order leaves `spacing` percent of it empty.
+RoomPlan = namedtuple("RoomPlan", "rows cols mask row_idx col_idx capacity spacing", defaults=(0,))
+
+
+def room_spacing(cfg):
+    """A config's "spacing": percent of usable seats to keep empty (0 if unset)."""
+    return min(max(float(cfg.get("spacing") or 0), 0.0), 100.0)
+
+
+def compile_room(cfg):
+    rows, cols = int(cfg.get("rows", 1)), int(cfg.get("cols", 1))
+    layout, spacing = cfg.get("layout"), room_spacing(cfg)
+    row_idx, col_idx = seat_order(rows, cols, layout, spacing)
+    return RoomPlan(rows, cols, layout_mask(rows, cols, layout), row_idx, col_idx, len(row_idx), spacing)
+
+
+def spaced_plan(plan, spacing):
+    """`plan` with at least `spacing` percent of its usable seats kept empty."""
+    if spacing <= plan.spacing:
+        return plan
+    row_idx, col_idx = seat_order(plan.rows, plan.cols)
+    keep = plan.mask[row_idx, col_idx]
+    row_idx, col_idx = spread_seats(row_idx[keep], col_idx[keep], spacing)
+    return plan._replace(row_idx=row_idx, col_idx=col_idx, capacity=len(row_idx), spacing=spacing)
+
+
+def room_seats(cfg):
+    if isinstance(cfg, RoomPlan):
+        return cfg.row_idx, cfg.col_idx
+    rows, cols = int(cfg.get("rows", 1)), int(cfg.get("cols", 1))
+    return seat_order(rows, cols, cfg.get("layout"), room_spacing(cfg))
+
+
+# --- Allocation ---
+
+def subject_mask(subject_values):
+    """Boolean array: which students take the subject (cell neither blank nor 'NA')."""
+    if isinstance(subject_values.dtype, pd.CategoricalDtype):
+        # Decide once per category instead of once per student
+        labels = subject_values.cat.categories.astype(str).str.strip().str.upper()
+        codes = subject_values.cat.codes.to_numpy()
+        return np.append(np.asarray((labels != "") & (labels != "NA")), False)[codes]
+    col_data = subject_values.fillna("").astype(str).str.strip().str.upper()
+    return ((col_data != "") & (col_data != "NA")).to_numpy()
+
+
+def subject_registrations(subject_values, registrations):
+    """Sorted registration numbers of students who take the subject."""
+    regs = registrations[subject_mask(subject_values)].dropna()
+    regs = regs.astype(str).str.strip().str.upper().to_numpy(dtype=object)
+    return np.sort(regs, kind="stable")
+
+
+def assign_seats(total, classrooms):
+    """
+    Seat the first `total` students, filling rooms in config order.
+    Returns (room_names, room_idx, row_idx, col_idx); students beyond the
+    combined capacity are left out, as before.
+    """
+    names, room_parts, row_parts, col_parts = [], [], [], []
+    placed = 0
+    for room_name, cfg in classrooms.items():
+        if placed >= total:
+            break
+        row_idx, col_idx = room_seats(cfg)
+        take = min(len(row_idx), total - placed)
+        room_parts.append(np.full(take, len(names), dtype=np.intp))
+        row_parts.append(row_idx[:take])
+        col_parts.append(col_idx[:take])
+        names.append(room_name)
+        placed += take
+
+    if not names:
+        empty = np.empty(0, dtype=np.intp)
+        return names, empty, empty, empty
+    return names, np.concatenate(room_parts), np.concatenate(row_parts), np.concatenate(col_parts)
+
+
+# --- Interleaved Allocation ---
+# Orthogonal neighbours always differ in checkerboard colour, (row + col) % 2,
+# so splitting a slot's subjects into two groups, one per colour, seats no
+# student next to someone taking the same paper. Disabled seats only remove
+# squares from the board, which keeps the colouring valid.
+
+def colour_groups(sizes):
+    """Subject -> colour (0 or 1), largest subjects first onto the lighter colour."""
+    groups = np.zeros(len(sizes), dtype=np.intp)
+    totals = [0, 0]
+    for j in np.argsort(-np.asarray(sizes), kind="stable"):
+        g = int(totals[1] < totals[0])
+        groups[j] = g
+        totals[g] += sizes[j]
+    return groups
+
+
+def interleave_demand(sizes):
+    """Seats an interleaved slot needs: a colour holds about half of each room."""
+    sizes = np.asarray(sizes)
+    groups = colour_groups(sizes)
+    return int(max(sizes.sum(), 2 * max(sizes[groups == 0].sum(), sizes[groups == 1].sum(), 0)))
+
+
+def interleave_seats(sizes, classrooms):
+    """
+    Seat consecutive blocks of `sizes` students (one block per subject)
+    so that no two orthogonal neighbours share a subject. One group of
+    subjects takes the dark seats and the other the light ones, each in
+    serpentine order over the same rooms, and rooms open until both sides
+    fit. If a subject dominates and the rooms run out, the rest take the
+    free seats with the fewest same-subject neighbours.
+
+    Returns (room_names, student, room_idx, row_idx, col_idx) in seat
+    order, where `student` indexes the blocks; students left out have
+    no seat.
+    """
+    sizes = np.asarray(sizes, dtype=np.intp)
+    names = list(classrooms)
+    seats = [room_seats(classrooms[name]) for name in names]
+    counts = np.array([len(row_idx) for row_idx, _ in seats], dtype=np.intp)
+    empty = np.empty(0, dtype=np.intp)
+    seat_room = np.repeat(np.arange(len(names)), counts)
+    seat_row = np.concatenate([row_idx for row_idx, _ in seats] or [empty])
+    seat_col = np.concatenate([col_idx for _, col_idx in seats] or [empty])
+    colour = (seat_row + seat_col) % 2
+
+    subject_of = np.repeat(np.arange(len(sizes)), sizes)
+    student_group = colour_groups(sizes)[subject_of]
+
+    # Each room is its own board, so its colours can be swapped: give the
+    # side with more students still to seat the room's larger colour, and
+    # open rooms until both sides fit
+    per_room = np.stack([np.bincount(seat_room, weights=colour == g, minlength=len(names)) for g in (0, 1)])
+    remaining = np.bincount(student_group, minlength=2).astype(float)
+    swap = np.zeros(len(names), dtype=np.intp)
+    opened = 0
+    while opened < len(names) and remaining.max() > 0:
+        swap[opened] = (remaining[0] >= remaining[1]) != (per_room[0, opened] >= per_room[1, opened])
+        remaining -= per_room[:, opened][::-1] if swap[opened] else per_room[:, opened]
+        opened += 1
+    colour = colour ^ swap[seat_room]
+
+    occupant = np.full(len(seat_room), -1, dtype=np.intp)
+    overflow = []
+    for g in (0, 1):
+        free = np.flatnonzero((seat_room < opened) & (colour == g))
+        students = np.flatnonzero(student_group == g)
+        take = min(len(free), len(students))
+        occupant[free[:take]] = students[:take]
+        overflow.append(students[take:])
+    overflow = np.concatenate(overflow)
+    if len(overflow):
+        _seat_overflow(occupant, overflow, subject_of, seat_room, seat_row, seat_col, counts, seats)
+
+    taken = np.flatnonzero(occupant >= 0)
+    used = np.unique(seat_room[taken])
+    renumber = np.full(len(names), -1, dtype=np.intp)
+    renumber[used] = np.arange(len(used))
+    return ([names[i] for i in used], occupant[taken], renumber[seat_room[taken]],
+            seat_row[taken], seat_col[taken])
+
+
+def _seat_overflow(occupant, overflow, subject_of, seat_room, seat_row, seat_col, counts, seats):
+    """
+    Put students who fit on neither colour into the free seats, each
+    subject (largest first) on the seats with the fewest neighbours
+    already taking it. Rooms are laid side by side on one board, a
+    column apart, so neighbour counts are four shifted comparisons.
+    """
+    widths = np.array([int(col_idx.max()) + 2 if len(col_idx) else 1 for _, col_idx in seats], dtype=np.intp)
+    offsets = np.concatenate(([0], np.cumsum(widths)[:-1]))
+    height = max((int(row_idx.max()) + 1 for row_idx, _ in seats if len(row_idx)), default=1)
+    y, x = seat_row + 1, seat_col + offsets[seat_room] + 1
+    board = np.full((height + 2, int(widths.sum()) + 2), -1, dtype=np.intp)
+    board[y, x] = np.where(occupant >= 0, subject_of[np.maximum(occupant, 0)], -1)
+
+    by_subject = subject_of[overflow]
+    for s in np.unique(by_subject)[np.argsort(-np.bincount(by_subject)[np.unique(by_subject)], kind="stable")]:
+        free = np.flatnonzero(occupant < 0)
+        if not len(free):
+            return
+        fy, fx = y[free], x[free]
+        clashes = ((board[fy - 1, fx] == s).astype(np.intp) + (board[fy + 1, fx] == s)
+                   + (board[fy, fx - 1] == s) + (board[fy, fx + 1] == s))
+        students = overflow[by_subject == s]
+        chosen = free[np.argsort(clashes, kind="stable")[:len(students)]]
+        occupant[chosen] = students[:len(chosen)]
+        board[y[chosen], x[chosen]] = s
+
+
+def seating_frame(subject, registrations, names, room_idx, row_idx, col_idx, exam_date, exam_time):
+    """Build the seating frame column-wise; `subject` may be one name or one per seat."""
+    labels = np.array([f"Room - {name}" for name in names], dtype=object)
+    return pd.DataFrame({
+        "Subject": subject.upper() if isinstance(subject, str) else subject,
+        "Registration Number": registrations[:len(room_idx)],
+        "Classroom": labels[room_idx],
+        "Row": row_idx + 1,
+        "Column": col_idx + 1,
+        "Date": exam_date.strftime("%Y-%m-%d") if exam_date else "",
+        "Time": exam_time.strftime("%H:%M") if exam_time else "",
+    }, columns=SEATING_COLUMNS)
+
+
+def build_seating(subject, registrations, classrooms, exam_date, exam_time):
+    """Seat sorted registration numbers of one subject."""
+    names, room_idx, row_idx, col_idx = assign_seats(len(registrations), classrooms)
+    return seating_frame(subject, registrations, names, room_idx, row_idx, col_idx, exam_date, exam_time)
+
+
+def subject_roster(df, subject):
+    """
+    Sorted registration numbers of the sheet's students who take `subject`.
+    Raises ValueError when the subject or registration column is missing.
+    """
+    subject_col = subject.lower().strip()
+    columns = dict(zip(df.columns.str.lower().str.strip(), df.columns))
+
+    if subject_col not in columns or "registration number" not in columns:
+        raise ValueError("Required columns missing.")
+
+    return subject_registrations(df[columns[subject_col]], df[columns["registration number"]])
+
+
+@timed("allocate.distribute_students")
+def distribute_students(df, subject, classrooms, exam_date, exam_time):
+    """Seat every student of the sheet who takes `subject`, in registration order."""
+    return build_seating(subject, subject_roster(df, subject), classrooms, exam_date, exam_time)
+
+
+# --- Incremental Re-allocation ---
+
+def reseat(subject, registrations, classrooms, exam_date, exam_time, previous):
+    """
+    Re-seat a stored session against new inputs without reshuffling it.
+    `previous` is the session's records as a frame; `registrations` the new
+    sorted roster, or None to keep the stored one. Students still registered
+    whose seat still exists keep it; newcomers and students whose room or
+    seat was removed fill the free seats in serpentine order. Returns the
+    whole new seating, in seat order.
+    """
+    names = list(classrooms)
+    seats = [room_seats(classrooms[name]) for name in names]
+    sizes = np.array([len(row_idx) for row_idx, _ in seats], dtype=np.intp)
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    empty = np.empty(0, dtype=np.intp)
+    seat_room = np.repeat(np.arange(len(names)), sizes)
+    seat_row = np.concatenate([row_idx for row_idx, _ in seats] or [empty])
+    seat_col = np.concatenate([col_idx for _, col_idx in seats] or [empty])
+
+    prev_regs = previous["Registration Number"].astype(str).str.strip().str.upper().to_numpy(dtype=object)
+    if registrations is None:
+        registrations = np.unique(prev_regs)
+    registrations = np.asarray(registrations, dtype=object)
+
+    # Seat number each stored record still maps to, -1 once its seat is gone
+    seat = np.full(len(previous), -1, dtype=np.intp)
+    rooms = {f"Room - {name}": i for i, name in enumerate(names)}
+    room_of = previous["Classroom"].map(rooms).to_numpy()
+    rows = pd.to_numeric(previous["Row"], errors="coerce").to_numpy() - 1
+    cols = pd.to_numeric(previous["Column"], errors="coerce").to_numpy() - 1
+    for i, (row_idx, col_idx) in enumerate(seats):
+        here = np.flatnonzero(room_of == i)
+        if not len(here) or not len(row_idx):
+            continue
+        grid = np.full((row_idx.max() + 1, col_idx.max() + 1), -1, dtype=np.intp)
+        grid[row_idx, col_idx] = offsets[i] + np.arange(len(row_idx))
+        r, c = rows[here], cols[here]
+        inside = (r >= 0) & (r < grid.shape[0]) & (c >= 0) & (c < grid.shape[1])
+        seat[here[inside]] = grid[r[inside].astype(np.intp), c[inside].astype(np.intp)]
+
+    # Keep one seat per student and one student per seat
+    kept = np.flatnonzero((seat >= 0) & pd.Series(prev_regs, dtype=object).isin(list(registrations)).to_numpy())
+    kept = kept[~pd.Series(prev_regs[kept], dtype=object).duplicated().to_numpy()]
+    kept = kept[~pd.Series(seat[kept]).duplicated().to_numpy()]
+    kept_regs, kept_seats = prev_regs[kept], seat[kept]
+
+    pending = registrations[~pd.Series(registrations, dtype=object).isin(list(kept_regs)).to_numpy()]
+    free = np.setdiff1d(np.arange(offsets[-1]), kept_seats)[:len(pending)]
+
+    taken = np.concatenate((kept_seats, free))
+    order = np.argsort(taken, kind="stable")
+    taken, regs = taken[order], np.concatenate((kept_regs, pending[:len(free)]))[order]
+    return seating_frame(subject, regs, names, seat_room[taken], seat_row[taken], seat_col[taken],
+                         exam_date, exam_time)
+
+
+@timed("allocate.redistribute_students")
+def redistribute_students(df, subject, classrooms, exam_date, exam_time, previous):
+    """distribute_students, keeping the seats of a stored session where possible."""
+    return reseat(subject, subject_roster(df, subject), classrooms, exam_date, exam_time, previous)
+
+
+# --- Export ---
+
+def export_seating(seating_df, path):
+    """Write seating as CSV, or Parquet when the path ends in .parquet; '-' means stdout."""
+    if path == "-":
+        seating_df.to_csv(sys.stdout, index=False)
+    elif path.lower().endswith(".parquet"):
+        seating_df.to_parquet(path, index=False)
+    else:
+        seating_df.to_csv(path, index=False)
@@ -0,0 +1,260 @@
+"""
+Bulk export of stored seating sessions for BI tools: every session, or a
+date range, streamed from storage a few sessions at a time into a
+Hive-partitioned Parquet tree or a zipped set of CSVs. A manifest
+records the watermark, so later exports can carry only changed sessions.
+
+    python seating_export.py exports/                      # Parquet tree, changes since the last run
+    python seating_export.py exports/ --format csv --full   # every session again
+    python seating_export.py term.zip --start 2026-01-01 --end 2026-01-31
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import zipfile
+from urllib.parse import quote
+
+from db_client import get_many
+from instrumentation import span
+from seating_store import decode_session, list_sessions, parse_session_key
+
+EXPORT_BATCH = 16  # sessions read (and held in memory) at a time
+MANIFEST = "_manifest.json"  # "_" so dataset readers skip it
+FORMATS = ("parquet", "csv")
+PARTITION_COLUMNS = ["Date", "Subject"]  # the directory levels, as Hive-style `column=value`
+
+
+# --- Planning ---
+
+def session_stamps(db, keys):
+    """Each session's `saved` time in ms, read field by field; None for nodes written before it was stored."""
+    return dict(zip(keys, get_many(db, [f"admin_seating/{key}/saved" for key in keys])))
+
+
+def plan_export(db, start=None, end=None, previous=None):
+    """
+    (keys to export, keys removed, manifest) for sessions dated within
+    `start`/`end` (inclusive 'YYYY-MM-DD', None for open). With the
+    `previous` manifest only new sessions and those whose `saved` stamp
+    differs from it are exported, and sessions it listed in the range
+    that are gone come back as removed. Stamps are compared per session
+    rather than against the watermark alone, so a session written by a
+    server with a slow clock is not skipped; sessions without a stamp
+    (format 1) cannot be compared and are always exported.
+    """
+    keys = [key for key, _, _ in sorted(list_sessions(db, start=start, end=end), key=lambda s: (s[2], s[1]))]
+    stamps = session_stamps(db, keys)
+    known = (previous or {}).get("sessions", {})
+    if previous is None:
+        changed, removed = keys, []
+    else:
+        changed = [key for key in keys if stamps[key] is None or key not in known or stamps[key] != known[key]]
+        removed = [key for key in known if key not in stamps and _in_range(key, start, end)]
+
+    sessions = {key: stamp for key, stamp in known.items() if key not in removed}
+    sessions.update(stamps)
+    saved = [stamp for stamp in sessions.values() if stamp is not None]
+    manifest = {
+        "exported_at": int(time.time() * 1000),
+        "watermark": max(saved, default=(previous or {}).get("watermark")),
+        "start": start,
+        "end": end,
+        "incremental": previous is not None,
+        "changed": changed,
+        "removed": removed,
+        "rows": 0,
+        "sessions": sessions,
+    }
+    return changed, removed, manifest
+
+
+def read_manifest(fileobj):
+    """
+    A previous export's manifest from an open file, checked for what an
+    incremental export relies on. Raises ValueError when it is not one.
+    """
+    try:
+        manifest = json.load(fileobj)
+    except ValueError:
+        raise ValueError("The previous manifest is not valid JSON.") from None
+    if not isinstance(manifest, dict):
+        raise ValueError("The previous manifest is not a seating export manifest.")
+    sessions, exported_at = manifest.get("sessions"), manifest.get("exported_at")
+    if not isinstance(sessions, dict) or not all(stamp is None or isinstance(stamp, int) for stamp in sessions.values()):
+        raise ValueError("The previous manifest has no valid session list.")
+    if not isinstance(exported_at, int):
+        raise ValueError("The previous manifest has no export time.")
+    return manifest
+
+
+def _in_range(key, start, end):
+    date = parse_session_key(key)[1]
+    return not ((start and date < start) or (end and date > end))
+
+
+# --- Streaming ---
+
+def iter_sessions(db, keys, batch=EXPORT_BATCH):
+    """(key, seating frame) for each session, read `batch` at a time so only one batch is in memory."""
+    for first in range(0, len(keys), batch):
+        chunk = keys[first:first + batch]
+        for key, value in zip(chunk, get_many(db, [f"admin_seating/{key}" for key in chunk])):
+            if value:
+                yield key, decode_session(value)
+
+
+def partition_name(key, fmt):
+    """`Date=<date>/Subject=<subject>/seating.<fmt>`, one file per session, values URI-escaped."""
+    subject, date = parse_session_key(key)
+    return f"Date={quote(date, safe='')}/Subject={quote(subject, safe='')}/seating.{fmt}"
+
+
+def session_bytes(frame, fmt):
+    """
+    One session's file: Parquet without the partition columns (readers
+    take them from the path), or CSV with every column.
+    """
+    if fmt == "csv":
+        return frame.to_csv(index=False).encode("utf-8")
+    out = io.BytesIO()
+    frame.drop(columns=PARTITION_COLUMNS).to_parquet(out, index=False)
+    return out.getvalue()
+
+
+def _export(db, put, fmt, start, end, previous, batch):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; use one of {', '.join(FORMATS)}.")
+    if previous is not None and previous.get("format") != fmt:
+        previous = None  # the earlier files are in another format: start over
+    changed, removed, manifest = plan_export(db, start, end, previous)
+    manifest["format"] = fmt
+    with span("export.sessions", f"{len(changed)} sessions"):
+        for key, frame in iter_sessions(db, changed, batch):
+            put(partition_name(key, fmt), session_bytes(frame, fmt))
+            manifest["rows"] += len(frame)
+    return removed, manifest
+
+
+# --- Targets ---
+
+def write_export_zip(fileobj, db, fmt="parquet", start=None, end=None, previous=None, batch=EXPORT_BATCH):
+    """
+    Stream the export into a zip: one partition file per session, then
+    `_manifest.json`. Returns the manifest; its `removed` list tells the
+    reader which partitions to drop.
+    """
+    method = zipfile.ZIP_STORED if fmt == "parquet" else zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(fileobj, "w", method) as archive:
+        _, manifest = _export(db, archive.writestr, fmt, start, end, previous, batch)
+        archive.writestr(MANIFEST, json.dumps(manifest, indent=1))
+    return manifest
+
+
+def export_to_folder(db, folder, fmt="parquet", start=None, end=None, incremental=True, batch=EXPORT_BATCH):
+    """
+    Mirror the sessions into `folder` as a partitioned dataset. Changed
+    sessions overwrite their own file, removed ones are deleted, and the
+    manifest is replaced last, so an interrupted export is simply run
+    again. With `incremental`, the folder's manifest is the watermark;
+    one written in another format means a full export.
+    """
+    previous = None
+    path = os.path.join(folder, MANIFEST)
+    if incremental and os.path.exists(path):
+        with open(path) as f:
+            try:
+                previous = read_manifest(f)
+            except ValueError as e:
+                print(f"{e} Exporting every session.", file=sys.stderr)
+
+    def put(name, data):
+        target = os.path.join(folder, *name.split("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Written beside the target under a dot name, which readers skip, then swapped in
+        spool = os.path.join(os.path.dirname(target), f".{os.path.basename(target)}.tmp")
+        with open(spool, "wb") as f:
+            f.write(data)
+        os.replace(spool, target)
+
+    removed, manifest = _export(db, put, fmt, start, end, previous, batch)
+    for key in removed:
+        target = os.path.join(folder, *partition_name(key, fmt).split("/"))
+        if os.path.exists(target):
+            os.remove(target)
+            for parent in (os.path.dirname(target), os.path.dirname(os.path.dirname(target))):
+                if not os.listdir(parent):
+                    os.rmdir(parent)
+    os.makedirs(folder, exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+    return manifest
+
+
+def export_summary(manifest):
+    removed = len(manifest["removed"])
+    return (f"{len(manifest['changed'])} of {len(manifest['sessions'])} sessions exported "
+            f"({manifest['rows']} seats)" + (f", {removed} removed" if removed else ""))
+
+
+# --- Command Line ---
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="folder for a partitioned dataset, or a .zip path")
+    parser.add_argument("--format", choices=FORMATS, default="parquet", help="file format (default: parquet)")
+    parser.add_argument("--start", help="first exam date, YYYY-MM-DD")
+    parser.add_argument("--end", help="last exam date, YYYY-MM-DD")
+    parser.add_argument("--full", action="store_true", help="export every session, ignoring the folder's manifest")
+    parser.add_argument("--since", help="with a .zip output: the previous _manifest.json, to export only changes")
+    parser.add_argument("--local", default="seating_local.db",
+                        help="local seating store to read (default: seating_local.db)")
+    parser.add_argument("--firebase", help="read Firebase at this database URL instead of the local store")
+    parser.add_argument("--key", default="firebase_key.json", help="service account key for --firebase")
+    args = parser.parse_args(argv)
+    if args.since and not args.output.lower().endswith(".zip"):
+        parser.error("--since is for .zip outputs; a folder keeps its own manifest")
+    return args
+
+
+def open_db(args):
+    if args.firebase:
+        import firebase_admin
+        from firebase_admin import credentials, db as firebase_db
+        from db_client import DbClient
+        firebase_admin.initialize_app(credentials.Certificate(args.key), {"databaseURL": args.firebase})
+        return DbClient(firebase_db)
+    from local_store import LocalDb
+    if not os.path.exists(args.local):
+        raise FileNotFoundError(f"No local seating store at {args.local}.")
+    return LocalDb(None, args.local)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        db = open_db(args)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if args.output.lower().endswith(".zip"):
+        previous = None
+        if args.since:
+            with open(args.since) as f:
+                try:
+                    previous = read_manifest(f)
+                except ValueError as e:
+                    print(f"{e} Exporting every session.", file=sys.stderr)
+        with open(args.output, "wb") as f:
+            manifest = write_export_zip(f, db, args.format, args.start, args.end, previous)
+    else:
+        manifest = export_to_folder(db, args.output, args.format, args.start, args.end, incremental=not args.full)
+    print(f"{export_summary(manifest)} to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
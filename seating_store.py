@@ -0,0 +1,392 @@
+import base64
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from db_client import get_many, update_many
+from seating_engine import SEATING_COLUMNS
+
+CHUNK_SIZE = 2000  # paths per multi-location update
+SESSION_CACHE_SIZE = 32  # stored admin_seating nodes kept in memory
+
+
+class LruCache:
+    """Small thread-safe LRU map shared by all Streamlit sessions."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_sessions = LruCache(SESSION_CACHE_SIZE)
+
+
+# --- Keys & Records ---
+
+def session_key(subject, exam_date):
+    date = exam_date if isinstance(exam_date, str) else exam_date.strftime("%Y-%m-%d")
+    return f"{subject.upper()}_{date}"
+
+
+def parse_session_key(key):
+    """Split '<SUBJECT>_<YYYY-MM-DD>' back into (subject, date)."""
+    subject, _, date = key.rpartition("_")
+    return (subject, date) if subject else (key, "")
+
+
+def seat_records(value, reg=None):
+    """
+    Flatten a `seating/<reg>` node into a list of seat records. Handles the
+    old list format, a single record, the per-session record children of
+    format 1 and the compact per-session strings of format 2 (which need
+    `reg` to fill in the registration number).
+    """
+    if not value:
+        return []
+    if isinstance(value, list):
+        return [rec for rec in value if isinstance(rec, dict)]
+    if "Subject" in value:
+        return [value]
+    records = []
+    for key, rec in value.items():
+        if isinstance(rec, dict):
+            records.append(rec)
+        elif isinstance(rec, str):
+            records.append(_expand_child(key, rec, reg))
+    return records
+
+
+# --- Compact Format ---
+# Format 2 stores a session as one node of primitive fields, so a shallow
+# read returns all of it:
+#   {"v": 2, "subject", "date", "time", "count",
+#    "rooms": JSON list of classroom labels,
+#    "regs":  base64(zlib("\n".join(registration numbers))),
+#    "seats": base64(zlib(uint16 array of room index, row, col; 3 x count)),
+#    "saved": milliseconds since the epoch when written (absent on older nodes)}
+# and each student's `seating/<reg>/<key>` as "<classroom>|<row>|<col>|<time>".
+# Format 1 (a list of full records per session) is still read.
+
+FORMAT = 2
+
+
+def is_compact(value):
+    return isinstance(value, dict) and value.get("v") == FORMAT
+
+
+def _pack(data):
+    return base64.b64encode(zlib.compress(data, 6)).decode("ascii")
+
+
+def _unpack(text):
+    return zlib.decompress(base64.b64decode(text))
+
+
+def encode_session(seating_df):
+    """A session's seating frame as one format-2 node (None when empty)."""
+    if seating_df.empty:
+        return None
+    first = seating_df.iloc[0]
+    rooms, room_idx = np.unique(seating_df["Classroom"].astype(str).to_numpy(), return_inverse=True)
+    seats = np.stack([room_idx, seating_df["Row"].to_numpy(dtype=np.int64) - 1,
+                      seating_df["Column"].to_numpy(dtype=np.int64) - 1])
+    return {
+        "v": FORMAT,
+        "subject": str(first["Subject"]),
+        "date": str(first["Date"]),
+        "time": str(first["Time"]),
+        "count": len(seating_df),
+        "rooms": json.dumps(rooms.tolist()),
+        "regs": _pack("\n".join(seating_df["Registration Number"].astype(str)).encode()),
+        "seats": _pack(seats.astype("<u2").tobytes()),
+        "saved": int(time.time() * 1000),
+    }
+
+
+def decode_session(value):
+    """
+    Expand a stored `admin_seating/<key>` node (either format) into the
+    seating frame shape. `attrs["version"]` records the stored format and
+    `attrs["saved"]` when it was written, if known.
+    """
+    if is_compact(value):
+        count = int(value["count"])
+        seats = np.frombuffer(_unpack(value["seats"]), dtype="<u2").reshape(3, count).astype(np.int64)
+        rooms = np.array(json.loads(value["rooms"]), dtype=object)
+        frame = pd.DataFrame({
+            "Subject": value["subject"],
+            "Registration Number": _unpack(value["regs"]).decode().split("\n"),
+            "Classroom": rooms[seats[0]],
+            "Row": seats[1] + 1,
+            "Column": seats[2] + 1,
+            "Date": value["date"],
+            "Time": value["time"],
+        }, columns=SEATING_COLUMNS)
+    else:
+        frame = pd.DataFrame(seat_records(value), columns=SEATING_COLUMNS)
+    frame.attrs["version"] = FORMAT if is_compact(value) else 1
+    frame.attrs["saved"] = value.get("saved") if is_compact(value) else None
+    return frame
+
+
+def seat_children(seating_df):
+    """Each student's compact `seating/<reg>/<key>` string, indexed like the frame."""
+    return (seating_df["Classroom"].astype(str) + "|" + seating_df["Row"].astype(str) + "|"
+            + seating_df["Column"].astype(str) + "|" + seating_df["Time"].astype(str))
+
+
+def _expand_child(key, text, reg=None):
+    subject, date = parse_session_key(key)
+    classroom, row, col, exam_time = text.rsplit("|", 3)
+    return {"Subject": subject, "Registration Number": reg, "Classroom": classroom,
+            "Row": int(row), "Column": int(col), "Date": date, "Time": exam_time}
+
+
+# --- Reads ---
+
+def list_sessions(db, subject=None, start=None, end=None):
+    """
+    (key, subject, date) of stored sessions, newest first, from a shallow
+    read of `admin_seating` so no seating records are downloaded.
+    `start`/`end` are inclusive 'YYYY-MM-DD' bounds.
+    """
+    keys = db.reference("admin_seating").get(shallow=True) or {}
+    needle = (subject or "").strip().upper()
+    sessions = []
+    for key in keys:
+        subj, date = parse_session_key(key)
+        if needle and needle not in subj.upper():
+            continue
+        if (start and date < start) or (end and date > end):
+            continue
+        sessions.append((key, subj, date))
+    sessions.sort(key=lambda s: (s[2], s[1]), reverse=True)
+    return sessions
+
+
+def load_session(db, key, fresh=False):
+    """
+    One session as a seating frame. The stored node is cached (compact, so
+    cheap to keep) and expanded on every call; `fresh` skips the cache.
+    """
+    value = None if fresh else _sessions.get(key)
+    if value is None:
+        value = db.reference(f"admin_seating/{key}").get()
+        _sessions.put(key, value if value is not None else {})
+    return decode_session(value)
+
+
+def prefetch_sessions(db, keys):
+    """Read the uncached sessions among `keys` concurrently, so load_session then hits the cache."""
+    missing = [key for key in keys if _sessions.get(key) is None]
+    for key, value in zip(missing, get_many(db, [f"admin_seating/{key}" for key in missing])):
+        _sessions.put(key, value if value is not None else {})
+
+
+def forget_session(key=None):
+    """Drop one cached session (or all of them) after it changes in the database."""
+    if key is None:
+        _sessions.clear()
+    else:
+        _sessions.discard(key)
+
+
+# --- Writes ---
+
+def chunked_update(db, updates, chunk_size=CHUNK_SIZE):
+    """
+    Apply a multi-location update in chunks, concurrently through a
+    DbClient: the chunks touch disjoint paths. Returns the number of requests.
+    """
+    items = list(updates.items())
+    update_many(db, "/", [dict(items[start:start + chunk_size]) for start in range(0, len(items), chunk_size)])
+    return (len(items) + chunk_size - 1) // chunk_size
+
+
+def session_updates(seating_df, key):
+    """
+    Multi-location update paths for one session: the compact admin node
+    and each student's `seating/<reg>/<key>` string. The compact node
+    lists its own students, so the format-1 reverse index is dropped.
+    """
+    updates = {
+        f"admin_seating/{key}": encode_session(seating_df),
+        f"seating_index/{key}": None,
+    }
+    for reg, child in zip(seating_df["Registration Number"], seat_children(seating_df)):
+        updates[f"seating/{reg}/{key}"] = child
+    return updates
+
+
+def _drop_stale(updates, key, previous):
+    # Students who were in a previous run of this session but not in this one
+    for reg in previous or []:
+        updates.setdefault(f"seating/{reg}/{key}", None)
+
+
+def save_session(db, seating_df, subject, exam_date, chunk_size=CHUNK_SIZE):
+    """
+    Write a generated session to `admin_seating/<key>` and every student's
+    `seating/<reg>/<key>` with fan-out updates instead of a get+set per
+    student. Re-generating a session overwrites its own children only, so
+    concurrent sessions never clobber each other.
+    """
+    key = session_key(subject, exam_date)
+    updates = session_updates(seating_df, key)
+    _drop_stale(updates, key, session_registrations(db, key))
+    chunked_update(db, updates, chunk_size)
+    forget_session(key)
+    return key
+
+
+def save_sessions(db, seating_df, chunk_size=CHUNK_SIZE):
+    """Write every (Subject, Date) session of a batch run in one chunked fan-out."""
+    updates = {}
+    groups = list(seating_df.groupby(["Subject", "Date"], sort=False))
+    keys = [session_key(subject, date) for (subject, date), _ in groups]
+    for key, (_, group), previous in zip(keys, groups, registrations_of(db, keys)):
+        updates.update(session_updates(group, key))
+        _drop_stale(updates, key, previous)
+        forget_session(key)
+    if updates:
+        chunked_update(db, updates, chunk_size)
+    return keys
+
+
+def update_session(db, seating_df, subject, exam_date, previous, chunk_size=CHUNK_SIZE):
+    """
+    Write a re-seated session as a diff against the stored `previous`
+    frame (from load_session): besides the compact admin node, only
+    students whose seat changed, who arrived or who left are written, so
+    the cost follows the size of the change. Format-1 sessions get a full
+    save_session instead. Returns (key, students changed).
+    """
+    key = session_key(subject, exam_date)
+    if previous is None or previous.attrs.get("version") != FORMAT:
+        save_session(db, seating_df, subject, exam_date, chunk_size)
+        return key, len(seating_df)
+
+    stored = dict(zip(previous["Registration Number"], seat_children(previous)))
+    updates = {f"admin_seating/{key}": encode_session(seating_df)}
+    for reg, child in zip(seating_df["Registration Number"], seat_children(seating_df)):
+        if stored.pop(reg, None) != child:
+            updates[f"seating/{reg}/{key}"] = child
+    for reg in stored:
+        updates[f"seating/{reg}/{key}"] = None
+
+    chunked_update(db, updates, chunk_size)
+    forget_session(key)
+    return key, len(updates) - 1
+
+
+# --- Deletes ---
+
+def session_registrations(db, key):
+    """
+    Registration numbers seated in a session, from its compact node or,
+    for format 1, from the reverse index (None if unindexed).
+    """
+    return registrations_of(db, [key])[0]
+
+
+def registrations_of(db, keys):
+    """session_registrations for several sessions, read concurrently."""
+    values = get_many(db, [f"admin_seating/{key}" for key in keys], shallow=True)
+    regs = [decode_session(value)["Registration Number"].tolist() if is_compact(value) else None for value in values]
+    legacy = [i for i, found in enumerate(regs) if found is None]
+    for i, index in zip(legacy, get_many(db, [f"seating_index/{keys[i]}" for i in legacy], shallow=True)):
+        regs[i] = list(index) if index else None
+    return regs
+
+
+def delete_session(db, key, chunk_size=CHUNK_SIZE):
+    """
+    Remove a session everywhere with chunked `update({path: None})` calls:
+    student children first, then the index and admin records last, so an
+    interrupted delete can simply be run again. Cost depends only on the
+    session's size, not on how many other exams its students sit.
+    """
+    regs = session_registrations(db, key)
+    indexed = regs is not None
+    if not indexed:
+        regs = [rec["Registration Number"] for rec in seat_records(db.reference(f"admin_seating/{key}").get())]
+
+    chunked_update(db, {f"seating/{reg}/{key}": None for reg in regs}, chunk_size)
+    if not indexed:
+        _purge_legacy_lists(db, key, regs)
+    db.reference("/").update({f"seating_index/{key}": None, f"admin_seating/{key}": None})
+    forget_session(key)
+    return len(regs)
+
+
+def _purge_legacy_lists(db, key, regs, chunk_size=CHUNK_SIZE):
+    """Sessions saved before the index may still sit in old list-format student nodes."""
+    subject, date = parse_session_key(key)
+    updates = {}
+    for reg, value in zip(regs, get_many(db, [f"seating/{reg}" for reg in regs])):
+        items = enumerate(value) if isinstance(value, list) else value.items() if isinstance(value, dict) else ()
+        for child, rec in items:
+            if isinstance(rec, dict) and rec.get("Subject") == subject and rec.get("Date") == date:
+                updates[f"seating/{reg}/{child}"] = None
+    chunked_update(db, updates, chunk_size)
+
+
+def delete_all(db):
+    db.reference("/").update({"admin_seating": None, "seating": None, "seating_index": None})
+    forget_session()
+
+
+# --- Migration ---
+
+def migrate_session(db, key, chunk_size=CHUNK_SIZE):
+    """
+    Rewrite one format-1 session in the compact format. Student children
+    are overwritten in place, old list-format entries purged and the
+    reverse index dropped; safe to re-run. Returns False if already compact.
+    """
+    value = db.reference(f"admin_seating/{key}").get()
+    if is_compact(value) or not value:
+        return False
+    previous = decode_session(value)
+    indexed = db.reference(f"seating_index/{key}").get(shallow=True) is not None
+    subject, date = parse_session_key(key)
+    save_session(db, previous, subject, date, chunk_size)
+    if not indexed:
+        _purge_legacy_lists(db, key, previous["Registration Number"].tolist(), chunk_size)
+    return True
+
+
+def migrate_sessions(db, chunk_size=CHUNK_SIZE):
+    """Migrate every stored format-1 session; returns how many were rewritten."""
+    return sum(migrate_session(db, key, chunk_size) for key, _, _ in list_sessions(db))
@@ -0,0 +1,149 @@
+import hashlib
+import io
+import os
+import time
+
+import pandas as pd
+
+from instrumentation import span, timed
+from seating_engine import detect_subject_columns
+
+
+def _user_cache_dir():
+    if os.name == "nt":
+        return os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    return os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+
+
+# Cached sheets hold student data, so they live in the user's cache directory (or SEATING_CACHE_DIR),
+# not the working directory, and are deleted a week after their last use
+CACHE_DIR = os.environ.get("SEATING_CACHE_DIR") or os.path.join(_user_cache_dir(), "exam-seating", "students")
+CACHE_ENTRIES = 32  # cached sheets kept; the least recently used go first
+CACHE_MAX_AGE = 7 * 24 * 3600  # seconds
+REG_COL = "registration number"
+# pd.read_excel's default missing-value strings (pandas' `na_values` documentation)
+NA_VALUES = frozenset({"", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+                       "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"})
+
+
+def _workbook(data):
+    from openpyxl import load_workbook  # only needed on a cache miss
+    return load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _header(row):
+    return [str(h).lower().strip() if h is not None else "" for h in row]
+
+
+def read_header(data):
+    """Normalized header row of the first sheet, read without loading the rows."""
+    wb = _workbook(data)
+    try:
+        return _header(next(wb.active.iter_rows(max_row=1, values_only=True), ()))
+    finally:
+        wb.close()
+
+
+@timed("ingest.students")
+def ingest_students(data, cache_dir=CACHE_DIR):
+    """
+    Load an uploaded student workbook (raw bytes) as a compact frame holding
+    only `registration number` and the subject columns, with normalized
+    column names and categorical subject columns. Rows are streamed from a
+    read-only workbook; the result is cached as Parquet under the content
+    hash, so re-uploading the same file skips Excel parsing entirely.
+    Cells pandas reads as missing ("N/A", "NaN", "null", ...) stay missing.
+    """
+    path = os.path.join(cache_dir, f"{content_hash(data)}.parquet") if cache_dir else None
+    if path and os.path.exists(path):
+        try:
+            df = pd.read_parquet(path)
+            os.utime(path)  # mark as recently used
+            prune_cache(cache_dir)
+            return df
+        except Exception:
+            pass  # unreadable cache entry: rebuild it below
+
+    with span("ingest.read_excel", "students") as s:
+        s.bytes = len(data)
+        df = _stream_frame(data)
+    if path:
+        try:
+            os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+            prune_cache(cache_dir)
+        except Exception:
+            pass  # no Parquet engine, read-only disk, ...: the cache is best-effort
+    return df
+
+
+def prune_cache(cache_dir=CACHE_DIR, keep=CACHE_ENTRIES, max_age=CACHE_MAX_AGE):
+    """Delete cached sheets unused for `max_age` seconds, and all but the `keep` most recently used."""
+    entries = [entry for entry in os.scandir(cache_dir) if entry.name.endswith(".parquet")]
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    cutoff = time.time() - max_age
+    for entry in [entry for entry in entries[:keep] if entry.stat().st_mtime < cutoff] + entries[keep:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass  # already removed by another process
+
+
+def _stream_frame(data):
+    wb = _workbook(data)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = _header(next(rows, ()))
+        names = [REG_COL] if REG_COL in header else []
+        names += [col for col in detect_subject_columns(header) if col not in names]
+        positions = [header.index(name) for name in names]
+
+        values = [[] for _ in names]
+        for row in rows:
+            for out, pos in zip(values, positions):
+                out.append(row[pos] if pos < len(row) else None)
+    finally:
+        wb.close()
+
+    columns = {}
+    for name, col in zip(names, values):
+        series = _cells(pd.Series(col, dtype=object))
+        columns[name] = series if name == REG_COL else series.astype("category")
+    return pd.DataFrame(columns, columns=names)
+
+
+def _cells(values):
+    """Cells as strings, with the same missing cells as pd.read_excel: "", "N/A", "NaN", "null", "#N/A", ..."""
+    values = values.mask(values.isin(NA_VALUES), None)
+    return values.where(values.isna(), values.astype(str))
+
+
+def student_rows(data, positions):
+    """
+    Every column of the sheet rows at `positions` (row positions in the
+    ingested frame), read from the workbook on demand, so lookups show
+    the whole record while only the compact frame is kept or cached.
+    """
+    wanted = set(positions)
+    found = {}
+    wb = _workbook(data)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = _header(next(rows, ()))
+        for pos, row in enumerate(rows):
+            if len(found) == len(wanted):
+                break
+            if pos in wanted:
+                found[pos] = (tuple(row) + (None,) * len(header))[:len(header)]
+    finally:
+        wb.close()
+
+    hits = [pos for pos in positions if pos in found]
+    frame = pd.DataFrame([found[pos] for pos in hits], index=hits, columns=header, dtype=object)
+    return frame.apply(_cells) if len(frame) else frame
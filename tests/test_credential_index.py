@@ -0,0 +1,98 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from credential_index import CredentialIndex, TooManyAttempts  # noqa: E402
+from fake_firebase import FakeDb  # noqa: E402
+
+REG = "ADT23SOCB00001"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def students():
+    return FakeDb({
+        REG: {"A": "Asha", "B": "secret"},
+        "ADT23SOCB00002": {"A": "Ravi", "B": 4321},
+        "seating": {REG: {"K": "Room - 101|1|1|09:00"}},
+    })
+
+
+def loaded(db, **kwargs):
+    index = CredentialIndex(db, page_size=1, clock=kwargs.pop("clock", Clock()), **kwargs)
+    assert index.load() == 2
+    return index
+
+
+def test_logins_are_checked_locally():
+    db = students()
+    index = loaded(db)
+    before = db.requests
+    assert index.verify(" adt23socb00001 ", "secret") == REG
+    assert index.verify("ADT23SOCB00002", "4321") == "ADT23SOCB00002"
+    assert index.verify(REG, "wrong") is None
+    assert index.verify("seating/101", "x") is None  # not a legal student key: no read
+    assert db.requests == before
+    assert index.stats()["hits"] == 2 and index.stats()["rejected"] == 1
+
+
+def test_unknown_and_changed_passwords_fall_back_to_the_database():
+    db, clock = students(), Clock()
+    index = loaded(db, clock=clock, recheck_after=300)
+    db.reference("/").update({"ADT23SOCB00003/B": "new", f"{REG}/B": "changed"})
+
+    assert index.verify("ADT23SOCB00003", "new") == "ADT23SOCB00003"
+    assert index.verify(REG, "changed") is None  # recent entry: trusted without a read
+    clock.now = 300
+    assert index.verify(REG, "changed") == REG
+    assert index.stats()["fallbacks"] == 2
+
+
+def test_lockout_and_expiry():
+    db, clock = students(), Clock()
+    index = loaded(db, clock=clock, max_failures=3, window=60)
+    for second in range(3):
+        clock.now = second
+        assert index.verify(REG, "wrong") is None
+
+    clock.now = 10
+    with pytest.raises(TooManyAttempts) as locked:
+        index.verify(REG, "secret")  # even the right password
+    assert locked.value.retry_after == 50
+    assert index.verify("ADT23SOCB00002", "4321")  # other IDs are unaffected
+    before = db.requests
+    with pytest.raises(TooManyAttempts):
+        index.verify(REG, "wrong")
+    assert db.requests == before  # a locked ID causes no reads
+
+    clock.now = 60  # the first failure expires, leaving two
+    assert index.verify(REG, "secret") == REG
+    assert index.stats()["locked"] == 2
+
+
+def test_success_clears_earlier_failures():
+    clock = Clock()
+    index = loaded(students(), clock=clock, max_failures=3, window=60)
+    index.verify(REG, "wrong"), index.verify(REG, "wrong")
+    assert index.verify(REG, "secret") == REG
+    index.verify(REG, "wrong"), index.verify(REG, "wrong")
+    assert index.verify(REG, "secret") == REG
+
+
+def test_refresh_picks_up_new_and_removed_students():
+    db = students()
+    index = loaded(db)
+    db.reference("/").update({"ADT23SOCB00003": {"B": "pw"}, "ADT23SOCB00002": None})
+    assert index.refresh() == 1
+    assert index.stats()["students"] == 2
+    before = db.requests
+    assert index.verify("ADT23SOCB00003", "pw") == "ADT23SOCB00003"
+    assert db.requests == before
@@ -0,0 +1,124 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from db_client import DbClient  # noqa: E402
+from fake_firebase import FakeDb, FakeUnavailable  # noqa: E402
+
+
+class Flaky:
+    """FakeDb whose next `failures` reads raise `error` before reaching it."""
+
+    def __init__(self, fake, failures, error=FakeUnavailable("Simulated network failure.")):
+        self.fake = fake
+        self.failures = failures
+        self.error = error
+
+    def reference(self, path="/"):
+        return FlakyReference(self, self.fake.reference(path))
+
+
+class FlakyReference:
+    def __init__(self, flaky, ref):
+        self.flaky = flaky
+        self.ref = ref
+
+    def get(self, shallow=False):
+        if self.flaky.failures:
+            self.flaky.failures -= 1
+            raise self.flaky.error
+        return self.ref.get(shallow)
+
+
+def gated():
+    """A FakeDb whose reads wait for the returned event, and a client over it."""
+    gate = threading.Event()
+
+    def latency():
+        gate.wait(5)
+        return 0
+
+    fake = FakeDb({"admin_seating": {"A": {"count": 1}}}, latency=latency)
+    return fake, DbClient(fake, sleep=lambda _: None), gate
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_identical_reads_in_flight_share_one_request():
+    fake, client, gate = gated()
+    results = []
+    readers = [threading.Thread(target=lambda: results.append(client.reference("admin_seating/A").get()))
+               for _ in range(3)]
+    readers[0].start()
+    wait_for(lambda: client.stats()["in_flight"] == 1)
+    readers[1].start(), readers[2].start()
+    wait_for(lambda: client.stats()["coalesced"] == 2)
+    gate.set()
+    for reader in readers:
+        reader.join()
+
+    assert fake.requests == 1
+    assert results == [{"count": 1}] * 3
+    assert results[0] is not results[1]  # each caller gets its own copy
+    assert client.stats()["in_flight"] == 0
+
+
+def test_reads_after_a_write_do_not_join_an_earlier_read():
+    fake, client, gate = gated()
+    calls = [lambda: client.reference("admin_seating").get(),
+             lambda: client.reference("/").update({"admin_seating/A/count": 2})]
+    threads = [threading.Thread(target=call) for call in calls]
+    threads[0].start()
+    wait_for(lambda: client.stats()["in_flight"] == 1)
+    threads[1].start()
+    wait_for(lambda: client.stats()["in_flight"] == 0)  # the write forgets the read it overlaps
+
+    threads.append(threading.Thread(target=calls[0]))
+    threads[2].start()
+    wait_for(lambda: client.stats()["requests"] == 3)
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert client.stats()["coalesced"] == 0
+    assert fake.requests == 3
+
+
+def test_transient_failure_is_retried_once():
+    slept = []
+    flaky = Flaky(FakeDb({"seating": {"R": {"K": "x"}}}), failures=1)
+    client = DbClient(flaky, sleep=slept.append)
+    assert client.reference("seating/R").get() == {"K": "x"}
+    assert client.stats()["retried"] == 1 and client.stats()["requests"] == 2
+    assert len(slept) == 1 and 0 <= slept[0] <= client.backoff
+
+
+def test_retries_give_up_and_raise():
+    flaky = Flaky(FakeDb(), failures=10)
+    client = DbClient(flaky, retries=2, sleep=lambda _: None)
+    with pytest.raises(FakeUnavailable):
+        client.reference("seating").get()
+    assert client.stats()["requests"] == 3
+    assert client.stats()["in_flight"] == 0
+
+
+def test_permanent_errors_are_not_retried():
+    flaky = Flaky(FakeDb(), failures=1, error=ValueError("Invalid path."))
+    client = DbClient(flaky, sleep=lambda _: None)
+    with pytest.raises(ValueError):
+        client.reference("seating").get()
+    assert client.stats()["retried"] == 0
+
+
+def test_get_many_keeps_order():
+    fake = FakeDb({"seating": {f"R{i}": i for i in range(40)}})
+    client = DbClient(fake, max_workers=4)
+    assert client.get_many([f"seating/R{i}" for i in range(40)]) == list(range(40))
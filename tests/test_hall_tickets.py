@@ -0,0 +1,65 @@
+import io
+import os
+import re
+import sys
+import zlib
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from hall_tickets import ticket_pdf  # noqa: E402
+from seat_visualizer import room_image, seat_png  # noqa: E402
+
+ROOMS = {"101": {"rows": 5, "cols": 6}, "102": {"rows": 4, "cols": 4, "layout": [[1, 0, 1, 1]] * 4}}
+
+
+def record(room, row, col, day="2026-01-05"):
+    return {"Subject": "23CSE1001 PAPER", "Date": day, "Time": "09:00", "Classroom": f"Room - {room}",
+            "Row": row, "Column": col}
+
+
+def images(pdf):
+    """{object number: RGB pixels} of the PDF's image XObjects, decoded by hand."""
+    found = {}
+    for number, head, data in re.findall(rb"(\d+) 0 obj\n<< (.*?) >>\nstream\n(.*?)\nendstream", pdf, re.S):
+        if b"/Subtype /Image" not in head:
+            continue
+        width, height = (int(re.search(rb"/%s (\d+)" % key, head).group(1)) for key in (b"Width", b"Height"))
+        raw = np.frombuffer(zlib.decompress(data), np.uint8)
+        if b"/Predictor 15" in head:
+            rows = raw.reshape(height, width * 3 + 1)
+            assert (rows[:, 0] == 0).all()  # unfiltered PNG rows
+            raw = rows[:, 1:]
+        found[int(number)] = raw.reshape(height, width, 3)
+    return found
+
+
+def test_ticket_embeds_the_portal_picture():
+    pdf = ticket_pdf("ADT23SOCB00001", [record("101", 2, 3), record("102", 4, 4, "2026-01-06")], ROOMS)
+    assert pdf.startswith(b"%PDF-1.4") and pdf.rstrip().endswith(b"%%EOF")
+    assert pdf.count(b"/Type /Page ") == 2
+    pictures = images(pdf)
+    assert len(pictures) == 4  # each room once, each desk once
+
+    for (room, cfg), (row, col) in zip(ROOMS.items(), [(1, 2), (3, 3)]):
+        layout = tuple(map(tuple, cfg["layout"])) if "layout" in cfg else None
+        base, boxes, _ = room_image(cfg["rows"], cfg["cols"], layout)
+        portal = np.asarray(Image.open(io.BytesIO(seat_png(cfg["rows"], cfg["cols"], row, col, layout))).convert("RGB"))
+        x0, y0, x1, y1 = np.clip(boxes[row, col], 0, None)
+        assert any(np.array_equal(picture, base) for picture in pictures.values())
+        assert any(np.array_equal(picture, portal[y0:y1, x0:x1]) for picture in pictures.values())
+
+
+def test_same_room_is_embedded_once():
+    pdf = ticket_pdf("ADT23SOCB00001", [record("101", 1, 1), record("101", 5, 6, "2026-01-06")], ROOMS)
+    assert len(images(pdf)) == 3
+
+
+def test_unknown_room_and_seat():
+    pdf = ticket_pdf("ADT23SOCB00001", [record("999", 1, 1), record("101", 9, 9, "2026-01-06")], ROOMS)
+    assert b"Room layout unavailable." in zlib.decompress(
+        re.search(rb"<< /Filter /FlateDecode /Length \d+ >>\nstream\n(.*?)\nendstream", pdf, re.S).group(1))
+    assert len(images(pdf)) == 1  # the room, with no desk marked
+    assert b"No exams allocated yet." in zlib.decompress(
+        re.search(rb"stream\n(.*?)\nendstream", ticket_pdf("X", [], ROOMS), re.S).group(1))
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import instrumentation as perf  # noqa: E402
+from fake_firebase import FakeDb  # noqa: E402
+
+
+@pytest.fixture
+def recording():
+    was = perf.enabled(), perf.sizes_enabled()
+    perf.clear()
+    perf.enable(True, sizes=True)
+    yield
+    perf.enable(was[0], sizes=was[1])
+    perf.clear()
+
+
+def test_every_db_call_is_timed(recording):
+    db = perf.InstrumentedDb(FakeDb())
+    ref = db.reference("seating/R1")
+    ref.set({"K": "Room - 101|1|1|09:00"})
+    ref.update({"L": "Room - 102|1|1|09:00"})
+    assert ref.get() == {"K": "Room - 101|1|1|09:00", "L": "Room - 102|1|1|09:00"}
+    ref.child("K").delete()
+    ref.delete()
+
+    rows = {row["span"]: row for row in perf.summary()}
+    assert {name: row["count"] for name, row in rows.items()} == {"db.set": 1, "db.update": 1, "db.get": 1,
+                                                                   "db.delete": 2}
+    assert rows["db.set"]["bytes"] > 0
+    assert [event["detail"] for event in map(perf._event_dict, perf._events) if event["name"] == "db.delete"] == \
+        ["seating/R1/K", "seating/R1"]
+
+
+def test_nothing_is_recorded_when_disabled(recording):
+    perf.enable(False)
+    db = perf.InstrumentedDb(FakeDb())
+    db.reference("seating/R1").set(1)
+    db.reference("seating/R1").delete()
+    assert perf.summary() == []
@@ -0,0 +1,138 @@
+import os
+import sys
+from datetime import date, time as dtime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import seating_store  # noqa: E402
+from fake_firebase import FakeDb  # noqa: E402
+from local_store import LocalDb  # noqa: E402
+from seating_engine import build_seating  # noqa: E402
+
+ROOMS = {"101": {"rows": 3, "cols": 4}}
+SUBJECT = "23CSE1001 paper"
+DAY = "2026-01-05"
+
+
+def seating(n, first=0, subject=SUBJECT):
+    regs = np.array([f"ADT23SOCB{i:05d}" for i in range(first, first + n)], dtype=object)
+    return build_seating(subject, regs, ROOMS, date(2026, 1, 5), dtime(9))
+
+
+@pytest.fixture
+def remote():
+    return FakeDb()
+
+
+@pytest.fixture
+def local(remote, tmp_path):
+    store = LocalDb(remote, str(tmp_path / "local.db"))
+    yield store
+    store.close()
+
+
+def frames_equal(a, b):
+    pd.testing.assert_frame_equal(a.reset_index(drop=True), b.reset_index(drop=True), check_dtype=False)
+
+
+def drain(store):
+    while store.sync():
+        pass
+
+
+def test_writes_wait_in_the_outbox_until_sync(local, remote):
+    key = seating_store.save_session(local, seating(8), SUBJECT, DAY)
+    assert local.sync_stats()["pending"] > 0
+    assert remote.reference(f"admin_seating/{key}").get() is None
+    frames_equal(seating_store.load_session(local, key, fresh=True), seating(8))
+
+    drain(local)
+    assert local.sync_stats()["pending"] == 0
+    frames_equal(seating_store.load_session(remote, key, fresh=True), seating(8))
+    assert remote.reference(f"seating/ADT23SOCB00000/{key}").get() == local.reference(f"seating/ADT23SOCB00000/{key}").get()
+
+
+def test_outbox_survives_a_failed_push(local, remote):
+    key = seating_store.save_session(local, seating(8), SUBJECT, DAY)
+    remote.failure_rate = 1.0
+    with pytest.raises(Exception):
+        local.sync()
+    pending = local.sync_stats()["pending"]
+    assert pending > 0
+
+    remote.failure_rate = 0.0
+    drain(local)
+    assert local.sync_stats()["pending"] == 0
+    assert len(seating_store.load_session(remote, key, fresh=True)) == 8
+
+
+def conflicted(local, remote):
+    """A session synced from here, then re-generated on another server and again here."""
+    key = seating_store.save_session(local, seating(8), SUBJECT, DAY)
+    drain(local)
+    seating_store.save_session(remote, seating(5, first=20), SUBJECT, DAY)
+    seating_store.save_session(local, seating(6, first=40), SUBJECT, DAY)
+    drain(local)
+    return key
+
+
+def test_remote_change_is_held_as_a_conflict(local, remote):
+    key = conflicted(local, remote)
+    assert [found for found, _, _ in local.conflicts()] == [key]
+    # Neither side was overwritten
+    frames_equal(seating_store.load_session(remote, key, fresh=True), seating(5, first=20))
+    frames_equal(seating_store.load_session(local, key, fresh=True), seating(6, first=40))
+    assert local.sync_stats()["pending"] > 0
+
+
+def test_resolve_remote_takes_their_session(local, remote):
+    key = conflicted(local, remote)
+    local.resolve(key, "remote")
+    assert local.conflicts() == []
+    assert local.sync_stats()["pending"] == 0
+    frames_equal(seating_store.load_session(local, key, fresh=True), seating(5, first=20))
+    # Our students' children are gone, theirs are copied in
+    assert local.reference(f"seating/ADT23SOCB00040/{key}").get() is None
+    assert local.reference(f"seating/ADT23SOCB00020/{key}").get() == remote.reference(f"seating/ADT23SOCB00020/{key}").get()
+
+
+def test_resolve_local_pushes_ours(local, remote):
+    key = conflicted(local, remote)
+    local.resolve(key, "local")
+    drain(local)
+    assert local.conflicts() == []
+    frames_equal(seating_store.load_session(remote, key, fresh=True), seating(6, first=40))
+    assert remote.reference(f"seating/ADT23SOCB00020/{key}").get() is None
+
+
+def test_delete_all_is_pushed(local, remote):
+    seating_store.save_session(local, seating(8), SUBJECT, DAY)
+    seating_store.save_session(local, seating(4, subject="23CSE1002 paper"), "23CSE1002 paper", DAY)
+    drain(local)
+    assert len(seating_store.list_sessions(remote)) == 2
+
+    seating_store.delete_all(local)
+    assert seating_store.list_sessions(local) == []
+    assert len(seating_store.list_sessions(remote)) == 2  # not until synced
+    drain(local)
+    assert remote.reference("admin_seating").get() is None
+    assert remote.reference("seating").get() is None
+
+
+def test_pull_into_a_fresh_store(remote, tmp_path):
+    first = seating_store.save_session(remote, seating(8), SUBJECT, DAY)
+    second = seating_store.save_session(remote, seating(4, subject="23CSE1002 paper"), "23CSE1002 paper", DAY)
+    store = LocalDb(remote, str(tmp_path / "fresh.db"))
+    try:
+        assert seating_store.list_sessions(store) == []
+        assert store.pull() == 2
+        assert store.pull() == 0  # nothing changed since
+        assert sorted(key for key, _, _ in seating_store.list_sessions(store)) == sorted([first, second])
+        frames_equal(seating_store.load_session(store, first, fresh=True), seating(8))
+        assert store.reference("seating/ADT23SOCB00003").get() == remote.reference("seating/ADT23SOCB00003").get()
+        assert store.sync_stats()["pending"] == 0
+    finally:
+        store.close()
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from registration_index import RegistrationIndex  # noqa: E402
+
+
+def seats(subject, regs, room):
+    return pd.DataFrame({"Subject": subject, "Registration Number": regs, "Classroom": room, "Date": "2026-01-05"})
+
+
+def test_regenerated_session_replaces_its_seats():
+    index = RegistrationIndex(["r1", "r2"])
+    index.add_seats(seats("S", ["R1", "R2"], "101"))
+    index.add_seats(seats("S", ["R1"], "202"))
+    assert [rec["Classroom"] for rec in index.seats_of("r1")] == ["202"]
+    assert index.seats_of("R2") == []
+
+
+def test_other_sessions_are_kept_until_cleared():
+    index = RegistrationIndex(["R1"])
+    index.add_seats(seats("S", ["R1"], "101"))
+    index.add_seats(seats("T", ["R1"], "202"))
+    assert [rec["Subject"] for rec in index.seats_of("R1")] == ["S", "T"]
+    index.clear_seats()
+    assert index.seats_of("R1") == []
@@ -0,0 +1,94 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from fake_firebase import FakeDb, FakeEvent  # noqa: E402
+from seat_cache import SeatCache  # noqa: E402
+
+KEY = "23CSE1001 PAPER_2026-01-05"
+REG = "ADT23SOCB00001"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def seated(*regs, room="101"):
+    return FakeDb({"seating": {reg: {KEY: f"Room - {room}|1|{i + 1}|09:00"} for i, reg in enumerate(regs)}})
+
+
+def test_hits_until_the_ttl_expires():
+    db, clock = seated(REG), Clock()
+    cache = SeatCache(db, ttl=30, clock=clock)
+    first = cache.get(REG)
+    assert first[0]["Classroom"] == "Room - 101"
+    db.data["seating"][REG][KEY] = "Room - 102|1|1|09:00"  # behind the listener's back
+
+    clock.now = 29.9
+    assert cache.get(REG) == first
+    assert db.requests == 1
+    clock.now = 30
+    assert cache.get(REG)[0]["Classroom"] == "Room - 102"
+    assert db.requests == 2
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_least_recently_used_is_evicted():
+    db = seated("A", "B", "C")
+    cache = SeatCache(db, maxsize=2, clock=Clock())
+    cache.get("A"), cache.get("B"), cache.get("A"), cache.get("C")
+    assert cache.stats()["evictions"] == 1
+    before = db.requests
+    cache.get("A"), cache.get("C")
+    assert db.requests == before
+    cache.get("B")
+    assert db.requests == before + 1
+
+
+def test_listener_drops_changed_students():
+    db = seated(REG, "OTHER")
+    cache = SeatCache(db, clock=Clock())
+    assert cache.start_listener()
+    cache.get(REG), cache.get("OTHER")
+
+    db.reference(f"seating/{REG}/{KEY}").set("Room - 102|2|2|09:00")
+    assert cache.stats()["size"] == 1
+    assert cache.get(REG)[0]["Classroom"] == "Room - 102"
+
+    # A multi-location delete from the root reaches the listener as a put per path
+    db.reference("/").update({f"seating/{REG}": None, "seating/OTHER": None})
+    assert cache.get(REG) == [] and cache.get("OTHER") == []
+
+    cache.stop_listener()
+    assert not cache.stats()["listening"]
+    assert db.listeners == []
+
+
+def test_patch_events_drop_each_student():
+    db = seated(REG, "OTHER", "THIRD")
+    cache = SeatCache(db, clock=Clock())
+    cache.get(REG), cache.get("OTHER"), cache.get("THIRD")
+    # Firebase reports an update() on seating/ as one patch relative to the listener
+    cache._on_change(FakeEvent("patch", "/", {f"{REG}/{KEY}": None, "OTHER": None}))
+    assert cache.stats()["size"] == 1
+    cache._on_change(FakeEvent("put", "/", None))
+    assert cache.stats()["size"] == 0
+
+
+def test_invalidation_during_a_read_is_not_overwritten():
+    db = seated(REG)
+    cache = SeatCache(db, clock=Clock())
+    real = db.reference
+
+    def racing(path="/"):
+        cache.invalidate(REG)  # a change lands while the read is in flight
+        return real(path)
+
+    db.reference = racing
+    cache.get(REG)
+    db.reference = real
+    assert cache.stats()["size"] == 0
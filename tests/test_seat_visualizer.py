@@ -0,0 +1,71 @@
+import io
+import os
+import struct
+import sys
+import zlib
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from seat_visualizer import BAND_ROWS, HIGHLIGHT_RGB, room_image, seat_png  # noqa: E402
+
+CHECKERED = tuple(tuple(int((r + c) % 3 != 0) for c in range(8)) for r in range(8))
+
+
+def decode(png):
+    return np.asarray(Image.open(io.BytesIO(png)).convert("RGB"))
+
+
+def idat(png):
+    """The IDAT payload, checked with zlib itself (stream, Adler-32) rather than through PIL."""
+    pos, chunks = 8, []
+    while pos < len(png):
+        length, kind = struct.unpack(">I4s", png[pos:pos + 8])
+        data = png[pos + 8:pos + 8 + length]
+        assert struct.unpack(">I", png[pos + 8 + length:pos + 12 + length])[0] == zlib.crc32(kind + data)
+        if kind == b"IDAT":
+            chunks.append(data)
+        pos += 12 + length
+    return zlib.decompress(b"".join(chunks))
+
+
+def seats_to_check(rows, cols, layout, boxes):
+    """Corners, the middle, and seats whose box crosses a band boundary."""
+    picks = {(0, 0), (rows - 1, cols // 2), (rows // 2, cols // 3)}
+    crossing = [(r, c) for r in range(rows) for c in range(cols // 2)
+                if boxes[r, c, 1] // BAND_ROWS != (boxes[r, c, 3] - 1) // BAND_ROWS]
+    picks.update(crossing[:3])
+    return [(r, c) for r, c in sorted(picks) if not layout or layout[r][c]]
+
+
+def test_plain_room_is_the_base_image():
+    image, _, _ = room_image(12, 10)
+    png = seat_png(12, 10)
+    assert np.array_equal(decode(png), image)
+    rows = idat(png)
+    assert len(rows) == image.shape[0] * (image.shape[1] * 3 + 1)
+
+
+@pytest.mark.parametrize("rows, cols, layout", [(5, 6, None), (8, 8, CHECKERED), (40, 40, None)])
+def test_only_the_seat_is_highlighted(rows, cols, layout):
+    image, boxes, bands = room_image(rows, cols, layout)
+    assert len(bands) > 1
+    checked = seats_to_check(rows, cols, layout, boxes)
+    assert any(boxes[r, c, 1] // BAND_ROWS != (boxes[r, c, 3] - 1) // BAND_ROWS for r, c in checked)
+
+    for row, col in checked:
+        png = seat_png(rows, cols, row, col, layout)
+        idat(png)  # spliced stream and checksums are valid
+        seat = decode(png)
+        changed = (seat != image).any(axis=-1)
+        x0, y0, x1, y1 = np.clip(boxes[row, col], 0, None)
+        assert changed.any()
+        assert (seat[changed] == HIGHLIGHT_RGB).all()
+        assert not changed[:y0].any() and not changed[y1:].any()
+        assert not changed[:, :x0].any() and not changed[:, x1:].any()
+
+
+def test_out_of_range_seat_is_the_plain_room():
+    assert seat_png(5, 6, 9, 9) == seat_png(5, 6)
@@ -0,0 +1,26 @@
+import io
+import os
+import sys
+from datetime import date, time as dtime
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from seating_charts import PAGE_H, PAGE_W, PNG_SCALE, room_charts, chart_png  # noqa: E402
+from seating_engine import build_seating  # noqa: E402
+
+ROOMS = {"101": {"rows": 4, "cols": 5}}
+
+
+def test_chart_png_draws_every_seat():
+    regs = np.array([f"ADT23SOCB{i:05d}" for i in range(12)], dtype=object)
+    seating = build_seating("23CSE1001 paper", regs, ROOMS, date(2026, 1, 5), dtime(9))
+    chart = next(iter(room_charts(seating, ROOMS)))
+    image = np.asarray(Image.open(io.BytesIO(chart_png(chart))).convert("L"))
+    assert image.shape == (PAGE_H * PNG_SCALE, PAGE_W * PNG_SCALE)
+
+    one = next(iter(room_charts(seating.iloc[:1], ROOMS)))
+    single = np.asarray(Image.open(io.BytesIO(chart_png(one))).convert("L"))
+    # Each registration number adds ink
+    assert (image < 128).sum() > (single < 128).sum()
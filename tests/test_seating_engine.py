@@ -0,0 +1,75 @@
+import os
+import sys
+from datetime import date, time as dtime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from seating_engine import build_seating, redistribute_students, reseat  # noqa: E402
+
+ROOMS = {"101": {"rows": 3, "cols": 4}, "102": {"rows": 2, "cols": 5}}
+SUBJECT = "23CSE1001 paper"
+DAY, TIME = date(2026, 1, 5), dtime(9)
+
+
+def regs(n, first=0):
+    return np.array([f"ADT23SOCB{i:05d}" for i in range(first, first + n)], dtype=object)
+
+
+def seats(frame):
+    """{registration: (classroom, row, column)}"""
+    return {reg: (room, int(row), int(col)) for reg, room, row, col
+            in frame[["Registration Number", "Classroom", "Row", "Column"]].itertuples(index=False)}
+
+
+def assert_no_double_booking(frame):
+    assert not frame.duplicated(["Classroom", "Row", "Column"]).any()
+    assert not frame["Registration Number"].duplicated().any()
+
+
+def test_unchanged_roster_keeps_every_seat():
+    previous = build_seating(SUBJECT, regs(18), ROOMS, DAY, TIME)
+    again = reseat(SUBJECT, None, ROOMS, DAY, TIME, previous)
+    assert seats(again) == seats(previous)
+
+
+def test_only_arrivals_and_departures_move():
+    previous = build_seating(SUBJECT, regs(18), ROOMS, DAY, TIME)
+    roster = np.sort(np.concatenate((np.delete(regs(18), [2, 9]), regs(3, first=100))))
+    seating = reseat(SUBJECT, roster, ROOMS, DAY, TIME, previous)
+
+    assert_no_double_booking(seating)
+    assert sorted(seating["Registration Number"]) == sorted(roster)
+    before, after = seats(previous), seats(seating)
+    assert all(after[reg] == before[reg] for reg in roster if reg in before)
+    # Newcomers take the two freed seats first, then the next free one
+    freed = {before[reg] for reg in regs(18)[[2, 9]]}
+    assert freed < {after[reg] for reg in regs(3, first=100)}
+
+
+def test_removed_room_is_reseated_elsewhere():
+    previous = build_seating(SUBJECT, regs(14), ROOMS, DAY, TIME)
+    smaller = {"101": ROOMS["101"], "103": {"rows": 2, "cols": 2}}
+    seating = reseat(SUBJECT, None, smaller, DAY, TIME, previous)
+
+    assert_no_double_booking(seating)
+    assert len(seating) == 14
+    before, after = seats(previous), seats(seating)
+    kept = [reg for reg, seat in before.items() if seat[0] == "Room - 101"]
+    assert kept and all(after[reg] == before[reg] for reg in kept)
+    assert {after[reg][0] for reg in before if reg not in kept} == {"Room - 103"}
+
+
+def test_redistribute_never_double_books():
+    previous = build_seating(SUBJECT, regs(20), ROOMS, DAY, TIME)
+    # A corrupted session: two students stored on one seat, one student on two
+    previous.loc[5, ["Classroom", "Row", "Column"]] = previous.loc[4, ["Classroom", "Row", "Column"]].to_numpy()
+    previous = pd.concat([previous, previous.iloc[[7]].assign(Row=3, Column=4, Classroom="Room - 101")])
+    sheet = pd.DataFrame({"Registration Number": list(regs(24)),
+                          SUBJECT: ["Y"] * 22 + ["NA", ""]})
+
+    seating = redistribute_students(sheet, SUBJECT, ROOMS, DAY, TIME, previous)
+    assert_no_double_booking(seating)
+    assert sorted(seating["Registration Number"]) == sorted(regs(22))
+    assert seats(seating)[regs(1, first=4)[0]] == seats(previous.iloc[[4]])[regs(1, first=4)[0]]
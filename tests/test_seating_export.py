@@ -0,0 +1,83 @@
+import io
+import json
+import os
+import sys
+from datetime import date, time as dtime
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import seating_store  # noqa: E402
+from fake_firebase import FakeDb  # noqa: E402
+from seating_engine import build_seating  # noqa: E402
+from seating_export import MANIFEST, export_to_folder, plan_export, read_manifest  # noqa: E402
+
+ROOMS = {"101": {"rows": 3, "cols": 4}}
+
+
+def save(db, subject, day=5, first=0):
+    regs = np.array([f"ADT23SOCB{i:05d}" for i in range(first, first + 6)], dtype=object)
+    seating = build_seating(subject, regs, ROOMS, date(2026, 1, day), dtime(9))
+    return seating_store.save_session(db, seating, subject, f"2026-01-{day:02d}")
+
+
+def legacy(db, subject, day=7):
+    """A format-1 session: records only, no `saved` stamp."""
+    regs = np.array(["ADT23SOCB00100"], dtype=object)
+    seating = build_seating(subject, regs, ROOMS, date(2026, 1, day), dtime(9))
+    key = seating_store.session_key(seating["Subject"].iloc[0], seating["Date"].iloc[0])
+    db.reference(f"admin_seating/{key}").set(seating.to_dict(orient="records"))
+    return key
+
+
+def test_incremental_export_carries_only_changes(tmp_path):
+    db = FakeDb()
+    first, second = save(db, "23CSE1001 paper"), save(db, "23CSE1002 paper", day=6)
+    assert sorted(export_to_folder(db, str(tmp_path), "csv")["changed"]) == sorted([first, second])
+    assert export_to_folder(db, str(tmp_path), "csv")["changed"] == []
+
+    stamp = db.reference(f"admin_seating/{second}/saved")
+    stamp.set(stamp.get() + 1)  # re-saved elsewhere
+    manifest = export_to_folder(db, str(tmp_path), "csv")
+    assert manifest["changed"] == [second] and manifest["incremental"]
+
+
+def test_sessions_without_a_stamp_are_always_exported(tmp_path):
+    db = FakeDb()
+    stamped, old = save(db, "23CSE1001 paper"), legacy(db, "23CSE1003 paper")
+    export_to_folder(db, str(tmp_path), "csv")
+    previous = json.loads((tmp_path / MANIFEST).read_text())
+    assert previous["sessions"][old] is None
+
+    changed, removed, _ = plan_export(db, previous=previous)
+    assert changed == [old] and removed == []
+    assert stamped not in changed
+
+
+def test_unreadable_folder_manifest_means_a_full_export(tmp_path, capsys):
+    db = FakeDb()
+    save(db, "23CSE1001 paper")
+    export_to_folder(db, str(tmp_path), "csv")
+    (tmp_path / MANIFEST).write_text(json.dumps({"sessions": {}, "format": "csv"}))  # no exported_at
+
+    manifest = export_to_folder(db, str(tmp_path), "csv")
+    assert not manifest["incremental"] and len(manifest["changed"]) == 1
+    assert "no export time" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("text, problem", [
+    ("{not json", "not valid JSON"),
+    ("[1, 2]", "not a seating export manifest"),
+    ('{"exported_at": 1, "sessions": {"K": "soon"}}', "no valid session list"),
+    ('{"sessions": {}}', "no export time"),
+])
+def test_read_manifest_rejects(text, problem):
+    with pytest.raises(ValueError, match=problem):
+        read_manifest(io.StringIO(text))
+
+
+def test_read_manifest_accepts_an_export():
+    manifest = {"exported_at": 1767571200000, "sessions": {"K_2026-01-05": 1767571100000, "OLD_2026-01-06": None},
+                "format": "csv"}
+    assert read_manifest(io.StringIO(json.dumps(manifest))) == manifest
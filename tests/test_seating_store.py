@@ -0,0 +1,151 @@
+import os
+import sys
+from datetime import date, time as dtime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import seating_store  # noqa: E402
+from fake_firebase import FakeDb  # noqa: E402
+from seating_engine import build_seating, reseat  # noqa: E402
+
+ROOMS = {"101": {"rows": 3, "cols": 4}, "102": {"rows": 2, "cols": 5}}
+SUBJECT = "23CSE1001 paper"
+DAY = "2026-01-05"
+
+
+def seating(regs, subject=SUBJECT, day=date(2026, 1, 5)):
+    return build_seating(subject, np.array(regs, dtype=object), ROOMS, day, dtime(9))
+
+
+def regs(n, first=0):
+    return [f"ADT23SOCB{i:05d}" for i in range(first, first + n)]
+
+
+def test_save_load_round_trip():
+    db = FakeDb()
+    frame = seating(regs(15))
+    key = seating_store.save_session(db, frame, SUBJECT, DAY)
+    assert key == "23CSE1001 PAPER_2026-01-05"
+    loaded = seating_store.load_session(db, key, fresh=True)
+    pd.testing.assert_frame_equal(loaded.reset_index(drop=True), frame.reset_index(drop=True), check_dtype=False)
+    assert seating_store.list_sessions(db) == [(key, "23CSE1001 PAPER", DAY)]
+    child = db.reference(f"seating/{regs(1)[0]}/{key}").get()
+    assert seating_store.seat_records({key: child}, regs(1)[0])[0]["Classroom"] == frame["Classroom"].iloc[0]
+
+
+def test_regenerating_drops_stale_children():
+    db = FakeDb()
+    key = seating_store.save_session(db, seating(regs(10)), SUBJECT, DAY)
+    seating_store.save_session(db, seating(regs(6, first=4)), SUBJECT, DAY)
+    assert all(db.reference(f"seating/{reg}/{key}").get() is None for reg in regs(4))
+    assert all(db.reference(f"seating/{reg}/{key}").get() for reg in regs(6, first=4))
+    assert len(seating_store.load_session(db, key, fresh=True)) == 6
+
+
+def test_regenerating_keeps_other_sessions():
+    db = FakeDb()
+    first = seating_store.save_session(db, seating(regs(5)), SUBJECT, DAY)
+    other = seating_store.save_session(db, seating(regs(5), "23CSE1002 paper", date(2026, 1, 6)), "23CSE1002 paper",
+                                       "2026-01-06")
+    seating_store.save_session(db, seating(regs(2)), SUBJECT, DAY)
+    assert db.reference(f"seating/{regs(5)[-1]}/{other}").get()
+    assert db.reference(f"seating/{regs(5)[-1]}/{first}").get() is None
+
+
+def test_update_session_writes_only_the_diff():
+    db = FakeDb()
+    key = seating_store.save_session(db, seating(regs(10)), SUBJECT, DAY)
+    previous = seating_store.load_session(db, key, fresh=True)
+    moved = previous.copy()
+    moved.loc[0, "Row"] = 3
+    moved.loc[0, "Column"] = 4
+    changed_frame = pd.concat([moved.iloc[:9], seating(regs(1, first=50)).assign(Row=2, Column=5, Classroom="102")])
+
+    before = db.requests
+    _, changed = seating_store.update_session(db, changed_frame, SUBJECT, DAY, previous)
+    assert changed == 3  # one moved, one left, one arrived
+    assert db.requests - before == 1  # a single multi-location update
+    assert db.reference(f"seating/{regs(10)[-1]}/{key}").get() is None
+    assert db.reference(f"seating/{regs(1, first=50)[0]}/{key}").get() == "102|2|5|09:00"
+    assert len(seating_store.load_session(db, key, fresh=True)) == 10
+
+
+def test_delete_session():
+    db = FakeDb()
+    key = seating_store.save_session(db, seating(regs(8)), SUBJECT, DAY)
+    other = seating_store.save_session(db, seating(regs(8), "23CSE1002 paper", date(2026, 1, 6)), "23CSE1002 paper",
+                                       "2026-01-06")
+    assert seating_store.delete_session(db, key) == 8
+    assert db.reference(f"admin_seating/{key}").get() is None
+    assert all(db.reference(f"seating/{reg}/{key}").get() is None for reg in regs(8))
+    assert seating_store.list_sessions(db) == [(other, "23CSE1002 PAPER", "2026-01-06")]
+    assert seating_store.load_session(db, key, fresh=True).empty
+
+
+# --- Storage formats ---
+
+def legacy_session(db, frame):
+    """A format-1 session saved before the reverse index: full records, also in list-format student nodes."""
+    key = seating_store.session_key(frame["Subject"].iloc[0], frame["Date"].iloc[0])
+    records = frame.to_dict(orient="records")
+    db.reference("/").update({f"admin_seating/{key}": records,
+                              **{f"seating/{rec['Registration Number']}": [rec] for rec in records}})
+    return key
+
+
+def test_reads_format_1():
+    db = FakeDb()
+    frame = seating(regs(6))
+    key = legacy_session(db, frame)
+    loaded = seating_store.load_session(db, key, fresh=True)
+    assert loaded.attrs["version"] == 1
+    pd.testing.assert_frame_equal(loaded, frame.reset_index(drop=True), check_dtype=False)
+    assert seating_store.seat_records(db.reference(f"seating/{regs(1)[0]}").get())[0]["Subject"] == frame["Subject"].iloc[0]
+
+
+def test_migrates_format_1():
+    db = FakeDb()
+    frame = seating(regs(6))
+    key = legacy_session(db, frame)
+    assert seating_store.migrate_sessions(db) == 1
+    assert seating_store.migrate_sessions(db) == 0
+
+    stored = db.reference(f"admin_seating/{key}").get()
+    assert seating_store.is_compact(stored)
+    loaded = seating_store.load_session(db, key, fresh=True)
+    assert loaded.attrs["version"] == seating_store.FORMAT
+    pd.testing.assert_frame_equal(loaded, frame.reset_index(drop=True), check_dtype=False)
+    # Old list entries are purged; each student keeps one compact child
+    for reg in regs(6):
+        assert db.reference(f"seating/{reg}").get() == {key: seating_store.seat_children(frame[frame["Registration Number"] == reg]).iloc[0]}
+
+
+def test_format_2_round_trip():
+    frame = seating(regs(22))  # fills both rooms
+    node = seating_store.encode_session(frame)
+    assert node["v"] == seating_store.FORMAT and node["count"] == 22 and isinstance(node["saved"], int)
+    assert all(isinstance(value, (str, int)) for value in node.values())  # primitives only: one shallow read
+    decoded = seating_store.decode_session(node)
+    pd.testing.assert_frame_equal(decoded, frame.reset_index(drop=True), check_dtype=False)
+    assert decoded.attrs["saved"] == node["saved"]
+    assert seating_store.encode_session(frame.iloc[:0]) is None
+
+
+def test_reseated_session_writes_only_moved_students():
+    db = FakeDb()
+    key = seating_store.save_session(db, seating(regs(18)), SUBJECT, DAY)
+    previous = seating_store.load_session(db, key, fresh=True)
+    assert previous.attrs["version"] == seating_store.FORMAT
+    roster = np.sort(np.concatenate((np.array(regs(17), dtype=object), np.array(regs(2, first=100), dtype=object))))
+    reseated = reseat(SUBJECT, roster, ROOMS, date(2026, 1, 5), dtime(9), previous)
+    assert not reseated.duplicated(["Classroom", "Row", "Column"]).any()
+
+    children = {reg: db.reference(f"seating/{reg}/{key}").get() for reg in regs(17)}
+    _, changed = seating_store.update_session(db, reseated, SUBJECT, DAY, previous)
+    assert changed == 3  # one left, two arrived; everyone else kept their child
+    assert {reg: db.reference(f"seating/{reg}/{key}").get() for reg in regs(17)} == children
+    assert db.reference(f"seating/{regs(18)[-1]}/{key}").get() is None
+    pd.testing.assert_frame_equal(seating_store.load_session(db, key, fresh=True), reseated.reset_index(drop=True),
+                                  check_dtype=False)
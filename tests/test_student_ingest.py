@@ -0,0 +1,77 @@
+import io
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from seating_engine import subject_registrations  # noqa: E402
+from student_ingest import NA_VALUES, ingest_students, prune_cache, student_rows  # noqa: E402
+
+SUBJECT = "23cse1001 data structures"
+CELLS = ["Y", "N/A", "NaN", "null", "#N/A", "", None, "Y", "NA", "n/a", "-1.#IND", "None", "yes"]
+
+
+def workbook(cells):
+    frame = pd.DataFrame({"Registration Number": [f"R{i}" for i in range(len(cells))], SUBJECT: cells})
+    out = io.BytesIO()
+    frame.to_excel(out, index=False)
+    return out.getvalue()
+
+
+def roster(df):
+    df = df.rename(columns=lambda c: str(c).lower().strip())
+    return subject_registrations(df[SUBJECT], df["registration number"]).tolist()
+
+
+def test_roster_matches_read_excel():
+    data = workbook(CELLS)
+    expected = roster(pd.read_excel(io.BytesIO(data)))
+    assert expected == ["R0", "R12", "R7"]
+    assert roster(ingest_students(data, cache_dir=None)) == expected
+
+
+def test_every_na_token_matches_read_excel():
+    data = workbook(sorted(NA_VALUES) + ["Y"])
+    assert roster(ingest_students(data, cache_dir=None)) == roster(pd.read_excel(io.BytesIO(data))) == [f"R{len(NA_VALUES)}"]
+
+
+def test_cached_roster_matches(tmp_path):
+    data = workbook(CELLS)
+    ingest_students(data, cache_dir=str(tmp_path))
+    assert roster(ingest_students(data, cache_dir=str(tmp_path))) == roster(pd.read_excel(io.BytesIO(data)))
+
+
+def test_cache_is_pruned(tmp_path):
+    pytest.importorskip("pyarrow")
+    for i in range(5):
+        ingest_students(workbook(["Y"] * (i + 1)), cache_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 5
+    prune_cache(str(tmp_path), keep=2)
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_unused_sheets_expire(tmp_path):
+    pytest.importorskip("pyarrow")
+    ingest_students(workbook(["Y"]), cache_dir=str(tmp_path))
+    old = os.path.join(tmp_path, os.listdir(tmp_path)[0])
+    os.utime(old, (0, 0))
+    ingest_students(workbook(["Y", "Y"]), cache_dir=str(tmp_path))
+    assert not os.path.exists(old) and len(os.listdir(tmp_path)) == 1
+
+
+def test_lookup_reads_full_rows():
+    frame = pd.DataFrame({"Registration Number": ["R0", "R1", "R2"], "Name": ["Asha", "N/A", "Ravi"],
+                          SUBJECT: ["Y", None, "Y"], "Phone": [98450, 98451, None]})
+    out = io.BytesIO()
+    frame.to_excel(out, index=False)
+    data = out.getvalue()
+    assert list(ingest_students(data, cache_dir=None).columns) == ["registration number", SUBJECT]
+
+    rows = student_rows(data, [2, 1, 7])
+    assert list(rows.index) == [2, 1]
+    assert list(rows.columns) == ["registration number", "name", SUBJECT, "phone"]
+    assert rows.loc[2].to_dict() == {"registration number": "R2", "name": "Ravi", SUBJECT: "Y", "phone": None}
+    assert rows.loc[1, "name"] is None and rows.loc[1, "phone"] == "98451"
+    assert student_rows(data, []).empty
@@ -0,0 +1,256 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import time as dtime
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import span, timed
+from process_pool import pool_context
+from room_packing import pack_rooms, spaced_rooms
+from seating_engine import (SEATING_COLUMNS, SUBJECT_PATTERN, assign_seats, interleave_demand, interleave_seats, seating_frame,
+                            subject_mask, subject_registrations)
+
+DEFAULT_TIME = dtime(9, 0)
+ISSUE_COLUMNS = ["Registration Number", "Subject", "Date", "Time", "Issue"]
+
+
+# --- Inputs ---
+
+def load_timetable(source):
+    """
+    Read an exam timetable (Exam_Code, Exam_Date, optional Exam_Time) into
+    rows of code/date/time. Papers without a time sit at 09:00, the staff
+    form's default.
+    """
+    if isinstance(source, pd.DataFrame):
+        sheet = source
+    else:
+        with span("ingest.read_excel", "timetable"):
+            sheet = pd.read_excel(source)
+    sheet = sheet.rename(columns=lambda c: str(c).lower().strip())
+    time_col = next((c for c in ("exam_time", "time") if c in sheet.columns), None)
+
+    timetable = pd.DataFrame({
+        "code": sheet["exam_code"].astype(str).str.strip().str.upper(),
+        "date": pd.to_datetime(sheet["exam_date"]).dt.date,
+        "time": sheet[time_col].map(_parse_time) if time_col else DEFAULT_TIME,
+    })
+    return timetable.dropna(subset=["date"]).reset_index(drop=True)
+
+
+def _parse_time(value):
+    if isinstance(value, dtime):
+        return value
+    if pd.isna(value) or str(value).strip() == "":
+        return DEFAULT_TIME
+    return pd.to_datetime(str(value)).time()
+
+
+def rooms_from_sheet(rooms_df, cols=5):
+    """
+    Classroom configs from a ROOMS sheet (Room_ID, Capacity, Status). The
+    sheet has no geometry, so each room gets `cols` columns and a layout
+    mask that switches off seats beyond its capacity.
+    """
+    sheet = rooms_df.rename(columns=lambda c: str(c).lower().strip())
+    if "status" in sheet.columns:
+        sheet = sheet[sheet["status"].astype(str).str.strip().str.lower() == "active"]
+
+    classrooms = {}
+    for room_id, capacity in zip(sheet["room_id"].astype(str).str.strip(), sheet["capacity"].astype(int)):
+        if capacity <= 0:
+            continue
+        rows = math.ceil(capacity / cols)
+        seats = np.arange(rows * cols).reshape(cols, rows).T < capacity
+        classrooms[room_id] = {"rows": rows, "cols": cols, "layout": seats.astype(int).tolist()}
+    return classrooms
+
+
+def match_subject_columns(codes, columns):
+    """Map each exam code to the student sheet column that carries it."""
+    by_code = {}
+    for col in columns:
+        for code in SUBJECT_PATTERN.findall(str(col)):
+            by_code.setdefault(code.upper(), col)
+    return {code: by_code.get(code) for code in codes}
+
+
+# --- Allocation ---
+
+def allocate_slot(students, subject_cols, classrooms, exam_date, exam_time):
+    """
+    Seat every subject of one (date, time) slot over a shared room pool.
+    Subjects follow each other through the same serpentine order, so a
+    room is shared when one subject ends part-way through it. A student
+    registered for two papers in the slot keeps the first and is reported.
+    """
+    reg_col = students["registration number"]
+    per_subject = [subject_registrations(students[col], reg_col) for col in subject_cols]
+    return seat_slot(per_subject, subject_cols, classrooms, exam_date, exam_time)
+
+
+def seat_slot(per_subject, subject_cols, classrooms, exam_date, exam_time, pack=False, interleave=False):
+    """
+    allocate_slot on rosters that are already resolved: one sorted array
+    per subject. With `pack`, only the fewest rooms that hold the slot
+    are opened (see room_packing); with `interleave`, subjects are mixed
+    so that no two neighbours take the same paper (see interleave_seats).
+    """
+    if not per_subject:
+        return pd.DataFrame(columns=SEATING_COLUMNS), pd.DataFrame(columns=ISSUE_COLUMNS)
+
+    regs = np.concatenate(per_subject).astype(object)
+    subject_idx = np.repeat(np.arange(len(per_subject)), [len(r) for r in per_subject])
+    labels = np.array([col.strip().upper() for col in subject_cols], dtype=object)
+
+    clash = pd.Series(regs).duplicated(keep="first").to_numpy()
+    issues = [_issue_frame(regs[clash], labels[subject_idx[clash]], exam_date, exam_time, "clash")]
+    regs, subject_idx = regs[~clash], subject_idx[~clash]
+
+    sizes = np.bincount(subject_idx, minlength=len(per_subject))
+    if pack:
+        classrooms = pack_rooms(classrooms, interleave_demand(sizes) if interleave else len(regs)).rooms
+    if interleave:
+        names, student, room_idx, row_idx, col_idx = interleave_seats(sizes, classrooms)
+    else:
+        names, room_idx, row_idx, col_idx = assign_seats(len(regs), classrooms)
+        student = np.arange(len(room_idx))
+    seating = seating_frame(labels[subject_idx[student]], regs[student], names, room_idx, row_idx, col_idx,
+                            exam_date, exam_time)
+    unseated = np.ones(len(regs), dtype=bool)
+    unseated[student] = False
+    issues.append(_issue_frame(regs[unseated], labels[subject_idx[unseated]], exam_date, exam_time, "no seat"))
+    return seating, pd.concat(issues, ignore_index=True)
+
+
+@timed("allocate.timetable")
+def allocate_timetable(students, timetable, classrooms, max_workers=None, processes=None, progress=None,
+                       pack=False, spacing=0, interleave=False):
+    """
+    Allocate every paper in the timetable in one pass, keeping `spacing`
+    percent of each room's seats empty. `pack` and `interleave` apply to
+    each slot as in seat_slot. Slots are independent, so they run
+    concurrently: on a process pool when there is more than one slot and
+    more than one core (or `processes=True`), otherwise on threads.
+    `progress(done, total)` is called from the calling thread as slots
+    finish; results keep timetable order. Returns (seating, issues).
+    """
+    columns = dict(zip(students.columns.str.lower().str.strip(), students.columns))
+    students = students.rename(columns=lambda c: c.lower().strip())
+    if "registration number" not in columns:
+        raise ValueError("Student sheet has no 'registration number' column.")
+
+    matched = match_subject_columns(timetable["code"], list(columns))
+    missing = [code for code, col in matched.items() if col is None]
+
+    subject_cols = list(dict.fromkeys(col for col in matched.values() if col is not None))
+    position = {col: j for j, col in enumerate(subject_cols)}
+    slots = []
+    for (exam_date, exam_time), group in timetable.groupby(["date", "time"], sort=True):
+        cols = list(dict.fromkeys(position[matched[c]] for c in group["code"] if matched[c] is not None))
+        if cols:
+            slots.append((cols, exam_date, exam_time))
+
+    regs, taking = slot_rosters(students, subject_cols)
+    options = {"pack": pack, "interleave": interleave}
+    if spacing:
+        classrooms = spaced_rooms(classrooms, spacing)
+    if processes is None:
+        processes = len(slots) > 1 and (max_workers or os.cpu_count() or 1) > 1
+    if processes:
+        pool, shared = _process_pool(regs, taking, subject_cols, classrooms, options, max_workers)
+        run = _run_slot
+    else:
+        pool, shared = ThreadPoolExecutor(max_workers=max_workers), []
+
+        def run(slot):
+            return _seat_rosters(regs, taking, subject_cols, classrooms, options, slot)
+
+    results = [None] * len(slots)
+    try:
+        with pool:
+            futures = {pool.submit(run, slot): i for i, slot in enumerate(slots)}
+            for done, future in enumerate(as_completed(futures), 1):
+                results[futures[future]] = future.result()
+                if progress:
+                    progress(done, len(slots))
+    finally:
+        for block in shared:
+            block.close()
+            block.unlink()
+
+    seating = [r[0] for r in results] or [pd.DataFrame(columns=SEATING_COLUMNS)]
+    issues = [r[1] for r in results]
+    issues.append(pd.DataFrame({"Registration Number": "", "Subject": missing, "Date": "", "Time": "",
+                                "Issue": "no student column"}, columns=ISSUE_COLUMNS))
+    return pd.concat(seating, ignore_index=True), pd.concat(issues, ignore_index=True)
+
+
+def slot_rosters(students, subject_cols):
+    """
+    Registration numbers normalized and sorted once for the whole run, and
+    a (subject x student) boolean matrix in the same order, so each slot's
+    rosters are plain row selections.
+    """
+    reg_col = students["registration number"]
+    valid = reg_col.notna().to_numpy()
+    regs = reg_col[valid].astype(str).str.strip().str.upper().to_numpy(dtype=str)
+    order = np.argsort(regs, kind="stable")
+    taking = np.zeros((len(subject_cols), len(regs)), dtype=bool)
+    for j, col in enumerate(subject_cols):
+        taking[j] = subject_mask(students[col])[valid][order]
+    return regs[order], taking
+
+
+def _seat_rosters(regs, taking, subject_cols, classrooms, options, slot):
+    cols, exam_date, exam_time = slot
+    return seat_slot([regs[taking[j]] for j in cols], [subject_cols[j] for j in cols],
+                     classrooms, exam_date, exam_time, **options)
+
+
+# --- Process Pool ---
+# Workers map the rosters from shared memory once instead of receiving a
+# pickled copy of the student sheet with every slot.
+
+_worker = {}
+
+
+def _process_pool(regs, taking, subject_cols, classrooms, options, max_workers):
+    shared, specs = [], {}
+    for name, array in (("regs", regs), ("taking", taking)):
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        shared.append(block)
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        specs[name] = (block.name, array.shape, array.dtype.str)
+    pool = ProcessPoolExecutor(max_workers, mp_context=pool_context(),
+                               initializer=_init_worker, initargs=(specs, subject_cols, classrooms, options))
+    return pool, shared
+
+
+def _init_worker(specs, subject_cols, classrooms, options):
+    for name, (block_name, shape, dtype) in specs.items():
+        # Workers share the parent's resource tracker, which unlinks the block if the parent dies
+        block = shared_memory.SharedMemory(name=block_name)
+        _worker[name] = np.ndarray(shape, dtype, buffer=block.buf)
+        _worker[f"{name}_block"] = block
+    _worker["subject_cols"] = subject_cols
+    _worker["classrooms"] = classrooms
+    _worker["options"] = options
+
+
+def _run_slot(slot):
+    return _seat_rosters(_worker["regs"], _worker["taking"], _worker["subject_cols"], _worker["classrooms"],
+                         _worker["options"], slot)
+
+
+def _issue_frame(regs, subjects, exam_date, exam_time, issue):
+    return pd.DataFrame({
+        "Registration Number": regs,
+        "Subject": subjects,
+        "Date": exam_date.strftime("%Y-%m-%d"),
+        "Time": exam_time.strftime("%H:%M"),
+        "Issue": issue,
+    }, columns=ISSUE_COLUMNS)